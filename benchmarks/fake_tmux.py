@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""A stand-in for tmux that serves a fixed set of panes.
+
+When this script is installed on PATH under the name `tmux`, key2pane talks
+to it instead of a tmux server. It understands the subset of tmux that
+key2pane uses: `display-message`, `list-panes` and `send-keys`, command
+sequences separated by `;`, and control mode (`tmux -C`).
+
+The fake is configured using environment variables:
+
+- FAKE_TMUX_PANES: the number of panes, which all live in window 0 of
+  session `bench`. Default: 4.
+- FAKE_TMUX_COMMANDS: a comma separated list of pane commands, which are
+  assigned to the panes in turn. Default: bash.
+- FAKE_TMUX_LATENCY_MS: the time each invocation, or each command in control
+  mode, takes. Default: 0.
+- FAKE_TMUX_LOG: a file to which every executed command is appended.
+"""
+
+import os
+import re
+import shlex
+import sys
+import time
+
+_FORMAT: re.Pattern[str] = re.compile(r"#\{([a-z_]+)\}|#([SIPD])")
+_ALIASES: dict[str, str] = {
+    "S": "session_name",
+    "I": "window_index",
+    "P": "pane_index",
+    "D": "pane_id",
+}
+
+
+class FakeTmuxError(Exception):
+    """Raised when a command fails, like tmux would."""
+
+
+def install(directory: str) -> dict[str, str]:
+    """Install the fake as `tmux` in `directory`.
+
+    Args:
+        directory: an existing directory.
+
+    Returns:
+        a copy of the environment with `directory` prepended to PATH.
+    """
+    link: str = os.path.join(directory, "tmux")
+    if not os.path.exists(link):
+        os.symlink(os.path.abspath(__file__), link)
+    os.chmod(os.path.abspath(__file__), 0o755)
+    env: dict[str, str] = dict(os.environ)
+    env["PATH"] = f"{directory}{os.pathsep}{env.get('PATH', '')}"
+    return env
+
+
+def make_panes() -> list[dict[str, str]]:
+    """Return the panes of the fake as dictionaries of format variables."""
+    count: int = int(os.environ.get("FAKE_TMUX_PANES", 4))
+    commands: list[str] = os.environ.get("FAKE_TMUX_COMMANDS", "bash").split(
+        ","
+    )
+    return [
+        {
+            "session_name": "bench",
+            "window_index": "0",
+            "pane_index": str(index),
+            "pane_id": f"%{index}",
+            "pane_pid": str(100000 + index),
+            "pane_tty": f"/dev/pts/{index}",
+            "pane_active": "1" if index == 0 else "0",
+            "pane_current_command": commands[index % len(commands)],
+        }
+        for index in range(count)
+    ]
+
+
+def expand(template: str, pane: dict[str, str]) -> str:
+    """Expand the tmux formats in `template` using the variables of `pane`.
+
+    Args:
+        template: a tmux format.
+        pane: the variables of a pane.
+
+    Returns:
+        the expanded format.
+    """
+    return _FORMAT.sub(
+        lambda match: pane.get(
+            match.group(1) or _ALIASES[match.group(2)], ""
+        ),
+        template,
+    )
+
+
+def resolve(
+    target: str | None, panes: list[dict[str, str]]
+) -> list[dict[str, str]]:
+    """Return the panes that `target` refers to.
+
+    A target without a pane index refers to the active pane of the window.
+
+    Args:
+        target: a tmux target, or None for the active pane.
+        panes: the panes of the fake.
+
+    Raises:
+        FakeTmuxError: when no pane matches the target.
+
+    Returns:
+        the panes that match.
+    """
+    active: str = os.environ.get("TMUX_PANE", "%0")
+    if not target:
+        target = active
+    if target.startswith("%"):
+        found: list[dict[str, str]] = [
+            pane for pane in panes if pane["pane_id"] == target
+        ]
+    else:
+        session, _, rest = target.partition(":")
+        window, _, index = rest.partition(".")
+        found = [
+            pane
+            for pane in panes
+            if session in ("", pane["session_name"])
+            and window in ("", pane["window_index"])
+            and index in ("", pane["pane_index"])
+            and (index or pane["pane_active"] == "1")
+        ]
+    if not found:
+        raise FakeTmuxError(f"can't find pane: {target}")
+    return found
+
+
+def run(args: list[str], panes: list[dict[str, str]]) -> list[str]:
+    """Run a single tmux command.
+
+    Args:
+        args: the arguments of the command.
+        panes: the panes of the fake.
+
+    Raises:
+        FakeTmuxError: when the command fails.
+
+    Returns:
+        the lines of output of the command.
+    """
+    if os.environ.get("FAKE_TMUX_LOG"):
+        with open(os.environ["FAKE_TMUX_LOG"], "a") as log:
+            log.write(shlex.join(args) + "\n")
+
+    name, options, positional = args[0], {}, []
+    iterator = iter(args[1:])
+    for arg in iterator:
+        if arg in ("-t", "-F", "-b", "-L", "-S"):
+            options[arg] = next(iterator)
+        elif arg.startswith("-") and len(arg) > 1 and not positional:
+            options.update({f"-{flag}": "" for flag in arg[1:]})
+        else:
+            positional.append(arg)
+
+    if name == "display-message":
+        pane: dict[str, str] = resolve(options.get("-t"), panes)[0]
+        return [expand(positional[0] if positional else "", pane)]
+
+    elif name == "list-panes":
+        template: str = options.get(
+            "-F", "#{pane_index}: #{pane_current_command}"
+        )
+        selected: list[dict[str, str]] = (
+            panes
+            if "-a" in options or "-s" in options
+            else [
+                pane
+                for pane in panes
+                if pane["window_index"]
+                == resolve(options.get("-t"), panes)[0]["window_index"]
+            ]
+        )
+        return [expand(template, pane) for pane in selected]
+
+    elif name in ("send-keys", "paste-buffer", "select-pane"):
+        resolve(options.get("-t"), panes)
+        return []
+
+    elif name in ("load-buffer", "set-buffer", "delete-buffer"):
+        if "-" in positional:
+            sys.stdin.buffer.read()
+        return []
+
+    raise FakeTmuxError(f"unknown command {name}")
+
+
+def split(args: list[str]) -> list[list[str]]:
+    """Split a command sequence on `;`, like tmux does.
+
+    Args:
+        args: the arguments of the command sequence.
+
+    Returns:
+        the arguments of each command.
+    """
+    commands: list[list[str]] = [[]]
+    for arg in args:
+        if arg == ";":
+            commands.append([])
+        elif arg.endswith("\\;"):
+            commands[-1].append(arg[:-2] + ";")
+        elif arg.endswith(";"):
+            commands[-1].append(arg[:-1])
+            commands.append([])
+        else:
+            commands[-1].append(arg)
+    return [command for command in commands if command]
+
+
+def control_mode(panes: list[dict[str, str]], latency: float) -> int:
+    """Serve commands from stdin like `tmux -C` does. Each line must hold a
+    single command.
+
+    Args:
+        panes: the panes of the fake.
+        latency: the time each command takes in seconds.
+
+    Returns:
+        the exit status.
+    """
+    number: int = 0
+
+    def reply(lines: list[str], success: bool, flags: int) -> None:
+        stamp: int = int(time.time())
+        end: str = "%end" if success else "%error"
+        body: str = "".join(f"{line}\n" for line in lines)
+        sys.stdout.write(
+            f"%begin {stamp} {number} {flags}\n{body}"
+            f"{end} {stamp} {number} {flags}\n"
+        )
+
+    reply([], True, 0)
+    sys.stdout.flush()
+    for line in sys.stdin:
+        number += 1
+        time.sleep(latency)
+        try:
+            reply(run(shlex.split(line), panes), True, 1)
+        except FakeTmuxError as error:
+            reply([str(error)], False, 1)
+        sys.stdout.flush()
+
+    sys.stdout.write("%exit\n")
+    return 0
+
+
+def main() -> int:
+    """Entry point of the fake tmux."""
+    latency: float = float(os.environ.get("FAKE_TMUX_LATENCY_MS", 0)) / 1000
+    panes: list[dict[str, str]] = make_panes()
+    args: list[str] = sys.argv[1:]
+    while args and args[0] in ("-L", "-S"):
+        args = args[2:]
+
+    if args[:1] == ["-C"]:
+        return control_mode(panes, latency)
+
+    time.sleep(latency)
+    output: list[str] = []
+    for command in split(args):
+        try:
+            output.extend(run(command, panes))
+        except FakeTmuxError as error:
+            sys.stdout.write("".join(f"{line}\n" for line in output))
+            sys.stderr.write(f"{error}\n")
+            return 1
+
+    sys.stdout.write("".join(f"{line}\n" for line in output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
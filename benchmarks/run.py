@@ -0,0 +1,254 @@
+"""Benchmarks of key2pane against a fake tmux.
+
+The benchmarks install `benchmarks/fake_tmux.py` as `tmux` on PATH, so they
+measure key2pane itself instead of a tmux server, and can be run anywhere:
+
+    python -m benchmarks.run --output report.json
+
+The report is a json file with the statistics of each benchmark. Passing a
+previous report using `--baseline` prints how each benchmark changed.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser, Namespace
+from collections.abc import Callable
+
+from benchmarks import fake_tmux
+from key2pane import tmux
+from key2pane.settings import Settings
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Return statistics of `samples`, which are durations in seconds.
+
+    Args:
+        samples: the durations.
+
+    Returns:
+        the number of samples, and the minimum, median, mean, and 95th
+        percentile in milliseconds.
+    """
+    ordered: list[float] = sorted(sample * 1000 for sample in samples)
+    return {
+        "n": len(ordered),
+        "min_ms": ordered[0],
+        "median_ms": statistics.median(ordered),
+        "mean_ms": statistics.fmean(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+    }
+
+
+def measure(function: Callable[[], object], repeat: int) -> list[float]:
+    """Return the duration of `repeat` calls of `function`.
+
+    Args:
+        function: the function to call.
+        repeat: the number of calls.
+
+    Returns:
+        the duration of each call in seconds.
+    """
+    samples: list[float] = []
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def make_actions(count: int) -> list[dict[str, str | list[str]]]:
+    """Return `count` actions, of which one matches the commands of the fake
+    tmux panes.
+
+    Args:
+        count: the number of actions.
+
+    Returns:
+        the actions.
+    """
+    actions: list[dict[str, str | list[str]]] = [
+        {"regex": "bash|zsh|fish", "keys": ["echo '{0}'", "Enter"]}
+    ]
+    for index in range(1, count):
+        regex: str = f"tool{index}" if index % 2 else f"repl{index}[0-9.]*$"
+        actions.append({"regex": regex, "keys": [f"{index} {{0}}", "Enter"]})
+    return actions
+
+
+def bench_cli(args: Namespace, argv: list[str]) -> dict[str, float]:
+    """Measure the latency of `key2pane`, from process start to exit."""
+    command: list[str] = [sys.executable, "-m", "key2pane", *argv]
+    return summarize(
+        measure(lambda: subprocess.run(command, check=True), args.repeat)
+    )
+
+
+def bench_client(args: Namespace, argv: list[str]) -> dict[str, float]:
+    """Measure the latency of `key2pane-client` with a running daemon."""
+    daemon: subprocess.Popen[bytes] = subprocess.Popen(
+        [sys.executable, "-m", "key2pane", "serve", "--logfile", args.logfile]
+    )
+    try:
+        deadline: float = time.monotonic() + 10
+        while not os.path.exists(os.environ["KEY2PANE_SOCKET"]):
+            if time.monotonic() > deadline or daemon.poll() is not None:
+                raise RuntimeError("key2pane serve did not start")
+            time.sleep(0.01)
+
+        command: list[str] = [sys.executable, "-m", "key2pane.client", *argv]
+        return summarize(
+            measure(lambda: subprocess.run(command, check=True), args.repeat)
+        )
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+
+def bench_get_keys(args: Namespace) -> dict[str, float]:
+    """Measure `Settings.get_keys` with `args.actions` actions."""
+    settings: Settings = Settings(
+        0, 0, "bench", False, make_actions(args.actions), ["foo"]
+    )
+    repl: int = (args.actions - 1) // 2 * 2
+    commands: list[str] = ["bash", "tool1", f"repl{repl}3.1"][
+        : min(3, args.actions)
+    ]
+    calls: int = 1000
+
+    def run() -> None:
+        for index in range(calls):
+            settings.get_keys(commands[index % len(commands)])
+
+    result: dict[str, float] = summarize(measure(run, args.repeat))
+    result["calls_per_s"] = calls / (result["median_ms"] / 1000)
+    return result
+
+
+def bench_send(args: Namespace, backend: str) -> dict[str, float]:
+    """Measure `Pane.send` using the backend `backend`, e.g. with a tmux
+    client for each send, or with a single tmux client in control mode."""
+    sends: int = 20
+
+    with tmux.using(backend):
+        pane: tmux.Pane = tmux.Pane.from_active()
+
+        def run() -> None:
+            for _ in range(sends):
+                pane.send(["echo 'foo'", "Enter"], reset=True)
+
+        samples: list[float] = measure(run, args.repeat)
+
+    result: dict[str, float] = summarize(samples)
+    result["sends_per_s"] = sends / (result["median_ms"] / 1000)
+    return result
+
+
+def compare(report: dict, baseline: dict) -> None:
+    """Print the median of each benchmark in `report`, relative to
+    `baseline`.
+
+    Args:
+        report: the current report.
+        baseline: a previous report.
+    """
+    for name, result in report["results"].items():
+        before: dict[str, float] | None = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<16} {result['median_ms']:10.3f} ms")
+        else:
+            ratio: float = result["median_ms"] / before["median_ms"]
+            print(
+                f"{name:<16} {result['median_ms']:10.3f} ms "
+                f"({ratio:.2f}x of {before['median_ms']:.3f} ms)"
+            )
+
+
+def make_parser() -> ArgumentParser:
+    """Return an ArgumentParser for the benchmarks."""
+    parser: ArgumentParser = ArgumentParser(description=__doc__)
+    parser.add_argument("--output", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Compare with this report")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--actions", type=int, default=2000)
+    parser.add_argument("--panes", type=int, default=4)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0,
+        help="The latency of the fake tmux in milliseconds",
+    )
+    return parser
+
+
+def run_all(args: Namespace) -> dict[str, dict[str, float]]:
+    """Run all benchmarks against a fake tmux, which is configured through
+    the environment of this process."""
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update(fake_tmux.install(directory))
+        os.environ.update(
+            FAKE_TMUX_PANES=str(args.panes),
+            FAKE_TMUX_LATENCY_MS=str(args.latency),
+            TMUX_PANE="%0",
+            XDG_CACHE_HOME=os.path.join(directory, "cache"),
+            KEY2PANE_SOCKET=os.path.join(directory, "key2pane.sock"),
+        )
+        args.logfile = os.path.join(directory, "key2pane.log")
+        config: str = os.path.join(directory, "config.json")
+        with open(config, "w") as file:
+            json.dump(
+                {"reset": False, "actions": make_actions(args.actions)}, file
+            )
+
+        argv = ["--config", config, "--logfile", args.logfile, "foo"]
+        return {
+            "cli": bench_cli(args, argv),
+            "cli_control_mode": bench_cli(args, ["--control-mode", *argv]),
+            "cli_memory": bench_cli(args, ["--backend", "memory", *argv]),
+            "client": bench_client(args, argv),
+            "get_keys": bench_get_keys(args),
+            "send": bench_send(args, "subprocess"),
+            "send_control_mode": bench_send(args, "control"),
+            "send_memory": bench_send(args, "memory"),
+        }
+
+
+def main(argv: list[str] | None = None) -> dict:
+    """Run all benchmarks and return the report."""
+    args: Namespace = make_parser().parse_args(argv)
+    environ: dict[str, str] = dict(os.environ)
+    try:
+        results: dict[str, dict[str, float]] = run_all(args)
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+
+    report: dict = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat,
+            "actions": args.actions,
+            "panes": args.panes,
+            "latency_ms": args.latency,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(report, json.load(file))
+    return report
+
+
+if __name__ == "__main__":
+    main()
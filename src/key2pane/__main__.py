@@ -1,13 +1,45 @@
+from __future__ import annotations
+
 import logging
+import os
+import re
 import sys
-from argparse import Namespace
+import time
+from contextlib import ExitStack, nullcontext
 from copy import copy
-from pprint import pformat
 from types import TracebackType
 
 from key2pane.cli import make_parser, set_logging
-from key2pane.settings import Settings, SettingsError, load_config
-from key2pane.tmux import Pane, TmuxError
+from key2pane.errors import SettingsError
+from key2pane.log import Pretty
+from key2pane.tmux import (
+    BACKENDS,
+    Pane,
+    PaneIndex,
+    Subprocess,
+    TmuxError,
+    indexed,
+    list_servers,
+    on_server,
+    send_many,
+    using,
+)
+from key2pane.trace import record, span, tracing
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from argparse import Namespace
+    from collections.abc import Iterable, Sequence
+    from typing import IO, Any, Callable
+
+    from key2pane.backend import Backend
+    from key2pane.capture import Capture
+    from key2pane.payload import Payload
+    from key2pane.schema import Action
+    from key2pane.settings import Settings
+
+SNAPSHOT_TTL: float = 1.0
+WORKERS: int = 16
 
 EXPECTED: dict[type[BaseException], str] = {
     SettingsError: "An error occurred while processing the settings.",
@@ -20,18 +52,24 @@ EXPECTED: dict[type[BaseException], str] = {
 
 
 def except_hook(
-    exc_type: type[BaseException], exc_value: BaseException, tb: TracebackType
+    exc_type: type[BaseException],
+    exc_value: BaseException,
+    tb: TracebackType | None,
 ):
     """Process exceptions.
 
-    Expected exceptions are logged as errors. Unexpected exceptions are logged
-    as critical and the traceback is included.
+    Expected exceptions are logged as errors, followed by their message,
+    e.g. the location of an invalid value in the config file. Unexpected
+    exceptions are logged as critical and the traceback is included.
 
     Returns:
         0 if successful, 1 if an error occurred.
     """
     if exc_type in EXPECTED:
-        logging.error("%s", EXPECTED[exc_type])
+        message: str = str(exc_value)
+        logging.error(
+            "%s %s" if message else "%s%s", EXPECTED[exc_type], message
+        )
     else:
         logging.critical(
             "An unexpected error occurred.", exc_info=(exc_type, exc_value, tb)
@@ -39,47 +77,741 @@ def except_hook(
     return 1
 
 
+def load_compiled_config(path: str) -> dict[str, Any]:
+    """Return the compiled config file at `path`, see
+    `key2pane.settings.load_compiled_config`. The settings module, which
+    compiles the config, is only imported when the config is loaded.
+    """
+    from key2pane.settings import load_compiled_config as load
+
+    return load(path)
+
+
 def main():
     """Entry point for key2pane."""
     sys.excepthook = except_hook
+    if sys.argv[1:2] == ["serve"]:
+        from key2pane.server import serve
+
+        return serve(sys.argv[2:])
+
+    start: int = time.perf_counter_ns()
     args: Namespace = make_parser().parse_args()
-    set_logging(args.loglevel, args.logfile)
-    logging.debug("Arguments:\n%s", pformat(vars(args)))
+    with tracing(args.trace, args.trace_format):
+        record("parse_args", start)
+        set_logging(args.loglevel, args.logfile)
+        run(args)
+
+
+def run(
+    args: Namespace,
+    active: str | None = None,
+    loader: Callable[[str], dict[str, Any]] = load_compiled_config,
+    snapshot: Callable[[str | None], PaneIndex] = PaneIndex.snapshot,
+) -> None:
+    """Send the keys that are selected by `args` to the target pane of the
+    tmux server that is selected by `args`, or by the config file, using the
+    backend that is selected by `args`, or by the config file.
+
+    When several servers are selected, they are handled concurrently by
+    `fan_out`. When neither selects a backend, the current backend is kept,
+    unless a single tmux client in control mode is preferred, e.g. for
+    `--stdin`.
+
+    Args:
+        args: the command line arguments.
+        active: the tmux target of the pane that is considered active. If
+            None, tmux decides which pane is active, or $TMUX_PANE for the
+            control backend. It is overridden by `args.target`, and ignored
+            when a server, or the memory backend, is selected.
+        loader: the function that loads the config file.
+        snapshot: the function that returns the snapshot of the panes, in
+            which the given target is active. It is ignored when a server,
+            or the memory backend, is selected.
+
+    Raises:
+        SettingsError: when the backend is unknown.
+    """
+    logging.debug("Arguments:\n%s", Pretty(vars(args)))
+
+    with span("load_config", path=args.config):
+        config: dict[str, Any] = loader(args.config)
+    loader = lambda path: config  # noqa: E731
+
+    servers: list[str] = list_servers() if args.all_servers else args.servers
+    if not servers and not args.all_servers:
+        servers = list(map(os.path.expanduser, config.get("servers") or []))
+
+    backend: str | None = (
+        args.backend
+        or ("control" if args.control_mode else None)
+        or config.get("backend")
+        or ("control" if args.stdin or args.capture else None)
+    )
+    if backend is not None and backend not in BACKENDS:
+        raise SettingsError(f"Unknown backend: {backend}")
+
+    if args.all_servers and not servers:
+        raise TmuxError("No tmux server found")
+    elif len(servers) > 1 or args.all_servers:
+        fan_out(args, servers, loader)
+        return
+
+    if servers or backend == "memory":
+        active, snapshot = None, PaneIndex.snapshot
+        backend = backend or "subprocess"
+    elif backend == "control":
+        active = active or os.environ.get("TMUX_PANE")
+    with on_server(servers[0]) if servers else nullcontext():
+        with using(backend):
+            send(args, active, loader, snapshot)
+
+
+def send(
+    args: Namespace,
+    active: str | None = None,
+    loader: Callable[[str], dict[str, Any]] = load_compiled_config,
+    snapshot: Callable[[str | None], PaneIndex] = PaneIndex.snapshot,
+) -> None:
+    """Send the keys that are selected by `args` to the target pane.
+
+    All panes are retrieved from tmux in a single snapshot, against which
+    every pane of the run is resolved.
+
+    Args:
+        args: the command line arguments.
+        active: the tmux target of the pane that is considered active. If
+            None, tmux decides which pane is active. It is overridden by
+            `args.target`.
+        loader: the function that loads the config file.
+        snapshot: the function that returns the snapshot of the panes, in
+            which the given target is active. A broadcast always queries
+            tmux, as it may need the panes of all sessions.
+    """
+    if args.stdin:
+        stream(args, active, loader, snapshot)
+        return
+    if args.broadcast:
+        snapshot = PaneIndex.snapshot
+    with span("snapshot"):
+        panes: PaneIndex = snapshot(args.target or active)
+    with indexed(panes):
+        active_pane: Pane | None = panes.active
+        settings: Settings = make_settings(args, active_pane, loader)
+        if args.broadcast:
+            if args.capture:
+                raise SettingsError(
+                    "--capture cannot be combined with a broadcast"
+                )
+            broadcast(args, settings, panes)
+            return
+
+        target_pane: Pane = Pane(
+            settings.session, settings.window, settings.index
+        )
+        logging.info("Target pane: %s", target_pane)
+
+        with span("get_keys"):
+            action: Action = settings.match(command_of(target_pane, settings))
+            keys: list[str] = settings.render(action)
+        if args.dry_run:
+            logging.warning("Dry run; not sending keys")
+            print(*keys)
+            return
+
+        reset: bool = settings.reset
+        if args.payload is None:
+            coalesced: tuple[list[str], bool] | None = coalesce_keys(
+                target_pane, action, keys, reset, settings
+            )
+            if coalesced is None:
+                return
+            keys, reset = coalesced
+
+        capture: Capture | None = None
+        if args.capture:
+            from key2pane.capture import Capture
+
+            until: re.Pattern[str] | None = None
+            if args.capture_until:
+                try:
+                    until = re.compile(args.capture_until)
+                except re.error as error:
+                    raise SettingsError(
+                        f"Invalid regex: {args.capture_until}"
+                    ) from error
+            capture = Capture(target_pane.target, until, args.capture_idle)
+
+        from key2pane.payload import open_payload
+
+        with open_payload(
+            args.payload, args.paste_threshold, args.bracketed_paste
+        ) as payload:
+            deliver(
+                target_pane, action, keys, reset, settings, payload, capture
+            )
+
+
+def deliver(
+    pane: Pane,
+    action: Action,
+    keys: list[str],
+    reset: bool,
+    settings: Settings,
+    payload: Payload | None = None,
+    capture: Capture | None = None,
+) -> None:
+    """Send keys to a pane while no other key2pane process sends to it.
+
+    After a reset, the keys are sent as soon as the pane is ready for them,
+    see `key2pane.ready`. The output of the keys is captured while the pane
+    is still held, so it does not mix with that of other sends.
+
+    Args:
+        pane: the pane.
+        action: the action of which the keys are sent.
+        keys: the keys to send.
+        reset: whether to send a C-c first.
+        settings: the settings, which determine how long to wait for the
+            pane.
+        payload: contents to paste before the keys are sent.
+        capture: the capture that writes the output of the keys, if any.
+    """
+    from key2pane.lock import pane_lock
+
+    with pane_lock(pane.key, settings.lock_timeout), span(
+        "send"
+    ):
+        if reset and settings.ready_timeout:
+            reset_panes([(pane, action)], settings)
+            reset = False
+        if capture is not None:
+            capture.mark()
+        pane.send(keys, reset, payload)
+        if capture is not None:
+            capture.follow()
+
+
+def reset_panes(
+    resets: list[tuple[Pane, Action]],
+    settings: Settings,
+    backend: Backend | None = None,
+) -> None:
+    """Reset panes and wait until each of them is ready for the keys of its
+    action, see `key2pane.ready.reset`. Several panes are waited for in
+    parallel, see `in_parallel`.
+
+    Args:
+        resets: each pane, and the action of which the keys are sent next.
+        settings: the settings, which determine how long to wait for each
+            pane, and whether its command is checked against the action.
+        backend: the backend that resets and queries the panes. If None,
+            the backend that is set using `key2pane.tmux.connected` is used.
+
+    Raises:
+        TmuxError: when a pane cannot be reset or queried.
+    """
+    from key2pane.ready import reset
+
+    def wait(pane: Pane, action: Action) -> bool:
+        pattern: re.Pattern[str] | None = (
+            action.pattern if settings.resolver == "tmux" else None
+        )
+        return reset(
+            pane.target, pattern, settings.ready_timeout, backend=backend
+        )
+
+    in_parallel(wait, resets)
+
+
+def coalesce_keys(
+    pane: Pane,
+    action: Action,
+    keys: list[str],
+    reset: bool,
+    settings: Settings,
+) -> tuple[list[str], bool] | None:
+    """Decide which keys are sent to a pane now, see
+    `key2pane.coalesce.coalesce`, if the action has a coalescing window.
+
+    Args:
+        pane: the pane.
+        action: the action of which the keys are sent.
+        keys: the keys to send.
+        reset: whether to send a C-c first.
+        settings: the settings, which determine the coalescing window.
+
+    Returns:
+        the keys, and whether to send a C-c first, that must be sent now.
+        None if nothing needs to be sent.
+    """
+    window: int = settings.window_of(action)
+    if not window:
+        return keys, reset
+
+    from key2pane.coalesce import coalesce
+
+    coalesced: tuple[list[str], bool] | None = coalesce(
+        pane.key, keys, reset, window
+    )
+    if coalesced is None:
+        logging.info("Coalesced the keys for %s", pane)
+    return coalesced
+
+
+def coalesce_many(
+    deliveries: list[tuple[Pane, Action, list[str], bool]],
+    settings: Settings,
+) -> list[tuple[Pane, Action, list[str], bool]]:
+    """Decide which keys are sent to each pane now, see `coalesce_keys`.
+    The panes are coalesced in parallel, by at most `WORKERS` threads, as
+    coalescing may wait for the window to pass.
+
+    Args:
+        deliveries: each pane, the action of which the keys are sent, the
+            keys, and whether to send a C-c first.
+        settings: the settings, which determine the coalescing windows.
+
+    Returns:
+        the deliveries that must be sent now, of which the keys and the
+        reset are replaced by those that were coalesced.
+    """
+    results: list[tuple[list[str], bool] | None] = in_parallel(
+        lambda pane, action, keys, reset: coalesce_keys(
+            pane, action, keys, reset, settings
+        ),
+        deliveries,
+    )
+    return [
+        (pane, action, *result)
+        for (pane, action, _, _), result in zip(deliveries, results)
+        if result is not None
+    ]
 
-    settings: Settings = make_settings(args)
-    target_pane: Pane = Pane(settings.session, settings.window, settings.index)
-    logging.info("Target pane: %s", target_pane)
 
-    keys: list[str] = settings.get_keys(target_pane.command)
+def in_parallel(
+    function: Callable[..., Any], calls: Sequence[tuple[Any, ...]]
+) -> list[Any]:
+    """Call `function` with the arguments of each call, by at most `WORKERS`
+    threads, and return the results in order. A single call is made in the
+    current thread.
+
+    Args:
+        function: the function.
+        calls: the arguments of each call.
+
+    Returns:
+        the result of each call.
+    """
+    if len(calls) <= 1:
+        return [function(*args) for args in calls]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(min(len(calls), WORKERS)) as pool:
+        return list(pool.map(function, *zip(*calls)))
+
+
+def select(
+    args: Namespace, settings: Settings, panes: Iterable[Pane]
+) -> list[Pane]:
+    """Return the panes in the scope of `args.broadcast`, of which the
+    command matches `args.filter`.
+
+    Args:
+        args: the command line arguments.
+        settings: the settings, of which the session and window determine
+            the panes in the scope.
+        panes: all panes.
+
+    Raises:
+        SettingsError: when the filter is invalid.
+
+    Returns:
+        the panes.
+    """
+    scopes: dict[str, Callable[[Pane], bool]] = {
+        "window": lambda pane: (pane.session, pane.window)
+        == (settings.session, settings.window),
+        "session": lambda pane: pane.session == settings.session,
+        "all": lambda pane: True,
+    }
+    selected: list[Pane] = list(filter(scopes[args.broadcast], panes))
+    if args.filter:
+        try:
+            pattern: re.Pattern[str] = re.compile(args.filter)
+        except re.error as error:
+            raise SettingsError(f"Invalid regex: {args.filter}") from error
+        selected = [pane for pane in selected if pattern.match(pane.command)]
+    return selected
+
+
+def broadcast(args: Namespace, settings: Settings, panes: PaneIndex) -> None:
+    """Send keys to every pane in the scope of `args.broadcast`.
+
+    The keys of each pane are based on its own command, and are resolved
+    once for each distinct command. Then, all keys are sent using a single
+    tmux client, while the panes are held, see `key2pane.lock.pane_locks`.
+    Bursts of sends to a pane are coalesced, see `coalesce_keys`, and after
+    a reset, the keys are sent once every pane is ready for them, see
+    `reset_panes`.
+
+    Args:
+        args: the command line arguments.
+        settings: the settings, of which the session and window determine
+            the panes in the scope.
+        panes: the snapshot of all panes.
+
+    Raises:
+        SettingsError: when the filter is invalid, or when no keys can be
+            sent to any pane.
+    """
+    selected: list[Pane] = select(args, settings, panes)
+
+    actions: dict[str, tuple[Action, list[str]] | None] = {}
+    deliveries: list[tuple[Pane, Action, list[str], bool]] = []
+    with span("get_keys", panes=len(selected)):
+        for pane in selected:
+            command: str = command_of(pane, settings)
+            if command not in actions:
+                try:
+                    action: Action = settings.match(command)
+                    actions[command] = action, settings.render(action)
+                except SettingsError as error:
+                    logging.info("Skipping %s: %s", command, error)
+                    actions[command] = None
+
+            found: tuple[Action, list[str]] | None = actions[command]
+            if found is not None:
+                deliveries.append((pane, *found, settings.reset))
+
+    if not deliveries:
+        targets: str = ", ".join(str(pane) for pane in selected)
+        raise SettingsError(f"No keys to send to any of the panes: {targets}")
+    elif args.dry_run:
+        logging.warning("Dry run; not sending keys")
+        for pane, _, keys, _ in deliveries:
+            print(f"{pane}:", *keys)
+        return
+    elif args.payload is None:
+        deliveries = coalesce_many(deliveries, settings)
+
+    from key2pane.lock import pane_locks
+    from key2pane.payload import open_payload
+
+    with pane_locks(
+        (pane.key for pane, *_ in deliveries), settings.lock_timeout
+    ), span("send", panes=len(deliveries)), open_payload(
+        args.payload, args.paste_threshold, args.bracketed_paste
+    ) as payload:
+        for reset, group in by_reset(deliveries):
+            if reset and settings.ready_timeout:
+                reset_panes(
+                    [(pane, action) for pane, action, *_ in group], settings
+                )
+                reset = False
+            send_many(
+                [(pane, keys) for pane, _, keys, _ in group], reset, payload
+            )
+
+
+def by_reset(
+    deliveries: list[tuple[Pane, Action, list[str], bool]],
+) -> list[tuple[bool, list[tuple[Pane, Action, list[str], bool]]]]:
+    """Group deliveries by whether a C-c is sent first, which may differ
+    between panes after coalescing.
+
+    Args:
+        deliveries: each pane, the action of which the keys are sent, the
+            keys, and whether to send a C-c first.
+
+    Returns:
+        whether to send a C-c first, and the deliveries of which that is
+        the case, for each group that is not empty.
+    """
+    groups: list[tuple[bool, list[tuple[Pane, Action, list[str], bool]]]] = [
+        (reset, [delivery for delivery in deliveries if delivery[3] is reset])
+        for reset in (True, False)
+    ]
+    return [(reset, group) for reset, group in groups if group]
+
+
+def fan_out(
+    args: Namespace,
+    servers: list[str],
+    loader: Callable[[str], dict[str, Any]] = load_compiled_config,
+) -> None:
+    """Send keys to the target pane of each tmux server concurrently.
+
+    Each server is queried and sent to using its own control mode client,
+    so a slow or unreachable server does not delay the others. The panes of
+    a server are held while their keys are sent. Like in a broadcast, the
+    sends are coalesced, and after a reset, the keys are sent once the panes
+    are ready for them. For each pane that received keys, a line
+    `server<TAB>ok<TAB>pane<TAB>keys` is printed, and for each server that
+    failed, a line `server<TAB>error<TAB>message`.
+
+    Args:
+        args: the command line arguments.
+        servers: the tmux servers, see `key2pane.tmux.server_args`.
+        loader: the function that loads the config file.
+
+    Raises:
+        SettingsError: when a payload, `--stdin`, or `--capture` is given,
+            which are not supported for several servers, or when a server
+            failed.
+    """
+    import asyncio
+
+    from key2pane import aio
+    from key2pane.lock import pane_locks
+
+    for option in ("payload", "stdin", "capture"):
+        if getattr(args, option):
+            raise SettingsError(
+                f"--{option} cannot be used with several servers"
+            )
+
+    async def server_sends(server: str) -> list[tuple[Pane, list[str]]]:
+        async with aio.control_mode(server=server) as client:
+            panes: PaneIndex = await client.snapshot(args.target)
+            settings: Settings = make_settings(args, panes.active, loader)
+            if args.broadcast:
+                selected: list[Pane] = select(args, settings, panes)
+            else:
+                address: tuple[str, int, int] = (
+                    settings.session,
+                    settings.window,
+                    settings.index,
+                )
+                pane: Pane | None = panes.get(*address)
+                if pane is None:
+                    raise TmuxError("Pane {}:{}.{} not found".format(*address))
+                selected = [pane]
+            deliveries: list[tuple[Pane, Action, list[str], bool]] = []
+            for pane in selected:
+                try:
+                    action: Action = settings.match(command_of(pane, settings))
+                    keys: list[str] = settings.render(action)
+                except SettingsError as error:
+                    if not args.broadcast:
+                        raise
+                    logging.info("Skipping %s: %s", pane, error)
+                else:
+                    deliveries.append((pane, action, keys, settings.reset))
+            if not deliveries:
+                raise SettingsError("No keys to send to any of the panes")
+            elif not args.dry_run:
+                deliveries = await asyncio.to_thread(
+                    coalesce_many, deliveries, settings
+                )
+                await send_to(client, server, settings, deliveries)
+        return [(pane, keys) for pane, _, keys, _ in deliveries]
+
+    async def send_to(
+        client: aio.Client,
+        server: str,
+        settings: Settings,
+        deliveries: list[tuple[Pane, Action, list[str], bool]],
+    ) -> None:
+        with ExitStack() as stack:
+            await asyncio.to_thread(
+                stack.enter_context,
+                pane_locks(
+                    [pane.key for pane, *_ in deliveries],
+                    settings.lock_timeout,
+                ),
+            )
+            for reset, group in by_reset(deliveries):
+                if reset and settings.ready_timeout:
+                    await asyncio.to_thread(
+                        reset_panes,
+                        [(pane, action) for pane, action, *_ in group],
+                        settings,
+                        Subprocess(server),
+                    )
+                    reset = False
+                await client.send_many(
+                    [(pane, keys) for pane, _, keys, _ in group], reset
+                )
+
+    async def gather() -> list[list[tuple[Pane, list[str]]] | BaseException]:
+        return await asyncio.gather(
+            *(server_sends(server) for server in servers),
+            return_exceptions=True,
+        )
+
     if args.dry_run:
         logging.warning("Dry run; not sending keys")
-        print(*keys)
-    else:
-        target_pane.send(keys, settings.reset)
+    with span("fan_out", servers=len(servers)) as current:
+        outcomes = asyncio.run(gather())
+        failures: int = 0
+        for server, outcome in zip(servers, outcomes):
+            if isinstance(outcome, BaseException):
+                failures += 1
+                print(server, "error", outcome, sep="\t")
+                continue
+            for pane, keys in outcome:
+                print(server, "ok", pane, " ".join(keys), sep="\t")
+        current.set("failures", failures)
 
+    if failures:
+        raise SettingsError(f"{failures} of {len(servers)} servers failed")
 
-def make_settings(args: Namespace) -> Settings:
+
+def stream(
+    args: Namespace,
+    active: str | None = None,
+    loader: Callable[[str], dict[str, Any]] = load_compiled_config,
+    snapshot: Callable[[str | None], PaneIndex] = PaneIndex.snapshot,
+    source: IO[bytes] | None = None,
+) -> None:
+    """Send keys for each record that is read from stdin, in order.
+
+    The config is loaded once. The snapshot of the panes is reused for the
+    records that follow within `SNAPSHOT_TTL` seconds, and is taken again
+    when a record targets a pane that it does not hold by id. For each
+    record, a line with its number, `ok` or `error`, and the target pane or
+    the error is written to stdout. In a dry run, the keys are added to the
+    line instead of being sent. Like for a single send, bursts of records
+    for the same pane are coalesced, see `coalesce_keys`.
+
+    Args:
+        args: the command line arguments, of which the positional arguments
+            and the target are replaced by those of each record.
+        active: the tmux target of the pane that is considered active.
+        loader: the function that loads the config file.
+        snapshot: the function that returns the snapshot of the panes.
+        source: the stream to read the records from. Defaults to stdin.
+
+    Raises:
+        SettingsError: when a payload is given, as stdin holds the records,
+            or when one or more records failed.
+    """
+    from key2pane.records import parse_record, read_records
+
+    if args.payload is not None:
+        raise SettingsError("A payload cannot be combined with --stdin")
+    elif args.capture:
+        raise SettingsError("--capture cannot be combined with --stdin")
+
+    with span("load_config", path=args.config):
+        config: dict[str, Any] = loader(args.config)
+    default: str | None = args.target or active
+    panes: PaneIndex | None = None
+    taken: float = 0.0
+
+    failures: int = 0
+    number: int = 0
+    delimiter: bytes = b"\0" if args.null else b"\n"
+    for number, line in enumerate(
+        read_records(source or sys.stdin.buffer, delimiter), 1
+    ):
+        try:
+            target, positional = parse_record(line)
+            wanted: str | None = target or default
+            view: PaneIndex | None = None
+            if panes is not None and time.monotonic() - taken < SNAPSHOT_TTL:
+                view = panes.activate(wanted) if wanted else panes
+            if view is None or view.active is None:
+                with span("snapshot"):
+                    view = panes = snapshot(wanted)
+                taken = time.monotonic()
+            if default is None and view.active is not None:
+                default = view.active.id
+
+            with indexed(view):
+                record_args: Namespace = copy(args)
+                record_args.target = target or args.target
+                record_args.positional = positional
+                settings: Settings = make_settings(
+                    record_args, view.active, lambda path: config
+                )
+                pane: Pane = Pane(
+                    settings.session, settings.window, settings.index
+                )
+                with span("get_keys"):
+                    action: Action = settings.match(command_of(pane, settings))
+                    keys: list[str] = settings.render(action)
+                if not args.dry_run:
+                    coalesced: tuple[list[str], bool] | None = coalesce_keys(
+                        pane, action, keys, settings.reset, settings
+                    )
+                    if coalesced is not None:
+                        deliver(pane, action, *coalesced, settings)
+        except (SettingsError, TmuxError) as error:
+            failures += 1
+            logging.info("Record %s failed: %s", number, error)
+            print(number, "error", error, sep="\t", flush=True)
+        else:
+            sent: list[str] = keys if args.dry_run else []
+            print(number, "ok", pane, *sent, sep="\t", flush=True)
+
+    if failures:
+        raise SettingsError(f"{failures} of {number} records failed")
+
+
+def command_of(pane: Pane, settings: Settings) -> str:
+    """Return the command of `pane` that is matched against the actions.
+
+    Args:
+        pane: the pane.
+        settings: the settings, of which the resolver determines how the
+            command is found.
+
+    Returns:
+        the command of the pane.
+    """
+    return pane.foreground() if settings.resolver == "proc" else pane.command
+
+
+def make_settings(
+    args: Namespace,
+    active_pane: Pane | None = None,
+    loader: Callable[[str], dict[str, Any]] = load_compiled_config,
+) -> Settings:
     """Return a Settings object based on the command line arguments, and the
     config file.
 
     Args:
         args: the command line arguments.
+        active_pane: the pane that provides the default session, window, and
+            index. If None, the active pane is retrieved from tmux. When
+            `args.target` is set, this must be the target pane, as its session,
+            window, and index take precedence over the config file.
+        loader: the function that loads the config file.
 
     Returns:
         the settings.
     """
-    active_pane: Pane = Pane.from_active()
-    defaults: dict[str, str | int] = copy(vars(args))
+    active_pane = active_pane or Pane.from_active(args.target)
+    defaults: dict[str, str | int] = dict(vars(args))
     defaults.update(active_pane.as_dict())
 
-    config: dict[str, str | int] = load_config(args.config)
+    with span("load_config", path=args.config):
+        config: dict[str, Any] = loader(args.config)
 
     overrides: dict[str, str | int] = dict(
         session=args.session,
         window=args.window,
         index=args.index,
         reset=args.reset,
+        resolver=args.resolver,
+        coalesce=args.coalesce,
+        lock_timeout=args.lock_timeout,
+        ready_timeout=args.ready_timeout,
+        variables={**config.get("variables", {}), **dict(args.var)}
+        if args.var
+        else None,
     )
+    if args.target:
+        overrides.update(
+            session=active_pane.session,
+            window=active_pane.window,
+            index=active_pane.index,
+        )
+
+    from key2pane.settings import Settings
 
     settings: Settings = Settings.from_dicts(defaults, config, overrides)
     logging.debug(
@@ -93,10 +825,10 @@ def make_settings(args: Namespace) -> Settings:
             ]
         ),
         active_pane,
-        pformat(defaults),
-        pformat(config),
-        pformat(overrides),
-        pformat(settings),
+        Pretty(defaults),
+        Pretty(config),
+        Pretty(overrides),
+        Pretty(settings),
     )
     return settings
 
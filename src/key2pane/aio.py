@@ -0,0 +1,513 @@
+"""An asyncio API for key2pane, for tools that run an event loop.
+
+The functions of `key2pane.tmux` block until tmux answers. Here, tmux is
+driven by a `Client`, which either starts a tmux client for each command
+using `asyncio.create_subprocess_exec`, or writes all commands to a single
+control mode client. A client can also be given one of the blocking
+backends of `key2pane.backend`, e.g. `Memory` in tests, which then executes
+all commands in a worker thread. The keys are selected using
+`Settings.get_keys`, so the same config gives the same keys as the command
+line interface:
+
+    async with control_mode() as client:
+        panes = await client.snapshot()
+        keys = await asyncio.gather(
+            *(client.send_keys(settings, pane) for pane in panes),
+            return_exceptions=True,
+        )
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+
+from key2pane.control import Replies, encode, unpack
+from key2pane.tmux import (
+    PANE_FORMAT,
+    Pane,
+    PaneIndex,
+    TmuxError,
+    chain,
+    send_commands,
+    split,
+    tmux_argv,
+)
+from key2pane.trace import span
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterable
+    from types import TracebackType
+
+    from key2pane.backend import Backend
+    from key2pane.settings import Settings
+
+_LIMIT: int = 1 << 20
+
+
+async def execute(*args: str, server: str | None = None) -> str:
+    """Execute a tmux command using a new tmux client and return the output.
+
+    Args:
+        *args: the arguments to pass to tmux.
+        server: the tmux server, see `key2pane.tmux.server_args`. If None,
+            the server that is set using `key2pane.tmux.on_server` is used.
+
+    Raises:
+        TmuxError: when tmux command fails.
+
+    Returns:
+        stdout of the tmux command.
+    """
+    with span("tmux.execute", argv=args) as current:
+        try:
+            process: asyncio.subprocess.Process = (
+                await asyncio.create_subprocess_exec(
+                    *tmux_argv(*args, server=server),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+            )
+        except OSError as error:
+            raise TmuxError("tmux could not be started") from error
+
+        stdout, stderr = await process.communicate()
+        current.set("status", process.returncode)
+        if process.returncode != 0:
+            logging.critical(stderr.decode("utf-8", "replace"))
+            raise TmuxError(f"tmux {' '.join(args)} failed")
+        return stdout.decode("utf-8", "replace").strip()
+
+
+class AsyncControlMode:
+    """A tmux client in control mode, driven by an event loop.
+
+    Like `key2pane.control.ControlMode`, commands are written to the stdin of
+    a single `tmux -C` client. Commands of concurrent tasks are written as
+    soon as they are issued, without waiting for the replies to earlier
+    commands. A reader task hands each reply to the command it belongs to,
+    as tmux replies in the order in which the commands were written.
+    """
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        """Initialize the AsyncControlMode. Use `start` instead, which also
+        starts the process.
+
+        Args:
+            process: the `tmux -C` process, of which stdin and stdout are
+                pipes.
+        """
+        self._process: asyncio.subprocess.Process = process
+        self._pending: deque[asyncio.Future[tuple[bool, str]]] = deque()
+        self._reader: asyncio.Task[None] = asyncio.ensure_future(
+            self._read()
+        )
+
+    @classmethod
+    async def start(
+        cls, *args: str, server: str | None = None
+    ) -> AsyncControlMode:
+        """Start a control mode client and wait until it is attached.
+
+        Args:
+            *args: extra arguments for `tmux attach-session`.
+            server: the tmux server, see `key2pane.tmux.server_args`.
+
+        Raises:
+            TmuxError: when the client cannot attach to a session.
+
+        Returns:
+            the client.
+        """
+        try:
+            process: asyncio.subprocess.Process = (
+                await asyncio.create_subprocess_exec(
+                    *tmux_argv(
+                        "-C",
+                        "attach-session",
+                        "-f",
+                        "no-output,ignore-size",
+                        *args,
+                        server=server,
+                    ),
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL,
+                    limit=_LIMIT,
+                )
+            )
+        except OSError as error:
+            raise TmuxError("tmux could not be started") from error
+
+        client: AsyncControlMode = cls(process)
+        attached: asyncio.Future[tuple[bool, str]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        client._pending.append(attached)
+        try:
+            success, output = await attached
+            if not success:
+                raise TmuxError(output)
+        except TmuxError:
+            await client.close()
+            raise
+        return client
+
+    @property
+    def alive(self) -> bool:
+        """Whether the control mode client is still running."""
+        return not self._reader.done()
+
+    async def execute(self, *args: str) -> str:
+        """Execute a tmux command and return the output.
+
+        Args:
+            *args: the arguments to pass to tmux.
+
+        Raises:
+            TmuxError: when tmux command fails.
+
+        Returns:
+            output of the tmux command.
+        """
+        return (await self.execute_many([args]))[0]
+
+    async def execute_many(self, commands: list[tuple[str, ...]]) -> list[str]:
+        """Execute several tmux commands at once and return their outputs.
+
+        Args:
+            commands: the arguments of each tmux command.
+
+        Raises:
+            TmuxError: when one of the tmux commands fails, or when the
+                client exited.
+
+        Returns:
+            the output of each tmux command.
+        """
+        if not self.alive:
+            raise TmuxError("tmux control mode client exited")
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        futures: list[asyncio.Future[tuple[bool, str]]] = [
+            loop.create_future() for _ in commands
+        ]
+        self._pending.extend(futures)
+
+        assert self._process.stdin is not None
+        try:
+            self._process.stdin.write(encode(commands).encode("utf-8"))
+            await self._process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as error:
+            for future in futures:
+                future.cancel()
+            self._fail()
+            raise TmuxError("tmux control mode client exited") from error
+
+        return unpack(commands, await asyncio.gather(*futures))
+
+    async def _read(self) -> None:
+        """Read the replies of the client, and hand each of them to the
+        oldest pending command, until the client exits. Notifications are
+        ignored. The commands that are pending when the client exits fail.
+        """
+        assert self._process.stdout is not None
+        replies: Replies = Replies()
+        try:
+            while not replies.exited:
+                data: bytes = await self._process.stdout.readline()
+                if not data:
+                    break
+
+                reply: tuple[bool, str] | None = replies.feed(
+                    data.decode("utf-8", "replace").rstrip("\n")
+                )
+                if reply is not None and self._pending:
+                    future = self._pending.popleft()
+                    if not future.done():
+                        future.set_result(reply)
+        except (OSError, ValueError) as error:
+            logging.debug("Cannot read replies: %s", error)
+        finally:
+            self._fail()
+
+    def _fail(self) -> None:
+        """Fail all pending commands, as the client exited. The commands of
+        which the future was cancelled are skipped."""
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(
+                    TmuxError("tmux control mode client exited")
+                )
+
+    async def close(self) -> None:
+        """Detach the control mode client and wait for it to exit."""
+        assert self._process.stdin is not None
+        self._process.stdin.close()
+        try:
+            await asyncio.wait_for(self._process.wait(), timeout=1)
+        except asyncio.TimeoutError:
+            self._process.kill()
+            await self._process.wait()
+        await self._reader
+
+    async def __aenter__(self) -> AsyncControlMode:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+
+class Client:
+    """Resolve panes and send keys to them without blocking the event loop.
+
+    The methods of a client can be awaited concurrently, e.g. using
+    `asyncio.gather`. Using a control mode client, their commands share a
+    single tmux client. Using a backend, they are executed by the backend in
+    a worker thread. Otherwise, a tmux client is started for each call.
+    """
+
+    def __init__(
+        self,
+        control: AsyncControlMode | None = None,
+        server: str | None = None,
+        backend: Backend | None = None,
+    ):
+        """Initialize the Client.
+
+        Args:
+            control: the control mode client that executes all commands. If
+                None, a new tmux client is started for each call.
+            server: the tmux server, see `key2pane.tmux.server_args`, of
+                which the panes are resolved. If `control` is given, it must
+                be attached to this server.
+            backend: a blocking backend that executes all commands instead,
+                e.g. `key2pane.backend.Memory`. It is ignored if `control`
+                is given.
+        """
+        self.control: AsyncControlMode | None = control
+        self.server: str | None = server
+        self.backend: Backend | None = backend
+
+    async def execute(self, *args: str) -> str:
+        """Execute a tmux command and return the output.
+
+        Args:
+            *args: the arguments to pass to tmux.
+
+        Raises:
+            TmuxError: when tmux command fails.
+
+        Returns:
+            stdout of the tmux command.
+        """
+        if self.control is not None:
+            return await self.control.execute(*args)
+        elif self.backend is not None:
+            return await asyncio.to_thread(self.backend.execute, *args)
+        return await execute(*args, server=self.server)
+
+    async def execute_many(self, commands: list[tuple[str, ...]]) -> list[str]:
+        """Execute several tmux commands using a single tmux client and
+        return the output of each command.
+
+        Args:
+            commands: the arguments of each tmux command.
+
+        Raises:
+            TmuxError: when one of the tmux commands fails.
+
+        Returns:
+            the output of each tmux command.
+        """
+        if not commands:
+            return []
+        elif self.control is not None:
+            return await self.control.execute_many(commands)
+        elif self.backend is not None:
+            return await asyncio.to_thread(self.backend.execute_many, commands)
+
+        marker, argv = chain(commands)
+        return split(
+            await execute(*argv, server=self.server), marker, len(commands)
+        )
+
+    async def snapshot(self, target: str | None = None) -> PaneIndex:
+        """Return an index of all panes, like `PaneIndex.snapshot`.
+
+        Args:
+            target: a tmux target that overrides the pane tmux considers to
+                be active.
+
+        Raises:
+            TmuxError: when the tmux commands fail, or when the active pane
+                is not found.
+
+        Returns:
+            the PaneIndex.
+        """
+        return PaneIndex.parse(
+            await self.execute_many(PaneIndex.queries(target)),
+            self.server,
+            self.backend,
+        )
+
+    async def pane(self, target: str | None = None) -> Pane:
+        """Return the pane that `target` refers to.
+
+        Args:
+            target: a tmux target, e.g. `%3` or `session:window.index`. If
+                None, the pane tmux considers to be active is returned.
+
+        Raises:
+            TmuxError: when the pane does not exist.
+
+        Returns:
+            the pane.
+        """
+        option: tuple[str, ...] = ("-t", target) if target else ()
+        try:
+            line: str = await self.execute(
+                "display-message", "-p", *option, PANE_FORMAT
+            )
+        except TmuxError as error:
+            raise TmuxError(f"Pane {target} not found") from error
+        return Pane.parse(line, self.server, self.backend)
+
+    async def resolve(self, settings: Settings) -> Pane:
+        """Return the pane that `settings` select.
+
+        Args:
+            settings: the settings, of which the session, window, and index
+                select the pane.
+
+        Raises:
+            TmuxError: when the pane does not exist.
+
+        Returns:
+            the pane.
+        """
+        return await self.pane(
+            f"{settings.session}:{settings.window}.{settings.index}"
+        )
+
+    async def send(
+        self, pane: Pane, keys: list[str], reset: bool = True
+    ) -> str:
+        """Send keys to a pane, like `Pane.send`.
+
+        Args:
+            pane: the pane.
+            keys: the keys to send.
+            reset: whether to send a C-c first.
+
+        Raises:
+            TmuxError: when one of the tmux commands fails.
+
+        Returns:
+            stdout of the tmux command which is typically empty.
+        """
+        return (await self.send_many([(pane, keys)], reset))[0]
+
+    async def send_many(
+        self, sends: list[tuple[Pane, list[str]]], reset: bool = True
+    ) -> list[str]:
+        """Send keys to several panes using a single tmux client, like
+        `key2pane.tmux.send_many`.
+
+        Args:
+            sends: each pane and the keys to send to it.
+            reset: whether to send a C-c first.
+
+        Raises:
+            TmuxError: when one of the tmux commands fails.
+
+        Returns:
+            stdout of the tmux command that sent the keys to each pane.
+        """
+        commands, positions = send_commands(sends, reset)
+        outputs: list[str] = await self.execute_many(commands)
+        return [outputs[position] for position in positions]
+
+    async def send_keys(
+        self, settings: Settings, pane: Pane | None = None
+    ) -> list[str]:
+        """Send the keys of the action that matches the command of a pane.
+
+        Args:
+            settings: the settings, of which the actions select the keys.
+            pane: the pane. If None, the pane that `settings` select is
+                used.
+
+        Raises:
+            SettingsError: when no action, or more than one action, matches
+                the command of the pane.
+            TmuxError: when one of the tmux commands fails.
+
+        Returns:
+            the keys that were sent.
+        """
+        if pane is None:
+            pane = await self.resolve(settings)
+        command: str = (
+            pane.foreground() if settings.resolver == "proc" else pane.command
+        )
+        keys: list[str] = settings.get_keys(command)
+        await self.send(pane, keys, settings.reset)
+        return keys
+
+    async def broadcast(
+        self, settings: Settings, panes: Iterable[Pane]
+    ) -> list[list[str] | BaseException]:
+        """Send the keys of the matching action to each pane concurrently.
+
+        Args:
+            settings: the settings, of which the actions select the keys.
+            panes: the panes.
+
+        Returns:
+            for each pane, the keys that were sent, or the exception that
+            prevented it, e.g. a SettingsError when no action matches.
+        """
+        return await asyncio.gather(
+            *(self.send_keys(settings, pane) for pane in panes),
+            return_exceptions=True,
+        )
+
+
+@asynccontextmanager
+async def control_mode(
+    *args: str, server: str | None = None
+) -> AsyncIterator[Client]:
+    """Yield a client that executes all commands using a single control mode
+    client. If no control mode client can be started, e.g. because no
+    session exists, the client starts a tmux client for each call instead.
+
+    Args:
+        *args: extra arguments for `tmux attach-session`.
+        server: the tmux server, see `key2pane.tmux.server_args`.
+
+    Yields:
+        the client.
+    """
+    try:
+        with span("control_mode.start"):
+            control: AsyncControlMode = await AsyncControlMode.start(
+                *args, server=server
+            )
+    except TmuxError as error:
+        logging.info("Control mode is unavailable: %s", error)
+        yield Client(server=server)
+        return
+
+    async with control:
+        yield Client(control, server)
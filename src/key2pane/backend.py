@@ -0,0 +1,314 @@
+"""The backends that execute the tmux commands of key2pane.
+
+Everything key2pane asks of tmux, i.e. querying panes, sending keys, loading
+buffers, and executing a batch of commands at once, is expressed as tmux
+commands that are executed by a backend:
+
+- `subprocess`: a new tmux client for each command, or for each batch, see
+  `key2pane.tmux.Subprocess`. This is the default.
+- `control`: a single tmux client in control mode that is kept running, see
+  `key2pane.control.ControlMode`.
+- `memory`: a tmux server that lives in memory, see `Memory`. It serves a
+  fixed set of panes and records the keys that are sent to them, so the
+  rest of key2pane can be tested and benchmarked without a tmux server.
+
+The backend of a run is selected using `--backend`, `$KEY2PANE_BACKEND`, or
+the `backend` setting, and is set for a context using
+`key2pane.tmux.using`.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO, Protocol
+
+from key2pane.tmux import TmuxError
+
+_FORMAT: re.Pattern[str] = re.compile(r"#\{(\w+)\}")
+
+
+class Backend(Protocol):
+    """Executes tmux commands."""
+
+    def execute(self, *args: str, strip: bool = True) -> str:
+        """Execute a tmux command and return the output.
+
+        Args:
+            *args: the arguments to pass to tmux.
+            strip: whether to remove the surrounding whitespace of the
+                output.
+
+        Raises:
+            TmuxError: when tmux command fails.
+
+        Returns:
+            stdout of the tmux command.
+        """
+        ...
+
+    def execute_many(self, commands: list[tuple[str, ...]]) -> list[str]:
+        """Execute several tmux commands at once and return their outputs.
+
+        Args:
+            commands: the arguments of each tmux command.
+
+        Raises:
+            TmuxError: when one of the tmux commands fails.
+
+        Returns:
+            the output of each tmux command.
+        """
+        ...
+
+    def load_buffer(self, name: str, head: bytes, stream: BinaryIO) -> None:
+        """Load `head` followed by the rest of `stream` into the tmux buffer
+        `name`.
+
+        Args:
+            name: the name of the tmux buffer.
+            head: the part of the contents that was already read.
+            stream: the rest of the contents.
+
+        Raises:
+            TmuxError: when tmux fails to load the buffer.
+        """
+        ...
+
+
+def make_panes(
+    count: int = 4, commands: Iterable[str] = ("bash",)
+) -> list[dict[str, str]]:
+    """Return panes for a `Memory` backend, which all live in window 0 of
+    session `memory`.
+
+    Args:
+        count: the number of panes.
+        commands: the commands of the panes, which are assigned to the panes
+            in turn.
+
+    Returns:
+        the format variables of each pane, e.g. `pane_id`.
+    """
+    names: list[str] = list(commands)
+    return [
+        {
+            "session_name": "memory",
+            "window_index": "0",
+            "pane_index": str(index),
+            "pane_id": f"%{index}",
+            "pane_pid": "0",
+            "pane_tty": "",
+            "pane_current_command": names[index % len(names)],
+        }
+        for index in range(count)
+    ]
+
+
+class Memory:
+    """A backend that emulates a tmux server in memory.
+
+    It understands the subset of tmux that key2pane uses to query panes,
+    send keys, and paste buffers. Other commands fail, like unknown commands
+    of tmux do. Format variables that a pane does not define expand to an
+    empty string, and the screen of each pane is empty.
+
+    Attributes:
+        panes: the format variables of each pane, e.g. `pane_id`.
+        active: the id of the pane tmux considers to be active.
+        buffers: the contents of each tmux buffer.
+        commands: every command that was executed, in order.
+        sent: each pane id and the keys of a `send-keys` command, in order.
+    """
+
+    def __init__(
+        self,
+        panes: Iterable[dict[str, str]] | None = None,
+        active: str | None = None,
+    ):
+        """Initialize the Memory backend.
+
+        Args:
+            panes: the format variables of each pane. If None, the panes of
+                `make_panes` are used.
+            active: the id of the active pane. If None, it is the first pane.
+        """
+        self.panes: list[dict[str, str]] = list(
+            make_panes() if panes is None else panes
+        )
+        self.active: str = active or self.panes[0]["pane_id"]
+        self.buffers: dict[str, bytes] = {}
+        self.commands: list[tuple[str, ...]] = []
+        self.sent: list[tuple[str, list[str]]] = []
+
+    def execute(self, *args: str, strip: bool = True) -> str:
+        """Execute a tmux command and return the output.
+
+        Args:
+            *args: the arguments to pass to tmux.
+            strip: whether to remove the surrounding whitespace of the
+                output.
+
+        Raises:
+            TmuxError: when the command or its target is unknown.
+
+        Returns:
+            the output of the command.
+        """
+        output: str = self._run(args)
+        return output.strip() if strip else output
+
+    def _run(self, args: tuple[str, ...]) -> str:
+        """Execute a tmux command and return the output as is.
+
+        Args:
+            args: the arguments of the command.
+
+        Raises:
+            TmuxError: when the command or its target is unknown.
+
+        Returns:
+            the output of the command.
+        """
+        self.commands.append(args)
+        name, options, rest = _parse(args)
+        target: str | None = options.get("-t")
+        if name == "display-message":
+            return _expand(rest[-1] if rest else "", self._find(target))
+        elif name == "list-panes":
+            return "\n".join(
+                _expand(options.get("-F", "#{pane_id}"), pane)
+                for pane in self._scope(options, target)
+            )
+        elif name == "send-keys":
+            self.sent.append((self._find(target)["pane_id"], list(rest)))
+            return ""
+        elif name == "paste-buffer":
+            self._find(target)
+            self._buffer(options.get("-b"))
+            if "-d" in options:
+                del self.buffers[options["-b"]]
+            return ""
+        elif name == "delete-buffer":
+            self._buffer(options.get("-b"))
+            del self.buffers[options["-b"]]
+            return ""
+        elif name == "show-buffer":
+            return self._buffer(options.get("-b")).decode("utf-8")
+        elif name == "capture-pane":
+            self._find(target)
+            return ""
+        raise TmuxError(f"tmux {' '.join(args)} failed")
+
+    def execute_many(self, commands: list[tuple[str, ...]]) -> list[str]:
+        """Execute several tmux commands and return their outputs.
+
+        Args:
+            commands: the arguments of each tmux command.
+
+        Raises:
+            TmuxError: when one of the tmux commands fails.
+
+        Returns:
+            the output of each tmux command.
+        """
+        return [self.execute(*args) for args in commands]
+
+    def load_buffer(self, name: str, head: bytes, stream: BinaryIO) -> None:
+        """Load `head` followed by the rest of `stream` into the buffer
+        `name`.
+
+        Args:
+            name: the name of the buffer.
+            head: the part of the contents that was already read.
+            stream: the rest of the contents.
+        """
+        self.commands.append(("load-buffer", "-b", name, "-"))
+        self.buffers[name] = head + stream.read()
+
+    def _find(self, target: str | None) -> dict[str, str]:
+        """Return the pane that `target` refers to, which defaults to the
+        active pane.
+
+        Args:
+            target: a pane id, e.g. `%3`, or `session:window.index`.
+
+        Raises:
+            TmuxError: when the pane does not exist.
+
+        Returns:
+            the pane.
+        """
+        target = target or self.active
+        for pane in self.panes:
+            if target in (pane["pane_id"], _address(pane)):
+                return pane
+        raise TmuxError(f"can't find pane: {target}")
+
+    def _scope(
+        self, options: dict[str, str], target: str | None
+    ) -> list[dict[str, str]]:
+        """Return the panes that `list-panes` lists.
+
+        Args:
+            options: the options of the command.
+            target: the target of the command.
+
+        Returns:
+            all panes with `-a`, the panes of the session `target` with `-s`,
+            and the panes of the window `target`, or of the window of the
+            active pane, otherwise.
+        """
+        if "-a" in options:
+            return self.panes
+        elif "-s" in options:
+            session: str = target or self._find(None)["session_name"]
+            return [p for p in self.panes if p["session_name"] == session]
+        window: str = target or _address(self._find(None)).rpartition(".")[0]
+        return [p for p in self.panes if _address(p).startswith(f"{window}.")]
+
+    def _buffer(self, name: str | None) -> bytes:
+        """Return the contents of the buffer `name`.
+
+        Raises:
+            TmuxError: when the buffer does not exist.
+        """
+        if name not in self.buffers:
+            raise TmuxError(f"no buffer {name}")
+        return self.buffers[name]
+
+
+def _parse(args: tuple[str, ...]) -> tuple[str, dict[str, str], list[str]]:
+    """Split a tmux command into its name, its options, and its other
+    arguments. The options that key2pane passes a value to are `-b`, `-E`,
+    `-F`, `-S`, and `-t`.
+
+    Args:
+        args: the arguments of the tmux command.
+
+    Returns:
+        the name, the value of each option, or an empty string for a flag,
+        and the other arguments.
+    """
+    options: dict[str, str] = {}
+    rest: list[str] = []
+    values: Iterator[str] = iter(args[1:])
+    for arg in values:
+        if rest or not arg.startswith("-") or arg == "-":
+            rest.append(arg)
+        elif arg in ("-b", "-E", "-F", "-S", "-t"):
+            options[arg] = next(values, "")
+        else:
+            options.update((f"-{flag}", "") for flag in arg[1:])
+    return args[0], options, rest
+
+
+def _expand(template: str, pane: dict[str, str]) -> str:
+    """Expand the format variables of `template`, e.g. `#{pane_id}`, using
+    the variables of `pane`."""
+    return _FORMAT.sub(lambda match: pane.get(match[1], ""), template)
+
+
+def _address(pane: dict[str, str]) -> str:
+    """Return the `session:window.index` of a pane."""
+    return "{session_name}:{window_index}.{pane_index}".format(**pane)
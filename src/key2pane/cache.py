@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import logging
+import os
+import pickle
+import zlib
+from os.path import abspath, expanduser, join
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Callable, TypeVar
+
+    T = TypeVar("T")
+
+_VERSION: int = 6
+
+
+def cache_dir() -> str:
+    """Return the directory in which compiled files are cached.
+
+    Returns:
+        the key2pane directory in `XDG_CACHE_HOME`, which defaults to
+        ~/.cache.
+    """
+    root: str = os.environ.get("XDG_CACHE_HOME") or expanduser("~/.cache")
+    return join(root, "key2pane")
+
+
+def cache_path(path: str) -> str:
+    """Return the path of the cache entry of the file at `path`.
+
+    The name of the entry is a checksum of the absolute path of the file.
+    As different paths can have the same checksum, the entry also stores the
+    path of the file.
+
+    Args:
+        path: the path of the cached file.
+
+    Returns:
+        the path of the cache entry.
+    """
+    checksum: int = zlib.crc32(abspath(path).encode("utf-8"))
+    return join(cache_dir(), f"{checksum:08x}.pickle")
+
+
+def load(path: str, compile: Callable[[bytes], T]) -> T:
+    """Return the compiled contents of the file at `path`.
+
+    The result of `compile` is pickled in the cache directory, together with
+    the modification time, the size, and the sha256 hash of the file. As long
+    as the modification time and size of the file do not change, the cached
+    result is returned without reading the file. Otherwise, the file is read
+    and its hash is compared; only when the contents changed, `compile` is
+    called again.
+
+    Args:
+        path: the path of the file.
+        compile: a function that compiles the contents of the file.
+
+    Raises:
+        OSError: when the file cannot be read.
+
+    Returns:
+        the compiled contents of the file.
+    """
+    stat: os.stat_result = os.stat(path)
+    entry: dict[str, Any] | None = _read(cache_path(path))
+    if entry and entry["path"] != abspath(path):
+        entry = None
+    elif entry and (entry["mtime"], entry["size"]) == (
+        stat.st_mtime_ns,
+        stat.st_size,
+    ):
+        return entry["value"]
+
+    import hashlib
+
+    with open(path, "rb") as file:
+        data: bytes = file.read()
+
+    digest: str = hashlib.sha256(data).hexdigest()
+    if entry and entry["sha256"] == digest:
+        logging.debug("Cache of %s is still valid", path)
+        value: T = entry["value"]
+    else:
+        logging.debug("Compiling %s", path)
+        value = compile(data)
+
+    _write(
+        cache_path(path),
+        {
+            "version": _VERSION,
+            "path": abspath(path),
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": digest,
+            "value": value,
+        },
+    )
+    return value
+
+
+def _read(path: str) -> dict[str, Any] | None:
+    """Return the cache entry at `path`, or None if it is missing, corrupt,
+    or written by another version of key2pane.
+
+    Args:
+        path: the path of the cache entry.
+
+    Returns:
+        the cache entry or None.
+    """
+    try:
+        with open(path, "rb") as file:
+            entry: dict[str, Any] = pickle.load(file)
+        if entry["version"] == _VERSION:
+            return entry
+    except FileNotFoundError:
+        pass
+    except Exception as error:
+        logging.debug("Ignoring cache entry %s: %s", path, error)
+
+    return None
+
+
+def _write(path: str, entry: dict[str, Any]) -> None:
+    """Write the cache entry to `path`. The entry is written to a temporary
+    file first, such that concurrent readers never see a partial entry.
+
+    Args:
+        path: the path of the cache entry.
+        entry: the cache entry.
+    """
+    temporary: str = f"{path}.{os.getpid()}"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temporary, "wb") as file:
+            pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+    except OSError as error:
+        logging.warning("Could not write cache entry %s: %s", path, error)
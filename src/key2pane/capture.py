@@ -0,0 +1,197 @@
+"""Stream the output that a pane produces after keys are sent to it.
+
+Before the keys are sent, the line of the cursor is marked by its position
+in the whole pane, i.e. the size of the scrollback plus the row of the
+cursor. After the keys are sent, the pane is polled with a growing delay.
+Only when the cursor moved, the lines from the first unread line up to the
+cursor are captured, so each poll costs a few lines instead of the whole
+scrollback. Lines above the cursor are complete, and are written as soon as
+they are captured. The capture ends when:
+
+- a complete line matches the `until` regex, which is written as well, or
+- the cursor is back at the prompt it was at when the pane was marked, e.g.
+  `>>> ` of a Python REPL, on a later line, or
+- the cursor did not move for `idle` milliseconds, in which case the line
+  of the cursor is written as well, if it is not empty.
+
+The lines are captured using `capture-pane -p`, of which the output is not
+stripped, so the leading whitespace of the first line and trailing blank
+lines are kept. Lines that are dropped from a full scrollback while they are
+being read may be skipped.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+from key2pane.defaults import IDLE
+from key2pane.tmux import execute
+from key2pane.trace import span
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import re
+    from typing import Callable
+
+_DELIMITER: str = "\x1f"
+_MAX_DELAY: float = 0.02
+
+
+def _write(line: str) -> None:
+    """Write a line to stdout, without buffering it."""
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+class Capture:
+    """The output of a pane, from the line of the cursor when it is marked.
+
+    Attributes:
+        target: the tmux target of the pane.
+        until: the regex that ends the capture when a line matches it.
+        idle: the time in milliseconds after which the capture ends when the
+            cursor does not move.
+        write: the function that is called with each line of the output.
+    """
+
+    def __init__(
+        self,
+        target: str,
+        until: re.Pattern[str] | None = None,
+        idle: int = IDLE,
+        write: Callable[[str], None] = _write,
+    ):
+        """Initialize the Capture.
+
+        Args:
+            target: the tmux target of the pane.
+            until: the regex that ends the capture.
+            idle: the idle time in milliseconds.
+            write: the function that is called with each line.
+        """
+        self.target: str = target
+        self.until: re.Pattern[str] | None = until
+        self.idle: int = idle
+        self.write: Callable[[str], None] = write
+        self._line: int = 0
+        self._prompt: tuple[int, str] = (0, "")
+
+    def _position(self) -> tuple[int, int, int]:
+        """Return the size of the scrollback, and the position of the cursor
+        of the pane.
+
+        Raises:
+            TmuxError: when the pane cannot be queried.
+
+        Returns:
+            the size of the scrollback, and the column and row of the cursor.
+        """
+        output: str = execute(
+            "display-message",
+            "-p",
+            "-t",
+            self.target,
+            _DELIMITER.join(("#{history_size}", "#{cursor_x}", "#{cursor_y}")),
+        )
+        history, x, y = output.split(_DELIMITER)
+        return int(history), int(x), int(y)
+
+    def _lines(self, start: int, end: int, history: int) -> list[str]:
+        """Return lines of the pane, without trailing whitespace.
+
+        Args:
+            start: the position of the first line in the whole pane.
+            end: the position of the last line in the whole pane.
+            history: the size of the scrollback.
+
+        Raises:
+            TmuxError: when the lines cannot be captured.
+
+        Returns:
+            the lines from `start` up to and including `end`.
+        """
+        lines: list[str] = execute(
+            "capture-pane",
+            "-p",
+            "-t",
+            self.target,
+            "-S",
+            str(start - history),
+            "-E",
+            str(end - history),
+            strip=False,
+        ).split("\n")
+        count: int = end - start + 1
+        return [line.rstrip() for line in lines[:count]] + [""] * (
+            count - len(lines)
+        )
+
+    def mark(self) -> None:
+        """Mark the line of the cursor, and remember the prompt before the
+        cursor.
+
+        Raises:
+            TmuxError: when the pane cannot be queried.
+        """
+        history, x, y = self._position()
+        self._line = history + y
+        line: str = self._lines(self._line, self._line, history)[0]
+        self._prompt = (x, line[:x].rstrip())
+
+    def follow(self) -> int:
+        """Write the lines that the pane produced since it was marked, until
+        the capture ends.
+
+        Raises:
+            TmuxError: when the pane cannot be queried.
+
+        Returns:
+            the number of lines that were written.
+        """
+        with span("capture", target=self.target) as current:
+            written: int = self._follow()
+            current.set("lines", written)
+            return written
+
+    def _follow(self) -> int:
+        """Poll the pane, and write its complete lines, until the capture
+        ends.
+
+        Returns:
+            the number of lines that were written.
+        """
+        unread: int = self._line + 1
+        written: int = 0
+        current: str = ""
+        last: tuple[int, int, int] | None = None
+        moved: float = time.monotonic()
+        delay: float = 0.001
+        while True:
+            time.sleep(delay)
+            delay = min(delay * 2, _MAX_DELAY)
+            history, x, y = position = self._position()
+            if position == last:
+                if time.monotonic() - moved >= self.idle / 1000:
+                    if current:
+                        self.write(current)
+                        written += 1
+                    return written
+                continue
+            last = position
+            moved = time.monotonic()
+            delay = 0.001
+
+            cursor: int = history + y
+            if cursor < unread:
+                continue
+
+            *complete, current = self._lines(unread, cursor, history)
+            for line in complete:
+                self.write(line)
+                written += 1
+                if self.until is not None and self.until.search(line):
+                    return written
+            unread = cursor
+            if cursor > self._line and (x, current) == self._prompt:
+                return written
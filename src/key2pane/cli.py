@@ -1,8 +1,17 @@
 import logging
-from argparse import ArgumentParser, RawDescriptionHelpFormatter
-from logging.handlers import TimedRotatingFileHandler
-from os import makedirs
-from os.path import dirname, expanduser
+from argparse import (
+    ArgumentParser,
+    ArgumentTypeError,
+    RawDescriptionHelpFormatter,
+)
+from os import environ
+from os.path import abspath, expanduser
+
+from key2pane.client import socket_path
+from key2pane.defaults import IDLE, THRESHOLD
+from key2pane.log import BackgroundFileHandler
+from key2pane.tmux import BACKENDS
+from key2pane.trace import FORMATS
 
 _DESCRIPTION: str = """
 Sends a sequence of keys to any tmux pane, based on the pane's current command.
@@ -38,9 +47,29 @@ starting from 0. For example, if the we invoke: `key2pane foo bar`, and the
 `keys` array is `["echo {1} {2}", "Enter"]`, then the following keys will be
 sent to the pane: `echo foo bar`, `Enter`. Python's `str.format` is used under
 the hood, so more information can be found in the official documentation.
+Named placeholders, like `{file}`, are filled using `--var file=main.py`, or
+the `variables` of the config file.
 """
 
 
+def variable(text: str) -> tuple[str, str]:
+    """Parse a `NAME=VALUE` argument.
+
+    Args:
+        text: the argument.
+
+    Raises:
+        ArgumentTypeError: when the argument has no name.
+
+    Returns:
+        the name and the value.
+    """
+    name, separator, value = text.partition("=")
+    if not separator or not name:
+        raise ArgumentTypeError(f"expected NAME=VALUE, got {text!r}")
+    return name, value
+
+
 def make_parser() -> ArgumentParser:
     """Return an ArgumentParser for key2pane.
 
@@ -78,6 +107,60 @@ def make_parser() -> ArgumentParser:
         "config file will be used. if not set, the current pane its index will "
         "be used.",
     )
+    parser.add_argument(
+        "-t",
+        "--target",
+        help="Specify the tmux pane by its id, e.g. %%3, or by any other tmux "
+        "target, e.g. session:window.index. Pane ids do not change when panes "
+        "are renumbered. Overrides the session, window, and index",
+    )
+    parser.add_argument(
+        "-L",
+        "--socket-name",
+        dest="servers",
+        action="append",
+        default=[],
+        metavar="NAME",
+        help="Send keys using the tmux server of the socket NAME, like "
+        "`tmux -L`. Can be given more than once, together with "
+        "--socket-path, to send to several servers concurrently",
+    )
+    parser.add_argument(
+        "-S",
+        "--socket-path",
+        dest="servers",
+        action="append",
+        type=abspath,
+        metavar="PATH",
+        help="Send keys using the tmux server of the socket PATH, like "
+        "`tmux -S`. Can be given more than once",
+    )
+    parser.add_argument(
+        "--all-servers",
+        action="store_true",
+        help="Send keys using every running tmux server of which a socket "
+        "exists in the socket directory of tmux",
+    )
+    parser.add_argument(
+        "-b",
+        "--broadcast",
+        choices=["window", "session", "all"],
+        help="Send keys to every pane of the target window, of the target "
+        "session, or of all sessions. The keys of each pane are based on its "
+        "own command, and panes without a matching action are skipped",
+    )
+    parser.add_argument(
+        "--filter",
+        metavar="REGEX",
+        help="Only broadcast to panes of which the command matches this regex",
+    )
+    parser.add_argument(
+        "--resolver",
+        choices=["tmux", "proc"],
+        help="How the command of a pane is found: the name tmux reports "
+        "(tmux), or the full command line of the foreground process, which "
+        "is read from /proc on Linux (proc). The default is tmux",
+    )
     parser.add_argument(
         "--reset",
         dest="reset",
@@ -92,6 +175,99 @@ def make_parser() -> ArgumentParser:
         default=None,
         help="Do not send a C-c before sending the keys",
     )
+    parser.add_argument(
+        "--payload",
+        metavar="FILE",
+        help="Paste the contents of this file, or of stdin if it is -, into "
+        "the pane before sending the keys",
+    )
+    parser.add_argument(
+        "--paste-threshold",
+        type=int,
+        default=THRESHOLD,
+        metavar="BYTES",
+        help="Payloads larger than this are pasted using a tmux buffer "
+        "instead of being typed using send-keys. The default is %(default)s",
+    )
+    parser.add_argument(
+        "--bracketed-paste",
+        action="store_true",
+        help="Paste the payload using a tmux buffer in bracketed paste mode, "
+        "if the application in the pane supports it",
+    )
+    parser.add_argument(
+        "--coalesce",
+        type=int,
+        metavar="MS",
+        help="Collapse sends to the same pane within this window in "
+        "milliseconds: repeated keys are dropped, and of a burst of "
+        "different keys, only the first and the last are sent. The default "
+        "is 0, which disables coalescing",
+    )
+    parser.add_argument(
+        "--ready-timeout",
+        type=int,
+        metavar="MS",
+        help="After a reset, wait at most this many milliseconds until the "
+        "pane runs a command that matches the regex of the action again, and "
+        "its contents are stable, before sending the keys. The default is "
+        "1000, and 0 sends the keys right away",
+    )
+    parser.add_argument(
+        "--lock-timeout",
+        type=int,
+        metavar="MS",
+        help="Wait at most this many milliseconds for other key2pane "
+        "processes that send to the same pane, which are served in the order "
+        "in which they started waiting. The default is 5000, and 0 disables "
+        "waiting",
+    )
+    parser.add_argument(
+        "--var",
+        action="append",
+        type=variable,
+        default=[],
+        metavar="NAME=VALUE",
+        help="Fill the named placeholder {NAME} of the keys with VALUE. Can "
+        "be given more than once, and overrides the variables of the config "
+        "file",
+    )
+    parser.add_argument(
+        "--capture",
+        action="store_true",
+        help="After sending the keys, write the lines that the pane produces "
+        "to stdout as they appear, until the pane is back at its prompt, a "
+        "line matches --capture-until, or the pane is idle for "
+        "--capture-idle milliseconds",
+    )
+    parser.add_argument(
+        "--capture-until",
+        metavar="REGEX",
+        help="End --capture after the first line that matches this regex",
+    )
+    parser.add_argument(
+        "--capture-idle",
+        type=int,
+        default=IDLE,
+        metavar="MS",
+        help="End --capture when the pane produced nothing for this many "
+        "milliseconds. The default is %(default)s",
+    )
+    parser.add_argument(
+        "--stdin",
+        action="store_true",
+        help="Read records from stdin, each holding the positional arguments "
+        "of one send, optionally preceded by `-t TARGET`. The records are "
+        "sent in order using a single tmux client, and a status line is "
+        "written to stdout for each of them",
+    )
+    parser.add_argument(
+        "-0",
+        "--null",
+        action="store_true",
+        help="Separate the records of --stdin by NUL characters instead of "
+        "newlines",
+    )
     parser.add_argument(
         "--logfile",
         default=expanduser("~/.local/state/key2pane/key2pane.log"),
@@ -103,6 +279,36 @@ def make_parser() -> ArgumentParser:
         help="Specify the log level",
         choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
     )
+    parser.add_argument(
+        "--control-mode",
+        action="store_true",
+        help="Send all tmux commands through a single tmux client in control "
+        "mode, instead of starting a tmux client for each command. Same as "
+        "--backend control",
+    )
+    parser.add_argument(
+        "--backend",
+        default=environ.get("KEY2PANE_BACKEND"),
+        choices=BACKENDS,
+        help="Execute tmux commands by starting a tmux client for each "
+        "command (subprocess), through a single tmux client in control mode "
+        "(control), or against panes in memory, without tmux (memory). The "
+        "default is $KEY2PANE_BACKEND, or the backend setting",
+    )
+    parser.add_argument(
+        "--trace",
+        default=environ.get("KEY2PANE_TRACE"),
+        help="Record how long each phase and each tmux command takes, and "
+        "write it to this file. The default is $KEY2PANE_TRACE",
+    )
+    parser.add_argument(
+        "--trace-format",
+        default=environ.get("KEY2PANE_TRACE_FORMAT", "jsonl"),
+        choices=FORMATS,
+        help="Append a json object per span to the trace file (jsonl), or "
+        "overwrite it with a Chrome trace (chrome). The default is "
+        "$KEY2PANE_TRACE_FORMAT or jsonl",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -119,26 +325,68 @@ def make_parser() -> ArgumentParser:
     return parser
 
 
+def make_serve_parser() -> ArgumentParser:
+    """Return an ArgumentParser for `key2pane serve`.
+
+    Returns:
+        An ArgumentParser for the key2pane daemon.
+    """
+    parser: ArgumentParser = ArgumentParser(
+        prog="key2pane serve",
+        description=(
+            "Run key2pane as a daemon that listens on a unix socket. Use "
+            "`key2pane-client` instead of `key2pane` to forward invocations "
+            "to the daemon."
+        ),
+    )
+    parser.add_argument(
+        "--socket",
+        default=socket_path(),
+        help="The path of the unix socket. The default is "
+        "$XDG_RUNTIME_DIR/key2pane.sock",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep the panes of the attached tmux session in memory, using "
+        "notifications of tmux, instead of querying them for each request",
+    )
+    parser.add_argument(
+        "--logfile",
+        default=expanduser("~/.local/state/key2pane/key2pane.log"),
+        help="Specify the log file",
+    )
+    parser.add_argument(
+        "--loglevel",
+        default="WARNING",
+        help="Specify the log level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+    )
+    return parser
+
+
 def set_logging(loglevel: str, logfile: str, store_days: int = 7) -> None:
     """Set the root logger to the `loglevel` and add a file handler to
     `logfile`. Logs older than `store_days` will be deleted.
 
+    Records below `loglevel` are dropped before they are formatted. The log
+    file is opened when the first record is emitted, and is written by a
+    background thread.
+
     Args:
         loglevel: The log level.
         logfile: The path to the log file.
         store_days: The number of days to keep the logs.
     """
-    makedirs(dirname(logfile), exist_ok=True)
-
-    logging.debug("Initializing logging by printing this message")
+    logging.basicConfig()
     logger: logging.Logger = logging.getLogger()
     logger.setLevel(loglevel)
 
     formatter: logging.Formatter = logging.Formatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
-    file_handler: TimedRotatingFileHandler = TimedRotatingFileHandler(
-        logfile, when="D", interval=1, backupCount=store_days
+    file_handler: BackgroundFileHandler = BackgroundFileHandler(
+        logfile, store_days
     )
 
     file_handler.setFormatter(formatter)
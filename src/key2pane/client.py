@@ -0,0 +1,103 @@
+"""A thin client that forwards a key2pane invocation to `key2pane serve`.
+
+Only light modules are imported here, so that the interpreter can exit as
+soon as the daemon has answered. When no daemon is listening, or when stdin
+is read, the request is handled in-process instead.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+from key2pane.runtime import runtime_dir
+
+
+def socket_path() -> str:
+    """Return the path of the unix socket the daemon listens on.
+
+    The path can be set using the `KEY2PANE_SOCKET` environment variable.
+    Otherwise, the socket is placed in `runtime_dir()`.
+
+    Returns:
+        the path of the unix socket.
+    """
+    if "KEY2PANE_SOCKET" in os.environ:
+        return os.environ["KEY2PANE_SOCKET"]
+    return os.path.join(runtime_dir(), "key2pane.sock")
+
+
+def request(argv: list[str], path: str | None = None) -> tuple[int, str, str]:
+    """Send `argv` to the daemon and return its response.
+
+    The request consists of the current working directory, the socket path
+    of the tmux server of the calling pane, its pane id, and `argv`,
+    separated by NUL characters. The response
+    consists of the exit status, stdout, and stderr, separated likewise.
+
+    Args:
+        argv: the command line arguments, excluding the program name.
+        path: the path of the unix socket. Defaults to `socket_path()`.
+
+    Raises:
+        OSError: when no daemon is listening on the socket.
+
+    Returns:
+        the exit status, stdout, and stderr of the invocation.
+    """
+    import socket
+
+    fields: list[str] = [
+        os.getcwd(),
+        os.environ.get("TMUX", "").split(",")[0],
+        os.environ.get("TMUX_PANE", ""),
+        *argv,
+    ]
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path or socket_path())
+        client.sendall("\0".join(fields).encode("utf-8"))
+        client.shutdown(socket.SHUT_WR)
+        chunks: list[bytes] = list(iter(lambda: client.recv(65536), b""))
+
+    status, stdout, stderr = b"".join(chunks).decode("utf-8").split("\0", 2)
+    return int(status), stdout, stderr
+
+
+def in_process(argv: list[str]) -> bool:
+    """Return True if `argv` reads a payload or records from stdin, or
+    streams a capture to stdout, which cannot be forwarded to the daemon.
+
+    Args:
+        argv: the command line arguments, excluding the program name.
+
+    Returns:
+        True if key2pane must run in the process of the client.
+    """
+    if "--stdin" in argv or "--capture" in argv:
+        return True
+    for option, value in zip(argv, [*argv[1:], ""]):
+        if option == "--payload=-" or (option, value) == ("--payload", "-"):
+            return True
+    return False
+
+
+def main() -> int:
+    """Entry point for key2pane-client."""
+    argv: list[str] = sys.argv[1:]
+    if not in_process(argv):
+        try:
+            status, stdout, stderr = request(argv)
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+        else:
+            sys.stdout.write(stdout)
+            sys.stderr.write(stderr)
+            return status
+
+    from key2pane.__main__ import main as fallback
+
+    return fallback() or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Collapse bursts of sends to the same pane, e.g. when a key binding is held
+down.
+
+The invocations of key2pane that send to a pane share a small state file,
+which is locked using `flock` while it is read and written. The state holds
+when the last keys were sent, which keys they were, and the keys that are
+waiting to be sent:
+
+- A send to a pane that received nothing within the window goes out at once.
+- A send of the keys that were sent last, within the window, is dropped.
+- Otherwise, the send is queued, replacing any queued send. The first
+  invocation that queues a send waits until the window has passed, and then
+  sends the keys that were queued last, which may be those of another
+  invocation. The other invocations exit at once.
+
+So, at most two sends reach a pane within a window, however many times
+key2pane is invoked. The times in the state are wall clock times, as the
+state outlives the process, and a state that was written in the future,
+e.g. before the clock was set back, is discarded.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import time
+from contextlib import contextmanager
+
+from key2pane.runtime import open_private, pane_path
+from key2pane.trace import span
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from typing import IO, Any
+
+
+def state_path(target: str) -> str:
+    """Return the path of the state file of a pane.
+
+    Args:
+        target: the tmux target of the pane, e.g. `%3`.
+
+    Returns:
+        the path of the state file.
+    """
+    return pane_path("key2pane-coalesce", target)
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[IO[str]]:
+    """Open and lock the state file at `path`, creating it if needed.
+
+    Args:
+        path: the path of the state file.
+
+    Yields:
+        the state file.
+    """
+    with open_private(path, "a+") as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        file.seek(0)
+        yield file
+
+
+def _load(file: IO[str]) -> dict[str, Any]:
+    """Return the state in `file`, which is empty if the file is empty or
+    invalid."""
+    import json
+
+    try:
+        state: Any = json.loads(file.read() or "{}")
+    except ValueError:
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def _dump(file: IO[str], state: dict[str, Any]) -> None:
+    """Replace the contents of `file` by `state`."""
+    import json
+
+    file.seek(0)
+    file.truncate()
+    file.write(json.dumps(state))
+    file.flush()
+
+
+def coalesce(
+    target: str, keys: list[str], reset: bool, window: int
+) -> tuple[list[str], bool] | None:
+    """Decide whether the keys are sent to a pane now, later, or not at all.
+
+    This may wait until `window` has passed since the last send to the pane.
+
+    Args:
+        target: the tmux target of the pane, e.g. `%3`.
+        keys: the keys to send.
+        reset: whether a C-c is sent first.
+        window: the window in milliseconds.
+
+    Returns:
+        the keys, and whether a C-c is sent first, that must be sent now,
+        which may be those of another invocation. None if nothing needs to
+        be sent by this invocation.
+    """
+    path: str = state_path(target)
+    intent: dict[str, Any] = {"keys": keys, "reset": reset}
+    length: int = window * 1_000_000
+    with span("coalesce", window=window) as current, _locked(path) as file:
+        state: dict[str, Any] = _load(file)
+        now: int = time.time_ns()
+        if state.get("sent_at", 0) > now:
+            state = {}
+        sent_at: int = state.get("sent_at", 0)
+        deadline: int = state.get("deadline", 0)
+        if deadline and now > deadline + length:
+            deadline = 0
+
+        if not deadline and now - sent_at >= length:
+            _dump(file, {"sent_at": now, "sent": intent})
+            current.set("decision", "send")
+            return keys, reset
+
+        if deadline or intent != state.get("sent"):
+            state["pending"] = intent
+        else:
+            state.pop("pending", None)
+
+        if deadline or "pending" not in state:
+            _dump(file, state)
+            current.set("decision", "drop")
+            return None
+
+        deadline = sent_at + length
+        state["deadline"] = deadline
+        _dump(file, state)
+        current.set("decision", "wait")
+
+    time.sleep(min(max(deadline - time.time_ns(), 0), length) / 1e9)
+    with _locked(path) as file:
+        state = _load(file)
+        pending: dict[str, Any] | None = state.pop("pending", None)
+        state.pop("deadline", None)
+        if pending is None or pending == state.get("sent"):
+            _dump(file, state)
+            return None
+
+        _dump(file, {"sent_at": time.time_ns(), "sent": pending})
+        return pending["keys"], pending["reset"]
@@ -0,0 +1,330 @@
+import logging
+import subprocess
+import threading
+from types import TracebackType
+from typing import IO, BinaryIO, Iterator
+
+from key2pane.tmux import Subprocess, TmuxError, tmux_argv
+
+_ESCAPES: dict[int, str] = str.maketrans(
+    {"\\": "\\\\", '"': '\\"', "$": "\\$", "\n": "\\n", "\r": "\\r"}
+)
+
+
+def quote(arg: str) -> str:
+    """Quote `arg` such that tmux parses it as a single literal argument.
+
+    Args:
+        arg: the argument to quote.
+
+    Returns:
+        the argument between double quotes, with special characters escaped.
+    """
+    return f'"{arg.translate(_ESCAPES)}"'
+
+
+def encode(commands: list[tuple[str, ...]]) -> str:
+    """Return the lines that make a control mode client execute `commands`,
+    one command per line.
+
+    Args:
+        commands: the arguments of each tmux command.
+
+    Returns:
+        the lines, each of which ends with a newline.
+    """
+    return "".join(
+        " ".join(quote(arg) for arg in args) + "\n" for args in commands
+    )
+
+
+def unpack(
+    commands: list[tuple[str, ...]],
+    replies: list[tuple[bool, str]],
+    strip: bool = True,
+) -> list[str]:
+    """Return the output of each command, from the replies of a control mode
+    client to `commands`.
+
+    Args:
+        commands: the arguments of each tmux command.
+        replies: whether each command succeeded, and its output.
+        strip: whether to remove the surrounding whitespace of the outputs.
+
+    Raises:
+        TmuxError: when one of the tmux commands failed.
+
+    Returns:
+        the output of each tmux command.
+    """
+    for args, (success, output) in zip(commands, replies):
+        if not success:
+            logging.critical(output)
+            raise TmuxError(f"tmux {' '.join(args)} failed")
+
+    return [output.strip() if strip else output for _, output in replies]
+
+
+class Replies:
+    """Frame the lines that a control mode client prints into replies.
+
+    A reply is framed by a `%begin` line and an `%end` (or `%error`) line
+    with the same time, number and flags. Lines outside of a reply are
+    notifications, e.g. `%window-add @1`, or `%exit` when the client exits.
+
+    Attributes:
+        exited: whether the client printed `%exit`.
+    """
+
+    def __init__(self):
+        """Initialize the Replies."""
+        self.exited: bool = False
+        self._guard: str | None = None
+        self._output: list[str] = []
+
+    def feed(self, line: str) -> tuple[bool, str] | None:
+        """Feed the next line of the client, without its newline.
+
+        Args:
+            line: the line.
+
+        Returns:
+            whether the command succeeded, and its output, when the line
+            ends a reply, or None otherwise.
+        """
+        if self._guard is None:
+            if line.startswith("%begin "):
+                self._guard, self._output = line.split(" ", 1)[1], []
+            elif line.startswith("%exit"):
+                self.exited = True
+        elif line in (f"%end {self._guard}", f"%error {self._guard}"):
+            self._guard = None
+            return line.startswith("%end"), "\n".join(self._output)
+        else:
+            self._output.append(line)
+        return None
+
+    def notification(self, line: str) -> bool:
+        """Return True if `line`, which is fed next, is a notification.
+
+        Args:
+            line: the line.
+
+        Returns:
+            whether the line is outside of a reply, and neither starts a
+            reply nor is `%exit`.
+        """
+        return (
+            self._guard is None
+            and line.startswith("%")
+            and not line.startswith(("%begin ", "%exit"))
+        )
+
+
+class ControlMode:
+    """A tmux client in control mode.
+
+    Instead of starting a tmux client for each command, commands are written
+    to the stdin of a single `tmux -C` client. Its replies are framed by
+    `%begin` and `%end` (or `%error`) lines, and are returned in the same
+    order as the commands were written. Any notifications that tmux sends
+    between replies are ignored, unless they are read using
+    `notifications`.
+
+    The client attaches to a session of the server that is set using
+    `key2pane.tmux.on_server`, without receiving the output of its panes and
+    without affecting the size of its windows.
+    """
+
+    def __init__(self, *args: str):
+        """Start the control mode client.
+
+        Args:
+            *args: extra arguments for `tmux attach-session`.
+
+        Raises:
+            TmuxError: when the client cannot attach to a session.
+        """
+        self._lock: threading.Lock = threading.Lock()
+        try:
+            self._process: subprocess.Popen[str] = subprocess.Popen(
+                tmux_argv(
+                    "-C",
+                    "attach-session",
+                    "-f",
+                    "no-output,ignore-size",
+                    *args,
+                ),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+            )
+        except OSError as error:
+            raise TmuxError("tmux could not be started") from error
+
+        self._replies: Replies = Replies()
+        try:
+            success, output = self._read_reply()
+            if not success:
+                raise TmuxError(output)
+        except TmuxError:
+            self.close()
+            raise
+
+    @property
+    def alive(self) -> bool:
+        """Whether the control mode client is still running."""
+        return self._process.poll() is None
+
+    def execute(self, *args: str, strip: bool = True) -> str:
+        """Execute a tmux command and return the output.
+
+        Args:
+            *args: the arguments to pass to tmux.
+            strip: whether to remove the surrounding whitespace of the
+                output.
+
+        Raises:
+            TmuxError: when tmux command fails.
+
+        Returns:
+            output of the tmux command.
+        """
+        return self._execute([args], strip)[0]
+
+    def execute_many(self, commands: list[tuple[str, ...]]) -> list[str]:
+        """Execute several tmux commands at once and return their outputs.
+
+        All commands are written before any reply is read, so the commands
+        cost a single round-trip to the tmux server. A failing command does
+        not prevent the next commands from being executed.
+
+        Args:
+            commands: the arguments of each tmux command.
+
+        Raises:
+            TmuxError: when one of the tmux commands fails.
+
+        Returns:
+            the output of each tmux command.
+        """
+        return self._execute(commands, True)
+
+    def _execute(
+        self, commands: list[tuple[str, ...]], strip: bool
+    ) -> list[str]:
+        """Execute several tmux commands at once, see `execute_many`.
+
+        Args:
+            commands: the arguments of each tmux command.
+            strip: whether to remove the surrounding whitespace of the
+                outputs.
+
+        Raises:
+            TmuxError: when one of the tmux commands fails.
+
+        Returns:
+            the output of each tmux command.
+        """
+        with self._lock:
+            try:
+                self._stdin.write(encode(commands))
+                self._stdin.flush()
+            except (BrokenPipeError, ValueError) as error:
+                raise TmuxError("tmux control mode client exited") from error
+
+            replies: list[tuple[bool, str]] = [
+                self._read_reply() for _ in commands
+            ]
+
+        return unpack(commands, replies, strip)
+
+    def load_buffer(self, name: str, head: bytes, stream: BinaryIO) -> None:
+        """Load `head` followed by the rest of `stream` into the tmux buffer
+        `name`. As a control mode client cannot stream contents to tmux, a
+        new tmux client is started for it, see `Subprocess.load_buffer`.
+
+        Args:
+            name: the name of the tmux buffer.
+            head: the part of the contents that was already read.
+            stream: the rest of the contents.
+
+        Raises:
+            TmuxError: when tmux fails to load the buffer.
+        """
+        Subprocess().load_buffer(name, head, stream)
+
+    def notifications(self) -> Iterator[str]:
+        """Yield the notifications of the client until it exits.
+
+        The replies to commands are skipped, so no commands should be
+        executed while the notifications are read.
+
+        Yields:
+            each notification, e.g. `%layout-change @0 ...`.
+        """
+        replies: Replies = Replies()
+        for line in self._stdout:
+            line = line.rstrip("\n")
+            if replies.notification(line):
+                yield line
+            replies.feed(line)
+            if replies.exited:
+                return
+
+    def _read_reply(self) -> tuple[bool, str]:
+        """Read the next reply from the control mode client.
+
+        Raises:
+            TmuxError: when the client exits before a reply is read.
+
+        Returns:
+            whether the command succeeded, and its output.
+        """
+        for line in self._stdout:
+            reply: tuple[bool, str] | None = self._replies.feed(
+                line.rstrip("\n")
+            )
+            if reply is not None:
+                return reply
+            elif self._replies.exited:
+                break
+
+        raise TmuxError("tmux control mode client exited")
+
+    @property
+    def _stdin(self) -> IO[str]:
+        assert self._process.stdin is not None
+        return self._process.stdin
+
+    @property
+    def _stdout(self) -> IO[str]:
+        assert self._process.stdout is not None
+        return self._process.stdout
+
+    def close(self) -> None:
+        """Detach the control mode client and wait for it to exit."""
+        try:
+            self._stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            self._process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._stdout.close()
+
+    def __enter__(self) -> "ControlMode":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
@@ -0,0 +1,8 @@
+"""The defaults of options that the command line interface shows, so that
+it does not import the modules that use them when key2pane starts."""
+
+IDLE: int = 1000
+"""The milliseconds without output after which a capture ends."""
+
+THRESHOLD: int = 4096
+"""The size in bytes above which a payload is pasted using a tmux buffer."""
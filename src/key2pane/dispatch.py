@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import logging
+import re
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Any
+
+_SPECIAL: frozenset[str] = frozenset(".^$*+?{}[]\\()")
+_QUANTIFIERS: frozenset[str] = frozenset("*+?{")
+_BACKREFERENCE: re.Pattern[str] = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def literals(regex: str) -> list[str] | None:
+    """Return the literal strings that `regex` consists of, if any.
+
+    A regex without special characters, apart from `|`, is a list of
+    alternative literal strings. When such a regex is used with `re.match`,
+    it matches any string that starts with one of the literals.
+
+    Args:
+        regex: a regular expression.
+
+    Returns:
+        the alternative literals of `regex`, or None if `regex` contains
+        special characters.
+    """
+    if _SPECIAL.isdisjoint(regex):
+        return regex.split("|")
+    return None
+
+
+def prefix(regex: str) -> str:
+    """Return a literal string with which every string that `regex` matches
+    starts, as `re.match` would.
+
+    Args:
+        regex: a regular expression.
+
+    Returns:
+        the literal prefix of `regex`, which is empty if `regex` starts with
+        a special character or contains alternatives.
+    """
+    if "|" in regex:
+        return ""
+
+    regex = regex[1:] if regex.startswith("^") else regex
+    end: int = 0
+    while end < len(regex) and regex[end] not in _SPECIAL:
+        end += 1
+
+    if end < len(regex) and regex[end] in _QUANTIFIERS:
+        end -= 1
+    return regex[: max(end, 0)]
+
+
+class Dispatch:
+    """Find all regexes that match a command, as `re.match` would.
+
+    The regexes are validated once, and compiled when a command is first
+    matched against them. Regexes that consist of literals are stored in a
+    table that maps each literal to the positions of its regexes, so that a
+    command is matched by looking up its prefixes.
+    Likewise, regexes that start with a literal prefix are stored by their
+    prefix, so only the regexes whose prefix the command starts with are
+    matched. The remaining regexes are combined into a single pattern that
+    contains an optional lookahead with a named group for each regex. As
+    every lookahead is tried, a single match of this pattern reveals all
+    regexes that match, such that ambiguity is still detected.
+
+    Regexes that cannot be combined, e.g. because they use backreferences or
+    global flags, are matched one by one.
+
+    Only the regexes are pickled, not their compiled patterns, so loading a
+    Dispatch from the cache does not compile every regex again. Instead,
+    the regexes of each prefix are compiled when a command with that prefix
+    is matched for the first time.
+    """
+
+    def __init__(self, regexes: Sequence[str]):
+        """Initialize the Dispatch.
+
+        Args:
+            regexes: the regexes to match commands against.
+
+        Raises:
+            re.error: when one of the regexes is invalid.
+        """
+        self._literals: dict[str, list[int]] = {}
+        self._prefixed: dict[str, list[tuple[int, str]]] = {}
+        others: list[tuple[int, str]] = []
+        for position, regex in enumerate(regexes):
+            alternatives: list[str] | None = literals(regex)
+            head: str = prefix(regex)
+            if alternatives is not None:
+                for literal in set(alternatives):
+                    self._literals.setdefault(literal, []).append(position)
+            elif head:
+                re.compile(regex)
+                self._prefixed.setdefault(head, []).append((position, regex))
+            else:
+                others.append((position, regex))
+
+        self._lengths: tuple[int, ...] = tuple(
+            sorted({len(key) for key in (*self._literals, *self._prefixed)})
+        )
+        self._combined: str = ""
+        self._groups: tuple[tuple[str, int], ...] = ()
+        self._separate: tuple[tuple[int, str], ...] = tuple(
+            (position, regex)
+            for position, regex in others
+            if _BACKREFERENCE.search(regex)
+        )
+        for _, regex in self._separate:
+            re.compile(regex)
+        self._buckets: dict[str, list[tuple[int, re.Pattern[str]]]] = {}
+        self._others: (
+            tuple[re.Pattern[str] | None, list[tuple[int, re.Pattern[str]]]]
+            | None
+        ) = None
+        self._combine(
+            [
+                (position, regex)
+                for position, regex in others
+                if not _BACKREFERENCE.search(regex)
+            ]
+        )
+
+    def _combine(self, others: list[tuple[int, str]]) -> None:
+        """Combine `others` into a single pattern, or fall back to matching
+        them one by one when they cannot be combined.
+
+        Args:
+            others: the positions and regexes that are not literals.
+        """
+        if not others:
+            return
+
+        self._groups = tuple(
+            (f"a{position}", position) for position, _ in others
+        )
+        combined: str = "".join(
+            f"(?:(?=(?P<a{position}>{regex}))|)" for position, regex in others
+        )
+        try:
+            re.compile(combined)
+            self._combined = combined
+        except re.error as error:
+            logging.debug("Matching regexes one by one: %s", error)
+            self._groups = ()
+            for _, regex in others:
+                re.compile(regex)
+            self._separate += tuple(others)
+
+    def _bucket(self, head: str) -> list[tuple[int, re.Pattern[str]]]:
+        """Return the compiled regexes of which `head` is the prefix, which
+        are compiled on first use.
+
+        Args:
+            head: the prefix.
+
+        Returns:
+            the positions and compiled patterns of the regexes.
+        """
+        bucket: list[tuple[int, re.Pattern[str]]] | None = self._buckets.get(
+            head
+        )
+        if bucket is None:
+            bucket = self._buckets[head] = [
+                (position, re.compile(regex))
+                for position, regex in self._prefixed[head]
+            ]
+        return bucket
+
+    def _compile_others(
+        self,
+    ) -> tuple[re.Pattern[str] | None, list[tuple[int, re.Pattern[str]]]]:
+        """Return the combined pattern and the patterns that are matched one
+        by one, which are compiled on first use."""
+        if self._others is None:
+            self._others = (
+                re.compile(self._combined) if self._combined else None,
+                [
+                    (position, re.compile(regex))
+                    for position, regex in self._separate
+                ],
+            )
+        return self._others
+
+    def match(self, command: str) -> list[int]:
+        """Return the positions of all regexes that match `command`.
+
+        Args:
+            command: the name of the command.
+
+        Returns:
+            the positions of the matching regexes, in ascending order.
+        """
+        found: set[int] = set()
+        for length in self._lengths:
+            if length > len(command):
+                break
+            head: str = command[:length]
+            found.update(self._literals.get(head, ()))
+            if head in self._prefixed:
+                found.update(
+                    position
+                    for position, pattern in self._bucket(head)
+                    if pattern.match(command)
+                )
+
+        combined: re.Pattern[str] | None
+        separate: list[tuple[int, re.Pattern[str]]]
+        combined, separate = self._compile_others()
+        match: re.Match[str] | None = combined and combined.match(command)
+        if match:
+            found.update(
+                position
+                for name, position in self._groups
+                if match.group(name) is not None
+            )
+
+        found.update(
+            position
+            for position, pattern in separate
+            if pattern.match(command)
+        )
+        return sorted(found)
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Return the state to pickle, without the compiled patterns."""
+        state: dict[str, Any] = dict(self.__dict__)
+        state["_buckets"] = {}
+        state["_others"] = None
+        return state
+
+    def __repr__(self) -> str:
+        return (
+            f"Dispatch(literals={len(self._literals)}, "
+            f"prefixed={len(self._prefixed)}, combined={len(self._groups)}, "
+            f"separate={len(self._separate)})"
+        )
@@ -0,0 +1,2 @@
+class SettingsError(Exception):
+    """Raised when an error occurs while handling settings."""
@@ -0,0 +1,203 @@
+"""Serialize the sends of concurrent key2pane processes to the same pane.
+
+A send may consist of several tmux commands, e.g. a C-c, a paste, and the
+keys, which must not be interleaved with those of another send to the same
+pane. Each pane has a directory with a ticket counter and a slot file for
+each ticket, which are locked using `flock`:
+
+- A process draws the next ticket, and creates and locks its slot, while it
+  holds the lock of the counter.
+- It then waits for the lock of the slot of the previous ticket, which is
+  released when the previous process is done. Processes therefore get the
+  pane in the order in which they drew their tickets.
+- A process that gives up waiting, or dies while waiting, leaves its slot
+  empty, so the next process continues waiting for the slot before it.
+
+No process has to stay around, and a process that dies while holding the
+pane releases it, as the lock of its slot is released by the kernel.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import time
+from contextlib import ExitStack, contextmanager
+
+from key2pane.runtime import open_private, pane_path
+from key2pane.tmux import TmuxError
+from key2pane.trace import span
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from typing import IO
+
+_HELD: str = "held"
+_MAX_DELAY: float = 0.01
+
+
+def lock_dir(target: str) -> str:
+    """Return the directory of the tickets of a pane.
+
+    Args:
+        target: the tmux target of the pane, preferably its id, e.g. `%3`.
+
+    Returns:
+        the path of the directory.
+    """
+    return pane_path("key2pane-locks", target)
+
+
+def _draw(directory: str) -> tuple[int, IO[str]]:
+    """Draw the next ticket, and create and lock its slot.
+
+    Args:
+        directory: the directory of the tickets.
+
+    Returns:
+        the ticket, and its locked slot.
+    """
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    with open_private(os.path.join(directory, "tail"), "a+") as tail:
+        fcntl.flock(tail, fcntl.LOCK_EX)
+        tail.seek(0)
+        try:
+            ticket: int = int(tail.read() or 0) + 1
+        except ValueError:
+            ticket = 1
+        tail.seek(0)
+        tail.truncate()
+        tail.write(str(ticket))
+        tail.flush()
+
+        slot: IO[str] = open_private(
+            os.path.join(directory, str(ticket)), "w"
+        )
+        fcntl.flock(slot, fcntl.LOCK_EX)
+    return ticket, slot
+
+
+def _wait(file: IO[str], deadline: float) -> bool:
+    """Wait until the lock of `file` is acquired, polling with a growing
+    delay.
+
+    Args:
+        file: the file.
+        deadline: the value of `time.monotonic` after which to give up.
+
+    Returns:
+        whether the lock was acquired.
+    """
+    delay: float = 0.0005
+    while True:
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            remaining: float = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, _MAX_DELAY)
+
+
+def _acquire(
+    directory: str, ticket: int, deadline: float
+) -> list[str] | None:
+    """Wait for the slots before `ticket`, until one is found of which the
+    process held the pane, or until no slot is left.
+
+    Args:
+        directory: the directory of the tickets.
+        ticket: the ticket of this process.
+        deadline: the value of `time.monotonic` after which to give up.
+
+    Returns:
+        the paths of the slots that were waited for, or None if the deadline
+        has passed.
+    """
+    passed: list[str] = []
+    for previous in range(ticket - 1, 0, -1):
+        path: str = os.path.join(directory, str(previous))
+        try:
+            file: IO[str] = open_private(path)
+        except FileNotFoundError:
+            break
+        with file:
+            if not _wait(file, deadline):
+                return None
+            passed.append(path)
+            if file.read() == _HELD:
+                break
+    return passed
+
+
+@contextmanager
+def pane_lock(target: str, timeout: int) -> Iterator[None]:
+    """Hold the pane `target` while the body is executed, after the
+    processes that asked for it earlier are done.
+
+    Args:
+        target: the tmux target of the pane, preferably its id, e.g. `%3`,
+            as it does not change when panes are renumbered.
+        timeout: the time in milliseconds to wait for the pane. If 0, the
+            pane is not locked.
+
+    Raises:
+        TmuxError: when the pane is not available within `timeout`.
+
+    Yields:
+        None
+    """
+    if not timeout:
+        yield
+        return
+
+    directory: str = lock_dir(target)
+    deadline: float = time.monotonic() + timeout / 1000
+    with span("lock", target=target) as current:
+        ticket, slot = _draw(directory)
+        current.set("ticket", ticket)
+        passed: list[str] | None = _acquire(directory, ticket, deadline)
+        if passed is None:
+            slot.close()
+            raise TmuxError(
+                f"Timed out after {timeout} ms waiting for pane {target}"
+            )
+
+        slot.write(_HELD)
+        slot.flush()
+        for path in passed:
+            os.unlink(path)
+        current.set("waited", len(passed))
+
+    with slot:
+        yield
+
+
+@contextmanager
+def pane_locks(targets: Iterable[str], timeout: int) -> Iterator[None]:
+    """Hold several panes while the body is executed, see `pane_lock`.
+
+    The panes are locked in the order of their targets, so processes that
+    hold overlapping sets of panes do not wait for each other forever.
+
+    Args:
+        targets: the tmux targets of the panes, preferably their ids.
+        timeout: the time in milliseconds to wait for each pane. If 0, the
+            panes are not locked.
+
+    Raises:
+        TmuxError: when a pane is not available within `timeout`.
+
+    Yields:
+        None
+    """
+    with ExitStack() as stack:
+        for target in sorted(set(targets)):
+            stack.enter_context(pane_lock(target, timeout))
+        yield
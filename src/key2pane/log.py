@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import logging
+import sys
+import threading
+from os import makedirs
+from os.path import dirname
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from queue import SimpleQueue
+
+
+class Pretty:
+    """Pretty-print an object, but only when a log record that contains it
+    is formatted.
+
+    Use it as an argument of a log call, e.g.
+    `logging.debug("Config:\\n%s", Pretty(config))`, such that nothing is
+    formatted when the record is below the log level.
+    """
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: object):
+        """Initialize the Pretty.
+
+        Args:
+            obj: the object to pretty-print.
+        """
+        self.obj: object = obj
+
+    def __str__(self) -> str:
+        from pprint import pformat
+
+        return pformat(self.obj)
+
+
+class BackgroundFileHandler(logging.Handler):
+    """Write log records to a daily rotating log file from a background
+    thread.
+
+    Nothing is done until the first record is emitted: only then the
+    directory of the log file is created, and a thread is started that opens
+    the file. Records are handed to this thread through a queue, so that
+    emitting a record never waits for the disk.
+    """
+
+    def __init__(self, logfile: str, store_days: int = 7):
+        """Initialize the BackgroundFileHandler.
+
+        Args:
+            logfile: The path to the log file.
+            store_days: The number of days to keep the logs.
+        """
+        super().__init__()
+        self.logfile: str = logfile
+        self.store_days: int = store_days
+        self._queue_handler: logging.Handler | None = None
+        self._queue: SimpleQueue[logging.LogRecord | None] | None = None
+        self._thread: threading.Thread | None = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Hand `record` to the background thread, which is started if it is
+        not running yet.
+
+        Args:
+            record: the log record.
+        """
+        queue_handler: logging.Handler = self._queue_handler or self._start()
+        queue_handler.handle(record)
+
+    def _start(self) -> logging.Handler:
+        """Start the background thread and the queue it reads from.
+
+        Returns:
+            a handler that puts records on the queue.
+        """
+        from logging.handlers import QueueHandler
+        from queue import SimpleQueue
+
+        self._queue = SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._write,
+            args=(self._queue,),
+            name="key2pane-log",
+            daemon=True,
+        )
+        self._thread.start()
+        self._queue_handler = QueueHandler(self._queue)
+        return self._queue_handler
+
+    def _write(self, queue: SimpleQueue[logging.LogRecord | None]) -> None:
+        """Write the records of `queue` to the log file until None is
+        received. If the log file cannot be opened, the records are
+        discarded.
+
+        Args:
+            queue: the queue to read records from.
+        """
+        from logging.handlers import TimedRotatingFileHandler
+
+        handler: logging.Handler | None
+        try:
+            makedirs(dirname(self.logfile), exist_ok=True)
+            handler = TimedRotatingFileHandler(
+                self.logfile, when="D", interval=1, backupCount=self.store_days
+            )
+            handler.setFormatter(self.formatter)
+        except OSError as error:
+            sys.stderr.write(f"Cannot open log file: {error}\n")
+            handler = None
+
+        record: logging.LogRecord | None = queue.get()
+        while record is not None:
+            if handler is not None:
+                handler.handle(record)
+            record = queue.get()
+
+        if handler is not None:
+            handler.close()
+
+    def close(self) -> None:
+        """Write the remaining records and close the log file."""
+        if self._thread is not None and self._queue is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        super().close()
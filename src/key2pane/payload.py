@@ -0,0 +1,126 @@
+"""Paste large contents into panes using a tmux buffer.
+
+Keys that are passed to `tmux send-keys` are limited by the maximum length
+of the command line, and tmux handles them one key at a time. A payload is
+therefore streamed into a tmux buffer using `tmux load-buffer -`, and pasted
+using `tmux paste-buffer`, unless it is small enough to be typed using
+`tmux send-keys -l`.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from contextlib import contextmanager
+
+from key2pane.defaults import THRESHOLD
+from key2pane.errors import SettingsError
+from key2pane.tmux import load_buffer
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from typing import BinaryIO
+
+
+class Payload:
+    """Contents to paste into one or more panes.
+
+    The contents are read when they are pasted for the first time. When they
+    exceed the threshold, or when a bracketed paste is requested, they are
+    loaded into a tmux buffer once, which is pasted into each pane.
+    """
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        threshold: int = THRESHOLD,
+        bracketed: bool = False,
+    ):
+        """Initialize the Payload.
+
+        Args:
+            stream: the contents.
+            threshold: the size in bytes above which a tmux buffer is used.
+            bracketed: whether to paste using bracketed paste mode, if the
+                application in the pane requested it, so e.g. a REPL does
+                not run the lines of the contents one by one.
+        """
+        self._stream: BinaryIO = stream
+        self._threshold: int = threshold
+        self._bracketed: bool = bracketed
+        self._text: str | None = None
+        self._buffer: str | None = None
+
+    def _read(self) -> None:
+        """Read the contents, or load them into a tmux buffer if they are
+        too large."""
+        head: bytes = self._stream.read(self._threshold + 1)
+        if len(head) <= self._threshold and not self._bracketed:
+            self._text = head.decode("utf-8", "replace")
+        else:
+            self._buffer = f"key2pane-{os.getpid()}-{os.urandom(4).hex()}"
+            load_buffer(self._buffer, head, self._stream)
+
+    def paste(self, target: str) -> tuple[str, ...]:
+        """Return the tmux command that pastes the contents into a pane.
+
+        Args:
+            target: the tmux target of the pane.
+
+        Raises:
+            TmuxError: when the contents cannot be loaded into a buffer.
+
+        Returns:
+            the arguments of the tmux command.
+        """
+        if self._text is None and self._buffer is None:
+            self._read()
+
+        if self._buffer is None:
+            return ("send-keys", "-t", target, "-l", self._text or "")
+
+        bracketed: tuple[str, ...] = ("-p",) if self._bracketed else ()
+        return ("paste-buffer", "-b", self._buffer, "-t", target, *bracketed)
+
+    def cleanup(self) -> tuple[str, ...] | None:
+        """Return the tmux command that deletes the buffer of the contents.
+
+        Returns:
+            the arguments of the tmux command, or None if no buffer is used.
+        """
+        if self._buffer is None:
+            return None
+        return ("delete-buffer", "-b", self._buffer)
+
+
+@contextmanager
+def open_payload(
+    path: str | None, threshold: int = THRESHOLD, bracketed: bool = False
+) -> Iterator[Payload | None]:
+    """Open the file at `path` as a Payload.
+
+    Args:
+        path: the path of the file, `-` for stdin, or None for no payload.
+        threshold: the size in bytes above which a tmux buffer is used.
+        bracketed: whether to use bracketed paste mode.
+
+    Raises:
+        SettingsError: when the file cannot be opened.
+
+    Yields:
+        the payload, or None if `path` is None.
+    """
+    if path is None:
+        yield None
+        return
+    elif path == "-":
+        yield Payload(sys.stdin.buffer, threshold, bracketed)
+        return
+
+    try:
+        stream: BinaryIO = open(path, "rb")
+    except OSError as error:
+        raise SettingsError(f"Cannot open payload: {error}") from error
+    with stream:
+        yield Payload(stream, threshold, bracketed)
@@ -0,0 +1,130 @@
+"""Find the foreground process of a pane by reading /proc, on Linux.
+
+tmux reports only the name of the foreground process of a pane, so `python`
+running a REPL cannot be told apart from `python` running a script. When
+key2pane itself runs in the pane, tmux reports key2pane instead of the shell.
+Reading /proc gives the full command line, and does not start a process.
+"""
+
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+
+_STARTTIME: int = 19
+_SCRIPTS: frozenset[str] = frozenset(("key2pane", "key2pane-client"))
+_MODULES: frozenset[str] = frozenset(
+    ("key2pane", "key2pane.__main__", "key2pane.client")
+)
+
+
+def _stat(pid: int) -> tuple[str, list[str]]:
+    """Return the name of process `pid` and the fields of /proc/<pid>/stat
+    that follow it, starting with the state.
+
+    Args:
+        pid: the process id.
+
+    Raises:
+        OSError: when the process does not exist.
+
+    Returns:
+        the name and the remaining fields.
+    """
+    with open(f"/proc/{pid}/stat", "rb") as file:
+        data: str = file.read().decode("utf-8", "replace")
+    start: int = data.index("(")
+    end: int = data.rindex(")")
+    return data[start + 1 : end], data[end + 2 :].split()
+
+
+@lru_cache(maxsize=256)
+def _cmdline(pid: int, starttime: str) -> tuple[str, ...]:
+    """Return the arguments of process `pid`. Results are cached by process
+    id and start time, so a reused process id is read again.
+
+    Args:
+        pid: the process id.
+        starttime: the start time of the process.
+
+    Raises:
+        OSError: when the process does not exist.
+
+    Returns:
+        the arguments, which are empty for e.g. zombie processes.
+    """
+    with open(f"/proc/{pid}/cmdline", "rb") as file:
+        data: bytes = file.read().rstrip(b"\0")
+    return tuple(arg.decode("utf-8", "replace") for arg in data.split(b"\0"))
+
+
+def _is_key2pane(argv: tuple[str, ...]) -> bool:
+    """Return True if `argv` runs key2pane or key2pane-client, either as a
+    script, also through the Python interpreter of its shebang, or as
+    `python -m key2pane`. Other programs that are passed a file named like
+    key2pane, e.g. `vim key2pane.py`, are not key2pane.
+    """
+    program: str = os.path.basename(argv[0]) if argv else ""
+    if program in _SCRIPTS:
+        return True
+    elif not program.startswith("python") or len(argv) < 2:
+        return False
+    elif argv[1] == "-m":
+        return len(argv) > 2 and argv[2] in _MODULES
+    elif argv[1].startswith("-m"):
+        return argv[1][2:] in _MODULES
+    return os.path.basename(argv[1]) in _SCRIPTS
+
+
+def foreground(pid: int, tty: str | None = None) -> tuple[str, ...] | None:
+    """Return the arguments of the foreground process of a pane.
+
+    The foreground process group of the terminal of `pid` is read from
+    /proc/<pid>/stat. If its leader runs key2pane, its parent is returned
+    instead, which is typically the shell key2pane was started from.
+
+    Args:
+        pid: the process id of the pane, i.e. `#{pane_pid}`.
+        tty: the terminal of the pane, i.e. `#{pane_tty}`. If given, it must
+            be the terminal of `pid`, which guards against reused ids.
+
+    Returns:
+        the arguments of the foreground process, or None if they cannot be
+        read, e.g. because /proc does not exist.
+    """
+    try:
+        _, fields = _stat(pid)
+        if tty and os.stat(tty).st_rdev != int(fields[4]):
+            return None
+
+        leader: int = int(fields[5])
+        for _ in range(8):
+            name, fields = _stat(leader)
+            argv: tuple[str, ...] = _cmdline(leader, fields[_STARTTIME])
+            if not _is_key2pane(argv):
+                return argv if argv != ("",) else (name,)
+            leader = int(fields[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def command(pid: int, tty: str | None = None) -> str | None:
+    """Return the command line of the foreground process of a pane.
+
+    The first argument is reduced to its base name, without the leading dash
+    of a login shell, so `-bash` becomes `bash` and `/usr/bin/python3
+    script.py` becomes `python3 script.py`.
+
+    Args:
+        pid: the process id of the pane, i.e. `#{pane_pid}`.
+        tty: the terminal of the pane, i.e. `#{pane_tty}`.
+
+    Returns:
+        the command line, or None if it cannot be read.
+    """
+    argv: tuple[str, ...] | None = foreground(pid, tty)
+    if not argv:
+        return None
+    name: str = os.path.basename(argv[0]).lstrip("-")
+    return " ".join((name, *argv[1:]))
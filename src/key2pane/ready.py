@@ -0,0 +1,132 @@
+"""Wait until a pane is ready for keys after it was reset using C-c.
+
+An application needs some time to handle a C-c, e.g. to stop a program and
+print a new prompt. Keys that are sent before that may be lost, or may end
+up in the program that is being stopped. After the C-c, the pane is polled
+with a growing delay, where each poll is a single round-trip to tmux that
+returns the command of the pane, the position of its cursor, and its
+visible contents. The pane is ready when:
+
+- its command matches the regex of the action, e.g. the shell is in the
+  foreground again, and
+- its cursor and contents did not change between two polls, and
+- its cursor or contents changed since the C-c, or they did not change for
+  a while, as not every application responds visibly to a C-c.
+
+If the pane is not ready within the latency budget, the keys are sent anyway.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+
+from key2pane.tmux import execute, execute_many
+from key2pane.trace import span
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import re
+
+    from key2pane.backend import Backend
+
+QUIET: int = 50
+_DELIMITER: str = "\x1f"
+_MAX_DELAY: float = 0.05
+
+
+def probe(target: str, backend: Backend | None = None) -> tuple[str, int]:
+    """Return the command of a pane, and a hash of its cursor and visible
+    contents.
+
+    Args:
+        target: the tmux target of the pane.
+        backend: the backend that queries the pane. If None, the backend
+            that is set using `key2pane.tmux.connected` is used.
+
+    Raises:
+        TmuxError: when the pane cannot be queried.
+
+    Returns:
+        the command and the hash.
+    """
+    info, screen = (execute_many if backend is None else backend.execute_many)(
+        [
+            (
+                "display-message",
+                "-p",
+                "-t",
+                target,
+                _DELIMITER.join(
+                    ("#{pane_current_command}", "#{cursor_x}", "#{cursor_y}")
+                ),
+            ),
+            ("capture-pane", "-p", "-t", target),
+        ]
+    )
+    command, _, cursor = info.partition(_DELIMITER)
+    return command, hash((cursor, screen))
+
+
+def reset(
+    target: str,
+    pattern: re.Pattern[str] | None,
+    budget: int,
+    quiet: int = QUIET,
+    backend: Backend | None = None,
+) -> bool:
+    """Send a C-c to a pane and wait until it is ready for keys.
+
+    Args:
+        target: the tmux target of the pane.
+        pattern: the regex that the command of the pane must match, or None
+            if only the cursor and the contents of the pane are checked.
+        budget: the time in milliseconds after which the wait is given up.
+        quiet: the time in milliseconds after which a pane of which the
+            cursor and contents did not change since the C-c is ready.
+        backend: the backend that resets and queries the pane, e.g. one of
+            another tmux server. If None, the backend that is set using
+            `key2pane.tmux.connected` is used.
+
+    Raises:
+        TmuxError: when the pane cannot be reset or queried.
+
+    Returns:
+        whether the pane became ready within the budget.
+    """
+    with span("reset", target=target, budget=budget) as current:
+        _, before = probe(target, backend)
+        logging.debug("Resetting pane %s by sending C-c", target)
+        (execute if backend is None else backend.execute)(
+            "send-keys", "-t", target, "C-c"
+        )
+        start: float = time.monotonic()
+        deadline: float = start + budget / 1000
+        delay: float = 0.001
+        last: int | None = None
+        polls: int = 0
+        while True:
+            time.sleep(max(min(delay, deadline - time.monotonic()), 0))
+            delay = min(delay * 2, _MAX_DELAY)
+            command, screen = probe(target, backend)
+            polls += 1
+            elapsed: float = time.monotonic() - start
+            if (
+                (pattern is None or pattern.match(command))
+                and screen == last
+                and (screen != before or elapsed >= quiet / 1000)
+            ):
+                current.set("polls", polls)
+                current.set("ready", True)
+                return True
+            elif elapsed >= budget / 1000:
+                logging.info(
+                    "Pane %s is not ready after %s ms, running %s",
+                    target,
+                    budget,
+                    command,
+                )
+                current.set("polls", polls)
+                current.set("ready", False)
+                return False
+            last = screen
@@ -0,0 +1,87 @@
+"""Read the records of `key2pane --stdin`.
+
+Each record holds the positional arguments of one invocation, quoted like a
+shell command line, and is optionally preceded by `-t TARGET` to choose the
+pane. Records are separated by newlines, or by NUL characters, in which case
+a quoted argument may span several lines:
+
+    -t %3 'first line' second
+    third
+"""
+
+from __future__ import annotations
+
+import shlex
+
+from key2pane.errors import SettingsError
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from typing import IO, Callable
+
+_CHUNK: int = 1 << 16
+
+
+def read_records(stream: IO[bytes], delimiter: bytes) -> Iterator[str]:
+    """Yield the records of `stream` as soon as they are complete, so a
+    record is handled while the next one is still being written. Empty
+    records are skipped.
+
+    A buffered stream is read using `read1`, which returns what is available
+    instead of waiting for a full chunk. Other streams are read using `read`.
+
+    Args:
+        stream: the stream, e.g. `sys.stdin.buffer`.
+        delimiter: the byte that separates the records, i.e. a newline or a
+            NUL character.
+
+    Yields:
+        the records, without the delimiter.
+    """
+    read: Callable[[int], bytes] = getattr(stream, "read1", stream.read)
+    pending: bytes = b""
+    while True:
+        chunk: bytes = read(_CHUNK)
+        if not chunk:
+            break
+        *complete, pending = (pending + chunk).split(delimiter)
+        for record in complete:
+            if record.strip():
+                yield record.decode("utf-8", "replace")
+
+    if pending.strip():
+        yield pending.decode("utf-8", "replace")
+
+
+def parse_record(record: str) -> tuple[str | None, list[str]]:
+    """Split a record into its target and its positional arguments.
+
+    Args:
+        record: the record, e.g. `-t %3 foo 'bar baz'`.
+
+    Raises:
+        SettingsError: when the quotes of the record are unbalanced, or
+            when `-t` is not followed by a target.
+
+    Returns:
+        the target, or None if the record has none, and the positional
+        arguments.
+    """
+    try:
+        words: list[str] = shlex.split(record)
+    except ValueError as error:
+        raise SettingsError(f"Invalid record: {error}") from error
+
+    target: str | None = None
+    if words and words[0].startswith("--target="):
+        target = words.pop(0).partition("=")[2]
+    elif words and words[0] in ("-t", "--target"):
+        if len(words) < 2:
+            raise SettingsError(f"Missing target: {record}")
+        target = words[1]
+        del words[:2]
+
+    if words and words[0] == "--":
+        del words[0]
+    return target or None, words
@@ -0,0 +1,125 @@
+"""The runtime files of key2pane, like the locks and the coalescing state
+of the panes, and the socket of the daemon.
+
+They are kept in `XDG_RUNTIME_DIR`, or in a directory in /tmp that is
+private to the current user. As other users can create files in /tmp, the
+directory is checked before it is used, and files are never opened through
+a symlink.
+"""
+
+from __future__ import annotations
+
+import os
+import stat
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import IO
+
+_FLAGS: dict[str, int] = {
+    "r": os.O_RDONLY,
+    "w": os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+    "a+": os.O_RDWR | os.O_CREAT | os.O_APPEND,
+}
+
+
+def runtime_dir() -> str:
+    """Return the directory for the runtime files of key2pane.
+
+    Without `XDG_RUNTIME_DIR`, the directory `/tmp/key2pane-UID` is created
+    with mode 0700. As its name is predictable, it is only used when it is
+    a directory, not a symlink, that is owned by the current user, and that
+    is not accessible by others.
+
+    Raises:
+        PermissionError: when the directory in /tmp is not private to the
+            current user.
+
+    Returns:
+        `XDG_RUNTIME_DIR`, or the directory in /tmp.
+    """
+    if "XDG_RUNTIME_DIR" in os.environ:
+        return os.environ["XDG_RUNTIME_DIR"]
+
+    path: str = f"/tmp/key2pane-{os.getuid()}"
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info: os.stat_result = os.lstat(path)
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or stat.S_IMODE(info.st_mode) != 0o700
+    ):
+        raise PermissionError(
+            f"{path} is not a directory that is private to the current user"
+        )
+    return path
+
+
+def private_dir(*names: str) -> str:
+    """Return a directory in `runtime_dir()`, and create it, and each of its
+    parents, with mode 0700 if needed.
+
+    Args:
+        *names: the names of the directory and its parents, relative to
+            `runtime_dir()`, e.g. `key2pane-locks`.
+
+    Raises:
+        PermissionError: when the runtime directory is not private.
+
+    Returns:
+        the path of the directory.
+    """
+    path: str = runtime_dir()
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    for name in names:
+        path = os.path.join(path, name)
+        try:
+            os.mkdir(path, 0o700)
+        except FileExistsError:
+            pass
+    return path
+
+
+def open_private(path: str, mode: str = "r") -> IO[str]:
+    """Open a runtime file as utf-8 text without following a symlink, and
+    create it with mode 0600 if needed.
+
+    Args:
+        path: the path of the file.
+        mode: `r`, `w`, or `a+`, like `open`.
+
+    Raises:
+        OSError: when the file cannot be opened, e.g. because it is a
+            symlink.
+
+    Returns:
+        the file.
+    """
+    flags: int = _FLAGS[mode] | os.O_NOFOLLOW | os.O_CLOEXEC
+    return os.fdopen(
+        os.open(path, flags, 0o600), mode, encoding="utf-8", errors="replace"
+    )
+
+
+def pane_path(directory: str, target: str) -> str:
+    """Return the path of a runtime file of a pane, and create its directory
+    using `private_dir` if needed.
+
+    Args:
+        directory: the directory in `runtime_dir()`, e.g. `key2pane-locks`.
+        target: the tmux target of the pane, e.g. `%3`. Characters that are
+            not allowed in a file name are replaced by underscores.
+
+    Raises:
+        PermissionError: when the runtime directory is not private.
+
+    Returns:
+        the path of the file.
+    """
+    name: str = "".join(
+        char if char.isalnum() or char in "_.:-" else "_" for char in target
+    )
+    return os.path.join(private_dir(directory), name)
@@ -0,0 +1,260 @@
+"""Validate the contents of a config file, and turn its actions into compact
+objects.
+
+Each error names the location of the offending value, e.g.
+`actions[2].keys[0]`, so a mistake in a large config file is easy to find.
+The checks run when the config is compiled, so the actions that are matched
+against a command are known to be valid.
+"""
+
+from __future__ import annotations
+
+import re
+
+from key2pane.template import Plan, Template
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Any, TypeVar
+
+    T = TypeVar("T")
+
+_JSON_TYPES: dict[type, str] = {
+    dict: "an object",
+    list: "an array",
+    str: "a string",
+    bool: "a boolean",
+    int: "an integer",
+    float: "a number",
+    type(None): "null",
+}
+
+_OPTIONS: dict[str, type] = {
+    "session": str,
+    "window": int,
+    "index": int,
+    "reset": bool,
+    "resolver": str,
+    "logfile": str,
+    "loglevel": str,
+    "variables": dict,
+    "coalesce": int,
+    "lock_timeout": int,
+    "ready_timeout": int,
+    "servers": list,
+    "backend": str,
+    "actions": list,
+}
+
+
+def check(value: object, expected: type[T], location: str) -> T:
+    """Raise an error if `value` is not of the json type `expected`.
+
+    Args:
+        value: the value.
+        expected: the Python type of the json type, e.g. `int`. A boolean is
+            not accepted as an integer.
+        location: the location of the value, e.g. `actions[0].regex`.
+
+    Raises:
+        ValueError: when the value is of another type.
+
+    Returns:
+        the value.
+    """
+    if type(value) is not expected or not isinstance(value, expected):
+        raise ValueError(
+            f"Expected {_JSON_TYPES[expected]} at {location}, got "
+            f"{_JSON_TYPES.get(type(value), type(value).__name__)}"
+        )
+    return value
+
+
+def check_strings(value: object, location: str) -> dict[str, str]:
+    """Raise an error if `value` is not an object of which all values are
+    strings.
+
+    Args:
+        value: the value.
+        location: the location of the value, e.g. `variables`.
+
+    Raises:
+        ValueError: when the value is not an object of strings.
+
+    Returns:
+        the value.
+    """
+    strings: dict[str, str] = check(value, dict, location)
+    for key, item in strings.items():
+        check(item, str, f"{location}.{key}")
+    return strings
+
+
+def check_config(config: object) -> None:
+    """Raise an error if a setting of `config` has the wrong type. Settings
+    may be null, and unknown settings are ignored. The actions are checked
+    by `Action.parse`.
+
+    Args:
+        config: the contents of a config file.
+
+    Raises:
+        ValueError: when the config is not an object, or when a setting has
+            the wrong type.
+    """
+    settings: dict[str, Any] = check(config, dict, "the top level")
+    for name, expected in _OPTIONS.items():
+        value: Any = settings.get(name)
+        if value is not None:
+            check(value, expected, name)
+    if settings.get("variables") is not None:
+        check_strings(settings["variables"], "variables")
+    for i, server in enumerate(settings.get("servers") or []):
+        check(server, str, f"servers[{i}]")
+
+
+class Action:
+    """An action of the config: a regex, and the keys that are sent to a pane
+    of which the command matches the regex.
+
+    Attributes:
+        regex: the regex.
+        pattern: the compiled regex.
+        keys: the keys, which may contain placeholders.
+        plan: the parsed keys.
+        name: the name of the action, which is used in log messages.
+        coalesce: the window in milliseconds within which repeated sends
+            of the action to a pane are collapsed, or None to use the
+            window of the settings.
+    """
+
+    __slots__ = ("regex", "_pattern", "keys", "plan", "name", "coalesce")
+
+    _PROPERTIES: frozenset[str] = frozenset(
+        ("regex", "keys", "defaults", "name", "coalesce")
+    )
+
+    def __init__(
+        self,
+        regex: str,
+        keys: Sequence[str | Template],
+        defaults: dict[str, str] | None = None,
+        name: str | None = None,
+        coalesce: int | None = None,
+    ):
+        """Initialize the Action. Use `parse` to validate the properties of
+        an action of a config file.
+
+        Args:
+            regex: the regex.
+            keys: the keys, of which some may already be parsed.
+            defaults: the values of placeholders that are not passed.
+            name: the name of the action.
+            coalesce: the coalescing window in milliseconds.
+
+        Raises:
+            re.error: when the regex is invalid.
+            ValueError: when the placeholders of a key are malformed.
+        """
+        self.regex: str = regex
+        self._pattern: re.Pattern[str] | None = re.compile(regex)
+        self.plan: Plan = Plan(keys, defaults)
+        self.keys: tuple[str, ...] = tuple(
+            template.text for template in self.plan.templates
+        )
+        self.name: str | None = name
+        self.coalesce: int | None = coalesce
+
+    @classmethod
+    def parse(cls, data: object, location: str) -> Action:
+        """Validate the properties of an action of a config file, and create
+        the Action.
+
+        Args:
+            data: the action, as parsed from json.
+            location: the location of the action, e.g. `actions[0]`.
+
+        Raises:
+            ValueError: when a property is missing, unknown, or invalid.
+
+        Returns:
+            the Action.
+        """
+        action: dict[str, Any] = check(data, dict, location)
+        for key in action:
+            if key not in cls._PROPERTIES:
+                raise ValueError(f"Unknown property {location}.{key}")
+        for key in ("regex", "keys"):
+            if key not in action:
+                raise ValueError(f"Missing {location}.{key}")
+
+        regex: str = action["regex"]
+        check(regex, str, f"{location}.regex")
+        check(action["keys"], list, f"{location}.keys")
+        templates: list[Template] = []
+        for index, key in enumerate(action["keys"]):
+            check(key, str, f"{location}.keys[{index}]")
+            try:
+                templates.append(Template(key))
+            except ValueError as error:
+                raise ValueError(
+                    f"Invalid placeholder at {location}.keys[{index}]: {error}"
+                ) from error
+
+        defaults: dict[str, str] | None = action.get("defaults")
+        if defaults is not None:
+            check_strings(defaults, f"{location}.defaults")
+        name: str | None = action.get("name")
+        if name is not None:
+            check(name, str, f"{location}.name")
+        coalesce: int | None = action.get("coalesce")
+        if coalesce is not None:
+            check(coalesce, int, f"{location}.coalesce")
+
+        try:
+            return cls(regex, templates, defaults, name, coalesce)
+        except re.error as error:
+            raise ValueError(
+                f"Invalid regex at {location}.regex: {error}"
+            ) from error
+
+    @property
+    def pattern(self) -> re.Pattern[str]:
+        """The compiled regex, which is compiled on first use."""
+        if self._pattern is None:
+            self._pattern = re.compile(self.regex)
+        return self._pattern
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Return the state to pickle, without the compiled regex."""
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if name != "_pattern"
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._pattern = None
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Action):
+            return NotImplemented
+        return (
+            self.regex,
+            self.keys,
+            self.plan.defaults,
+            self.name,
+            self.coalesce,
+        ) == (
+            other.regex,
+            other.keys,
+            other.plan.defaults,
+            other.name,
+            other.coalesce,
+        )
+
+    def __repr__(self) -> str:
+        return f"Action(regex={self.regex!r}, keys={list(self.keys)!r})"
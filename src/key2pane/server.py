@@ -0,0 +1,298 @@
+import logging
+import os
+import signal
+import socket
+import socketserver
+import time
+from argparse import ArgumentParser, Namespace
+from contextlib import (
+    contextmanager,
+    nullcontext,
+    redirect_stderr,
+    redirect_stdout,
+)
+from io import StringIO
+from os.path import dirname, exists
+from typing import Any, ContextManager, Iterator
+
+from key2pane.__main__ import except_hook, run
+from key2pane.cli import make_parser, make_serve_parser, set_logging
+from key2pane.control import ControlMode
+from key2pane.settings import load_compiled_config
+from key2pane.tmux import (
+    PaneIndex,
+    TmuxError,
+    connected,
+    default_socket,
+    on_server,
+)
+from key2pane.trace import record, tracing
+from key2pane.watch import PaneWatcher
+
+
+class ConfigMemo:
+    """Keep config files in memory until they change on disk."""
+
+    def __init__(self):
+        """Initialize the ConfigMemo."""
+        self._configs: dict[str, tuple[tuple[int, int], dict[str, Any]]] = {}
+
+    def __call__(self, path: str) -> dict[str, Any]:
+        """Return the config at `path`, which is only loaded again if the
+        modification time or size of the file changed.
+
+        Args:
+            path: the path to the json file.
+
+        Raises:
+            SettingsError: when the file is not found or invalid.
+
+        Returns:
+            The contents of the json file as a dictionary.
+        """
+        path = os.path.abspath(path)
+        try:
+            stat: os.stat_result = os.stat(path)
+        except OSError:
+            self._configs.pop(path, None)
+            return load_compiled_config(path)
+
+        key: tuple[int, int] = (stat.st_mtime_ns, stat.st_size)
+        if path not in self._configs or self._configs[path][0] != key:
+            logging.info("Loading config %s", path)
+            self._configs[path] = (key, load_compiled_config(path))
+
+        return self._configs[path][1]
+
+
+class Handler(socketserver.StreamRequestHandler):
+    """Handle a single request of `key2pane.client.request`."""
+
+    def handle(self):
+        """Run the request and write the status, stdout, and stderr back to
+        the client. Incomplete requests, like those of `is_listening`, are
+        ignored."""
+        fields: list[str] = self.rfile.read().decode("utf-8").split("\0")
+        if len(fields) < 3:
+            logging.debug("Ignoring incomplete request: %s", fields)
+            return
+
+        cwd, socket, active, *argv = fields
+        assert isinstance(self.server, Server)
+        status, stdout, stderr = self.server.process(
+            argv, cwd, active, socket
+        )
+        self.wfile.write(f"{status}\0{stdout}\0{stderr}".encode("utf-8"))
+
+
+class Server(socketserver.UnixStreamServer):
+    """A unix socket server that runs key2pane invocations in-process.
+
+    Requests are handled one at a time, in the order they arrive, so that
+    keys that are sent to the same pane do not interleave. The argument
+    parser, the config files, and a tmux client in control mode are kept in
+    memory between requests. Optionally, the panes are kept in memory as
+    well, by a PaneWatcher.
+    """
+
+    def __init__(self, path: str, watch: bool = False):
+        """Initialize the Server.
+
+        Args:
+            path: the path of the unix socket to listen on.
+            watch: whether to keep the panes in memory using a PaneWatcher,
+                instead of querying them for each request.
+        """
+        super().__init__(path, Handler)
+        self.parser: ArgumentParser = make_parser()
+        self.loader: ConfigMemo = ConfigMemo()
+        self.client: ControlMode | None = None
+        self.watch: bool = watch
+        self.watcher: PaneWatcher | None = None
+        self.tmux_socket: str = default_socket()
+
+    def connect(self) -> ContextManager[None]:
+        """Return a context in which tmux commands are executed by the
+        control mode client of the server. The client is (re)started when it
+        is not running, e.g. because the tmux server was restarted.
+
+        Returns:
+            a context manager.
+        """
+        if self.client is None or not self.client.alive:
+            try:
+                self.client = ControlMode()
+            except TmuxError as error:
+                logging.info("Control mode is unavailable: %s", error)
+                self.client = None
+                return nullcontext()
+
+        return connected(self.client)
+
+    def serves(self, socket: str) -> bool:
+        """Return True if `socket` is the socket of the tmux server that the
+        control mode client and the watcher of the server use, or if it is
+        empty, i.e. the client does not run inside tmux.
+
+        Args:
+            socket: the path of the socket of a tmux server.
+
+        Returns:
+            True if the server is the same.
+        """
+        return not socket or os.path.realpath(socket) == os.path.realpath(
+            self.tmux_socket
+        )
+
+    @contextmanager
+    def elsewhere(self, socket: str) -> Iterator[None]:
+        """Execute the tmux commands of the context on the server of
+        `socket`, by starting a tmux client for each command.
+
+        Args:
+            socket: the path of the socket of a tmux server.
+        """
+        with on_server(socket), connected(None):
+            yield
+
+    def snapshot(self, target: str | None) -> PaneIndex:
+        """Return the snapshot of the panes, in which `target` is active.
+
+        When watching, the snapshot is taken from the PaneWatcher, which is
+        (re)started when it is not running. Otherwise, tmux is queried.
+
+        Args:
+            target: the tmux target of the active pane.
+
+        Returns:
+            the snapshot of the panes.
+        """
+        if not self.watch:
+            return PaneIndex.snapshot(target)
+
+        if self.watcher is None or not self.watcher.alive:
+            try:
+                self.watcher = PaneWatcher()
+            except TmuxError as error:
+                logging.info("Cannot watch the panes: %s", error)
+                self.watcher = None
+                return PaneIndex.snapshot(target)
+
+        return self.watcher.snapshot(target)
+
+    def server_close(self):
+        """Close the socket, the control mode client, and the watcher."""
+        super().server_close()
+        if self.client is not None:
+            self.client.close()
+        if self.watcher is not None:
+            self.watcher.close()
+
+    def process(
+        self, argv: list[str], cwd: str, active: str, socket: str = ""
+    ) -> tuple[int, str, str]:
+        """Run key2pane with `argv` as if it was invoked from `cwd`.
+
+        Log records of the invocation are written to its stderr, like the
+        command line interface does. When the client runs inside another
+        tmux server than the server, the tmux commands of the invocation are
+        executed on the server of the client, see `elsewhere`.
+
+        Args:
+            argv: the command line arguments, excluding the program name.
+            cwd: the working directory of the client.
+            active: the pane id of the client, or an empty string when the
+                client does not run inside tmux.
+            socket: the socket path of the tmux server of the client, or an
+                empty string when the client does not run inside tmux.
+
+        Returns:
+            the exit status, stdout, and stderr of the invocation.
+        """
+        stdout: StringIO = StringIO()
+        stderr: StringIO = StringIO()
+        handler: logging.Handler = logging.StreamHandler(stderr)
+        handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+
+        logger: logging.Logger = logging.getLogger()
+        level: int = logger.level
+        logger.addHandler(handler)
+        try:
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                os.chdir(cwd)
+                start: int = time.perf_counter_ns()
+                args: Namespace = self.parser.parse_args(argv)
+                logger.setLevel(args.loglevel)
+                with tracing(args.trace, args.trace_format):
+                    record("parse_args", start)
+                    if self.serves(socket):
+                        with self.connect():
+                            run(
+                                args,
+                                active or None,
+                                self.loader,
+                                self.snapshot,
+                            )
+                    else:
+                        with self.elsewhere(socket):
+                            run(args, active or None, self.loader)
+            status: int = 0
+        except SystemExit as error:
+            status = error.code if isinstance(error.code, int) else 0
+        except Exception as error:
+            status = except_hook(type(error), error, error.__traceback__)
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+
+        return status, stdout.getvalue(), stderr.getvalue()
+
+
+def is_listening(path: str) -> bool:
+    """Return True if a process is accepting connections on `path`.
+
+    Args:
+        path: the path of the unix socket.
+
+    Returns:
+        True if the socket accepts connections, False otherwise.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def serve(argv: list[str]) -> int:
+    """Entry point for `key2pane serve`.
+
+    Args:
+        argv: the command line arguments, excluding `key2pane serve`.
+
+    Returns:
+        0 when the daemon stopped, 1 when it could not be started.
+    """
+    args: Namespace = make_serve_parser().parse_args(argv)
+    set_logging(args.loglevel, args.logfile)
+
+    if is_listening(args.socket):
+        logging.error("A daemon is already listening on %s", args.socket)
+        return 1
+    elif exists(args.socket):
+        logging.info("Removing stale socket %s", args.socket)
+        os.unlink(args.socket)
+
+    os.makedirs(dirname(args.socket), mode=0o700, exist_ok=True)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    with Server(args.socket, args.watch) as server:
+        logging.info("Listening on %s", args.socket)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logging.info("Stopping daemon")
+        finally:
+            os.unlink(args.socket)
+
+    return 0
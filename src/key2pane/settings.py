@@ -1,13 +1,19 @@
-import json
+from __future__ import annotations
+
 import logging
 import re
-from dataclasses import dataclass
+from dataclasses import MISSING, dataclass, field, fields
 from os.path import exists
-from typing import Any
 
+from key2pane import cache
+from key2pane.dispatch import Dispatch
+from key2pane.errors import SettingsError
+from key2pane.schema import Action, check_config
 
-class SettingsError(Exception):
-    """Raised when an error occurs while handling settings."""
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from typing import Any
 
 
 def load_config(path: str) -> dict[str, str]:
@@ -22,6 +28,8 @@ def load_config(path: str) -> dict[str, str]:
     Returns:
         The contents of the json file as a dictionary.
     """
+    import json
+
     if not exists(path):
         logging.warning("Config file not found at %s", path)
         raise SettingsError("Config file not found")
@@ -34,6 +42,64 @@ def load_config(path: str) -> dict[str, str]:
             raise SettingsError("Invalid config file") from error
 
 
+def load_compiled_config(path: str) -> dict[str, Any]:
+    """Return the contents of a json file at `path` as a dictionary, with the
+    regexes of its actions compiled into a Dispatch under the `dispatch` key.
+
+    The result is cached on disk, such that the json file is only parsed and
+    compiled again when it changes.
+
+    Args:
+        path: the path to the json file.
+
+    Raises:
+        SettingsError: when the file is not found or invalid.
+
+    Returns:
+        The compiled contents of the json file as a dictionary.
+    """
+    if not exists(path):
+        logging.warning("Config file not found at %s", path)
+        raise SettingsError("Config file not found")
+
+    return cache.load(path, compile_config)
+
+
+def compile_config(data: bytes) -> dict[str, Any]:
+    """Parse and validate the contents of a json config file. Its actions
+    are turned into Action objects, of which the regexes are compiled into a
+    Dispatch under the `dispatch` key.
+
+    Args:
+        data: the contents of the json file.
+
+    Raises:
+        SettingsError: when the contents are invalid.
+
+    Returns:
+        The compiled contents of the json file as a dictionary.
+    """
+    import json
+
+    try:
+        config: Any = json.loads(data)
+    except json.JSONDecodeError as error:
+        logging.error(error)
+        raise SettingsError("Invalid config file") from error
+
+    try:
+        check_config(config)
+    except ValueError as error:
+        raise SettingsError(f"Invalid config file: {error}") from error
+
+    config["actions"] = Settings.parse(config.get("actions") or [])
+    config["dispatch"] = Settings.compile(config["actions"])
+    return config
+
+
+RESOLVERS: tuple[str, ...] = ("tmux", "proc")
+
+
 @dataclass
 class Settings:
     """Dataclass for settings.
@@ -42,16 +108,96 @@ class Settings:
         index: the index of the pane.
         window: the window of the pane.
         session: the session of the pane.
-        actions: the keys to send based on the pane's command.
+        actions: the keys to send based on the pane's command. Actions that
+            are given as dictionaries, as in the config file, are validated
+            and turned into Action objects.
         positional: the positional arguments passed to the script.
+        resolver: how the command of a pane is found. Either `tmux`, which
+            uses the name tmux reports, or `proc`, which reads the command
+            line of the foreground process from /proc.
+        variables: the values of the named placeholders of the keys.
+        coalesce: the window in milliseconds within which repeated sends to
+            a pane are collapsed. 0 disables coalescing.
+        lock_timeout: the time in milliseconds to wait for other key2pane
+            processes that send to the same pane. 0 disables locking.
+        ready_timeout: the time in milliseconds to wait for a pane to be
+            ready for keys after a reset. 0 sends the keys right away.
+        dispatch: the compiled regexes of the actions. If None, the regexes
+            are compiled when the Settings are created.
     """
 
     index: int
     window: int
     session: str
     reset: bool
-    actions: list[dict[str, str | list[str]]]
+    actions: Sequence[Action | dict[str, Any]]
     positional: list[str]
+    resolver: str = "tmux"
+    variables: dict[str, str] = field(default_factory=dict)
+    coalesce: int = 0
+    lock_timeout: int = 5000
+    ready_timeout: int = 1000
+    dispatch: Dispatch | None = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        """Validate the actions and compile their regexes, if needed.
+
+        Raises:
+            SettingsError: when one of the actions or the resolver is
+                invalid.
+        """
+        if self.resolver not in RESOLVERS:
+            raise SettingsError(f"Invalid resolver: {self.resolver}")
+        self._actions: tuple[Action, ...] = self.parse(self.actions)
+        self.actions = self._actions
+        self._dispatch: Dispatch = (
+            self.dispatch
+            if isinstance(self.dispatch, Dispatch)
+            else self.compile(self._actions)
+        )
+
+    @staticmethod
+    def parse(actions: Sequence[object]) -> tuple[Action, ...]:
+        """Validate `actions` and turn them into Action objects.
+
+        Args:
+            actions: the actions, as parsed from json. Action objects are
+                kept as they are.
+
+        Raises:
+            SettingsError: when an action is invalid. The message names the
+                location of the invalid value, e.g. `actions[1].keys[0]`.
+
+        Returns:
+            the Action objects.
+        """
+        try:
+            return tuple(
+                action
+                if isinstance(action, Action)
+                else Action.parse(action, f"actions[{position}]")
+                for position, action in enumerate(actions)
+            )
+        except ValueError as error:
+            raise SettingsError(str(error)) from error
+
+    @staticmethod
+    def compile(actions: Sequence[Action]) -> Dispatch:
+        """Compile the regexes of `actions` into a Dispatch.
+
+        Args:
+            actions: the actions.
+
+        Raises:
+            SettingsError: when one of the regexes is invalid.
+
+        Returns:
+            the Dispatch of the regexes.
+        """
+        try:
+            return Dispatch(tuple(action.regex for action in actions))
+        except re.error as error:
+            raise SettingsError(f"Invalid regex: {error.pattern}") from error
 
     def get_keys(self, command: str) -> list[str]:
         """Return the keys to send based on the `command`.
@@ -65,11 +211,24 @@ class Settings:
         Returns:
             The keys to send.
         """
-        matches: tuple[bool, ...] = tuple(
-            bool(re.match(regex, command)) for regex in self.regexes
-        )
+        return self.render(self.match(command))
+
+    def match(self, command: str) -> Action:
+        """Return the action of which the regex matches the `command`.
+
+        Args:
+            command: the name of the command.
+
+        Raises:
+            SettingsError: when no action is found or multiple actions are
+                found.
+
+        Returns:
+            The action.
+        """
+        matches: list[int] = self._dispatch.match(command)
 
-        number_of_matches: int = sum(matches)
+        number_of_matches: int = len(matches)
         if number_of_matches == 0:
             raise SettingsError(f"No action found for command {command}")
 
@@ -79,17 +238,45 @@ class Settings:
             )
 
         else:
-            logging.debug("Action found for command %s", command)
-            keys: list[str] = self.all_keys[matches.index(True)]
-            return self._format_keys(keys)
+            action: Action = self._actions[matches[0]]
+            logging.debug(
+                "Action %s found for command %s",
+                action.name or matches[0],
+                command,
+            )
+            return action
+
+    def window_of(self, action: Action) -> int:
+        """Return the coalescing window of `action` in milliseconds.
+
+        Args:
+            action: the action.
+
+        Returns:
+            the window of the action, or else the window of the settings.
+        """
+        return self.coalesce if action.coalesce is None else action.coalesce
+
+    def render(self, action: Action) -> list[str]:
+        """Fill the placeholders of the keys of `action` with the positional
+        arguments and the variables.
+
+        Args:
+            action: the action.
+
+        Raises:
+            SettingsError: when an argument is missing, which is detected
+                before anything is formatted.
 
-    def _format_keys(self, keys: list[str]) -> list[str]:
+        Returns:
+            the keys.
+        """
         try:
-            return [key.format(*self.positional) for key in keys]
-        except IndexError as error:
+            return action.plan.render(self.positional, self.variables)
+        except (ValueError, LookupError, AttributeError) as error:
             raise SettingsError(
-                "Not enough positional arguments to fill placeholders of the "
-                f"keys: {keys}"
+                "Cannot fill the placeholders of the keys "
+                f"{list(action.keys)}: {error}"
             ) from error
 
     @property
@@ -99,11 +286,7 @@ class Settings:
         Returns:
             A tuple of regexes.
         """
-        return tuple(
-            action["regex"]
-            for action in self.actions
-            if isinstance(action["regex"], str)
-        )
+        return tuple(action.regex for action in self._actions)
 
     @property
     def all_keys(self) -> tuple[list[str], ...]:
@@ -112,11 +295,7 @@ class Settings:
         Returns:
             a tuple of lists of keys.
         """
-        return tuple(
-            action["keys"]
-            for action in self.actions
-            if isinstance(action["keys"], list)
-        )
+        return tuple(list(action.keys) for action in self._actions)
 
     @classmethod
     def from_dicts(cls, *dicts: dict[str, Any]) -> "Settings":
@@ -154,17 +333,31 @@ class Settings:
         """
         return set(cls.__dataclass_fields__.keys())
 
+    @classmethod
+    def required(cls) -> set[str]:
+        """All attributes of the dataclass that have no default value.
+
+        Returns:
+            A set of strings representing the required attributes.
+        """
+        return {
+            attribute.name
+            for attribute in fields(cls)
+            if attribute.default is MISSING
+            and attribute.default_factory is MISSING
+        }
+
     @classmethod
     def _assert_keys(cls, kwargs: dict[str, Any]) -> None:
-        """Raise a SettingsError if the keys are not the same as the attributes.
+        """Raise a SettingsError if a required attribute is missing from the
+        keys.
 
         Args:
             kwargs: the keys to check.
 
         Raises:
-            SettingsError: when the keys are not the same as the attributes.
+            SettingsError: when a required attribute is missing.
         """
-        keys: set[str] = set(kwargs.keys())
-        if keys != cls.attributes():
-            missing: set[str] = cls.attributes() - keys
+        missing: set[str] = cls.required() - set(kwargs.keys())
+        if missing:
             raise SettingsError(f"Missing the following settings: {missing}")
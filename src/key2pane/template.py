@@ -0,0 +1,272 @@
+"""Render the keys of an action, which may contain `str.format` placeholders.
+
+Each key is parsed once using `string.Formatter().parse`, when the config is
+compiled, into literal pieces and the placeholders between them. Rendering a
+key then only fills in its pieces, without parsing it again. As the highest
+positional placeholder and the named placeholders of each action are known in
+advance, missing arguments are detected without formatting anything.
+"""
+
+from __future__ import annotations
+
+from operator import itemgetter
+from string import Formatter
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Mapping, Sequence
+
+_FORMATTER: Formatter = Formatter()
+
+
+def _split_field(field: str) -> tuple[str, str]:
+    """Split a placeholder into its argument and the attribute or item
+    lookups that follow it, e.g. `0.real` into `0` and `.real`.
+
+    Args:
+        field: the field name of the placeholder.
+
+    Returns:
+        the argument and the lookups.
+    """
+    end: int = len(field)
+    for char in ".[":
+        position: int = field.find(char)
+        if position != -1:
+            end = min(end, position)
+    return field[:end], field[end:]
+
+
+class Template:
+    """A key that is parsed into literal pieces and placeholders.
+
+    A piece is a literal followed by the argument of a placeholder, which is
+    a position or a name, or None when the literal ends the key. Placeholders
+    with a conversion, a format spec, or lookups keep a format string that
+    is applied to their argument only.
+
+    Keys without placeholders are rendered as a constant. Keys of which all
+    placeholders are plain positions, or plain names, are rendered by a
+    printf-style string and an `itemgetter`, which both run in C.
+    """
+
+    __slots__ = (
+        "text",
+        "pieces",
+        "positions",
+        "names",
+        "_format",
+        "_constant",
+        "_printf",
+        "_getter",
+        "_single",
+    )
+
+    def __init__(self, text: str):
+        """Parse `text`.
+
+        Args:
+            text: the key, e.g. `echo {0} {name!r}`.
+
+        Raises:
+            ValueError: when the placeholders of `text` are malformed, or
+                when automatic and manual numbering are mixed.
+        """
+        self.text: str = text
+        self.pieces: tuple[tuple[str, int | str | None, str | None], ...]
+        self.positions: frozenset[int]
+        self.names: frozenset[str]
+        self._format: bool = False
+        self._constant: str | None = None
+        self._printf: str = ""
+        self._getter: itemgetter | None = None
+        self._single: bool = False
+
+        pieces: list[tuple[str, int | str | None, str | None]] = []
+        automatic: int | None = None
+        for literal, field, spec, conversion in _FORMATTER.parse(text):
+            if field is None:
+                pieces.append((literal, None, None))
+                continue
+
+            argument, lookups = _split_field(field)
+            if argument == "":
+                if automatic is None and any(
+                    isinstance(key, int) for _, key, _ in pieces
+                ):
+                    raise ValueError(
+                        "cannot switch from manual field specification to "
+                        "automatic field numbering"
+                    )
+                automatic = 0 if automatic is None else automatic + 1
+                key: int | str = automatic
+            elif argument.isdigit():
+                if automatic is not None:
+                    raise ValueError(
+                        "cannot switch from automatic field numbering to "
+                        "manual field specification"
+                    )
+                key = int(argument)
+            else:
+                key = argument
+
+            if spec and "{" in spec:
+                self._format = True
+            rest: str = lookups
+            rest += f"!{conversion}" if conversion else ""
+            rest += f":{spec}" if spec else ""
+            pieces.append((literal, key, "{0" + rest + "}" if rest else None))
+
+        self.pieces = tuple(pieces)
+        self.positions = frozenset(
+            key for _, key, _ in pieces if isinstance(key, int)
+        )
+        self.names = frozenset(
+            key for _, key, _ in pieces if isinstance(key, str)
+        )
+
+        keys: list[int | str] = [
+            key for _, key, _ in pieces if key is not None
+        ]
+        if not keys:
+            self._constant = "".join(literal for literal, _, _ in pieces)
+        elif not (self.positions and self.names) and all(
+            format is None for _, _, format in pieces
+        ):
+            self._printf = "".join(
+                literal.replace("%", "%%") + ("" if key is None else "%s")
+                for literal, key, _ in pieces
+            )
+            self._getter = itemgetter(*keys)
+            self._single = len(keys) == 1
+
+    def render(
+        self, positional: Sequence[str], named: Mapping[str, str]
+    ) -> str:
+        """Fill the placeholders. All arguments must be present.
+
+        Args:
+            positional: the positional arguments.
+            named: the named arguments.
+
+        Returns:
+            the key.
+        """
+        if self._constant is not None:
+            return self._constant
+        elif self._getter is not None:
+            values: object = self._getter(named if self.names else positional)
+            return self._printf % ((values,) if self._single else values)
+        elif self._format:
+            return self.text.format(*positional, **named)
+
+        parts: list[str] = []
+        for literal, key, format in self.pieces:
+            parts.append(literal)
+            if key is not None:
+                value: str = (
+                    positional[key] if isinstance(key, int) else named[key]
+                )
+                parts.append(value if format is None else format.format(value))
+        return "".join(parts)
+
+    def __repr__(self) -> str:
+        return f"Template({self.text!r})"
+
+
+class Plan:
+    """The templates of the keys of an action, and the arguments that are
+    needed to render them."""
+
+    __slots__ = ("templates", "arity", "names", "defaults")
+
+    def __init__(
+        self,
+        keys: Sequence[str | Template],
+        defaults: Mapping[str, str] | None = None,
+    ):
+        """Parse the keys of an action.
+
+        Args:
+            keys: the keys, of which some may already be parsed.
+            defaults: the values of placeholders that are used when they
+                are not passed, by position, e.g. `"1"`, or by name.
+
+        Raises:
+            ValueError: when the placeholders of a key are malformed.
+        """
+        self.templates: tuple[Template, ...] = tuple(
+            key if isinstance(key, Template) else Template(key) for key in keys
+        )
+        positions: set[int] = set().union(
+            *(template.positions for template in self.templates)
+        )
+        self.arity: int = max(positions) + 1 if positions else 0
+        self.names: frozenset[str] = frozenset().union(
+            *(template.names for template in self.templates)
+        )
+        self.defaults: dict[str, str] = dict(defaults or {})
+
+    def missing(
+        self, positional: Sequence[str], named: Mapping[str, str]
+    ) -> list[str]:
+        """Return the placeholders that have neither an argument nor a
+        default.
+
+        Args:
+            positional: the positional arguments.
+            named: the named arguments.
+
+        Returns:
+            the positions and names of the missing placeholders.
+        """
+        return [
+            str(position)
+            for position in range(len(positional), self.arity)
+            if str(position) not in self.defaults
+        ] + sorted(
+            name
+            for name in self.names
+            if name not in named and name not in self.defaults
+        )
+
+    def render(
+        self, positional: Sequence[str], named: Mapping[str, str]
+    ) -> list[str]:
+        """Render the keys.
+
+        Args:
+            positional: the positional arguments.
+            named: the named arguments.
+
+        Raises:
+            ValueError: when a placeholder has neither an argument nor a
+                default.
+
+        Returns:
+            the keys.
+        """
+        if len(positional) < self.arity:
+            missing: list[str] = self.missing(positional, named)
+            if missing:
+                raise ValueError(f"missing arguments: {', '.join(missing)}")
+            positional = [
+                *positional,
+                *(
+                    self.defaults[str(position)]
+                    for position in range(len(positional), self.arity)
+                ),
+            ]
+        if self.names and not self.names.issubset(named):
+            missing = self.missing(positional, named)
+            if missing:
+                raise ValueError(f"missing arguments: {', '.join(missing)}")
+            named = {**self.defaults, **named}
+
+        return [
+            template.render(positional, named) for template in self.templates
+        ]
+
+    def __repr__(self) -> str:
+        keys: list[str] = [template.text for template in self.templates]
+        return f"Plan({keys!r}, arity={self.arity}, names={set(self.names)})"
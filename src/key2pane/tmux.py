@@ -1,17 +1,163 @@
+from __future__ import annotations
+
 import logging
+import os
 import subprocess
-from collections.abc import Generator
+from contextlib import contextmanager, nullcontext
+from copy import copy
+
+from key2pane import proc
+from key2pane.trace import span
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from typing import BinaryIO, ContextManager
+
+    from key2pane.backend import Backend
+    from key2pane.control import ControlMode
+    from key2pane.payload import Payload
+
+BACKENDS: tuple[str, ...] = ("subprocess", "control", "memory")
+
+_client: Backend | None = None
+_index: PaneIndex | None = None
+_server: str | None = None
+
+_DELIMITER: str = "\x1f"
+PANE_FORMAT: str = _DELIMITER.join(
+    (
+        "#{session_name}",
+        "#{window_index}",
+        "#{pane_index}",
+        "#{pane_id}",
+        "#{pane_pid}",
+        "#{pane_tty}",
+        "#{pane_current_command}",
+    )
+)
 
 
 class TmuxError(Exception):
     """Raised when a tmux command fails."""
 
 
-def execute(*args: str) -> str:
+def server_args(server: str | None) -> tuple[str, ...]:
+    """Return the options of tmux that select a server.
+
+    Args:
+        server: the name of the socket of the server, e.g. `work`, or its
+            path, e.g. `/tmp/ci.sock`, which is recognized by its slash. None
+            selects the default server.
+
+    Returns:
+        the options, i.e. `-L NAME`, `-S PATH`, or nothing.
+    """
+    if not server:
+        return ()
+    return ("-S", server) if "/" in server else ("-L", server)
+
+
+def tmux_argv(*args: str, server: str | None = None) -> list[str]:
+    """Return the command line of a tmux client that executes `args`.
+
+    Args:
+        *args: the arguments to pass to tmux.
+        server: the server, see `server_args`. If None, the server that is
+            set using `on_server` is used.
+
+    Returns:
+        the command line.
+    """
+    return ["tmux", *server_args(server or _server), *args]
+
+
+def socket_dir() -> str:
+    """Return the directory in which tmux creates the sockets of the servers
+    of the user, i.e. `$TMUX_TMPDIR/tmux-UID`."""
+    return os.path.join(
+        os.environ.get("TMUX_TMPDIR") or "/tmp", f"tmux-{os.getuid()}"
+    )
+
+
+def default_socket() -> str:
+    """Return the socket path of the server that a tmux client uses when no
+    server is selected, i.e. the server of `$TMUX`, or the default server.
+
+    Returns:
+        the path of the socket.
+    """
+    socket: str = os.environ.get("TMUX", "").split(",")[0]
+    return socket or os.path.join(socket_dir(), "default")
+
+
+def list_servers() -> list[str]:
+    """Return the paths of the sockets of the tmux servers of the user, in
+    the socket directory of tmux, i.e. `$TMUX_TMPDIR/tmux-UID`.
+
+    A socket of which the server has exited is left behind by tmux, and
+    refuses connections. Such stale sockets are skipped.
+
+    Returns:
+        the sorted paths.
+    """
+    import socket
+    import stat
+
+    directory: str = socket_dir()
+    try:
+        names: list[str] = os.listdir(directory)
+    except OSError:
+        return []
+    paths: list[str] = []
+    for name in sorted(names):
+        path: str = os.path.join(directory, name)
+        try:
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                continue
+            with socket.socket(socket.AF_UNIX) as client:
+                client.connect(path)
+        except OSError:
+            continue
+        paths.append(path)
+    return paths
+
+
+@contextmanager
+def on_server(server: str | None) -> Iterator[None]:
+    """Start the tmux clients of the context for the server `server`,
+    instead of the default server.
+
+    Args:
+        server: the server, see `server_args`.
+    """
+    global _server
+    previous: str | None = _server
+    _server = server
+    try:
+        yield
+    finally:
+        _server = previous
+
+
+def _status(error: TmuxError) -> int:
+    """Return the exit status of the tmux client that raised `error`, or 1
+    if it is unknown."""
+    return getattr(error.__cause__, "returncode", 1)
+
+
+def execute(*args: str, strip: bool = True) -> str:
     """Execute a tmux command and return the output.
 
+    The command is executed by the backend that is set using `connected`.
+    Otherwise, a new tmux client is started for the command. When tracing, a
+    span with the arguments and the exit status is recorded.
+
     Args:
         *args: the arguments to pass to tmux.
+        strip: whether to remove the surrounding whitespace of the output.
+            Without it, the output of e.g. `capture-pane -p` keeps its
+            leading and trailing blank lines and spaces.
 
     Raises:
         TmuxError: when tmux command fails.
@@ -19,62 +165,413 @@ def execute(*args: str) -> str:
     Returns:
         stdout of the tmux command.
     """
+    with span("tmux.execute", argv=args) as current:
+        try:
+            stdout: str = (_client or Subprocess()).execute(
+                *args, strip=strip
+            )
+        except TmuxError as error:
+            current.set("status", _status(error))
+            raise
+
+        current.set("status", 0)
+        return stdout
+
+
+def execute_many(commands: list[tuple[str, ...]]) -> list[str]:
+    """Execute several tmux commands using a single tmux client and return
+    the output of each command.
+
+    The commands are joined into a command sequence using `chain`.
+
+    Args:
+        commands: the arguments of each tmux command.
+
+    Raises:
+        TmuxError: when one of the tmux commands fails.
+
+    Returns:
+        the output of each tmux command.
+    """
+    if not commands:
+        return []
+    elif _client is not None:
+        with span("tmux.execute_many", commands=commands) as current:
+            outputs: list[str] = _client.execute_many(commands)
+            current.set("status", 0)
+            return outputs
+
+    marker, argv = chain(commands)
+    return split(execute(*argv), marker, len(commands))
+
+
+def load_buffer(name: str, head: bytes, stream: BinaryIO) -> None:
+    """Load `head` followed by the rest of `stream` into the tmux buffer
+    `name`, using the backend that is set using `connected`.
+
+    Args:
+        name: the name of the tmux buffer.
+        head: the part of the contents that was already read.
+        stream: the rest of the contents.
+
+    Raises:
+        TmuxError: when tmux fails to load the buffer.
+    """
+    with span("tmux.load_buffer", buffer=name) as current:
+        try:
+            (_client or Subprocess()).load_buffer(name, head, stream)
+        except TmuxError as error:
+            current.set("status", _status(error))
+            raise
+        current.set("status", 0)
+
+
+def chain(commands: list[tuple[str, ...]]) -> tuple[str, list[str]]:
+    """Join several tmux commands into a command sequence, i.e. the
+    arguments of `tmux a ; b ; c`, for a single tmux client.
+
+    After each command, a `display-message` prints a random marker, on which
+    the output of the sequence is split into the output of each command.
+
+    Args:
+        commands: the arguments of each tmux command.
+
+    Returns:
+        the marker, and the arguments of the command sequence.
+    """
+    marker: str = f"key2pane-{os.urandom(8).hex()}"
+    argv: list[str] = []
+    for args in commands:
+        argv.extend(_escape(arg) for arg in args)
+        argv.extend((";", "display-message", "-p", marker, ";"))
+    return marker, argv[:-1]
+
+
+def split(output: str, marker: str, count: int) -> list[str]:
+    """Split the output of a command sequence of `chain` into the output of
+    each command.
+
+    Args:
+        output: the output of the command sequence.
+        marker: the marker that `chain` returned.
+        count: the number of commands.
+
+    Returns:
+        the output of each command.
+    """
+    return [part.strip() for part in output.split(marker)[:count]]
+
+
+def _escape(arg: str) -> str:
+    """Escape a trailing semicolon of `arg`, as tmux would otherwise treat it
+    as the end of a command.
+
+    Args:
+        arg: an argument of a tmux command.
+
+    Returns:
+        the escaped argument.
+    """
+    return f"{arg[:-1]}\\;" if arg.endswith(";") else arg
+
+
+class Subprocess:
+    """A backend that starts a tmux client for each command, or for each
+    sequence of commands, which is the default.
+
+    See `key2pane.backend.Backend`.
+    """
+
+    def __init__(self, server: str | None = None):
+        """Initialize the Subprocess backend.
+
+        Args:
+            server: the tmux server, see `server_args`. If None, the server
+                that is set using `on_server` when a command is executed is
+                used.
+        """
+        self.server: str | None = server
+
+    def execute(self, *args: str, strip: bool = True) -> str:
+        """Execute a tmux command and return the output.
+
+        Args:
+            *args: the arguments to pass to tmux.
+            strip: whether to remove the surrounding whitespace of the
+                output.
+
+        Raises:
+            TmuxError: when tmux command fails.
+
+        Returns:
+            stdout of the tmux command.
+        """
+        try:
+            stdout: str = subprocess.check_output(
+                tmux_argv(*args, server=self.server)
+            ).decode("utf-8")
+            return stdout.strip() if strip else stdout
+        except subprocess.CalledProcessError as error:
+            logging.critical(error.output.decode("utf-8"))
+            raise TmuxError(f"tmux {' '.join(args)} failed") from error
+
+    def execute_many(self, commands: list[tuple[str, ...]]) -> list[str]:
+        """Execute several tmux commands using a single tmux client, see
+        `chain`.
+
+        Args:
+            commands: the arguments of each tmux command.
+
+        Raises:
+            TmuxError: when one of the tmux commands fails.
+
+        Returns:
+            the output of each tmux command.
+        """
+        if not commands:
+            return []
+        marker, argv = chain(commands)
+        return split(self.execute(*argv), marker, len(commands))
+
+    def load_buffer(self, name: str, head: bytes, stream: BinaryIO) -> None:
+        """Load `head` followed by the rest of `stream` into the tmux buffer
+        `name` using `tmux load-buffer -`. The stream is copied in chunks, so
+        it is never held in memory.
+
+        Args:
+            name: the name of the tmux buffer.
+            head: the part of the contents that was already read.
+            stream: the rest of the contents.
+
+        Raises:
+            TmuxError: when tmux fails to load the buffer.
+        """
+        import shutil
+
+        argv: list[str] = tmux_argv(
+            "load-buffer", "-b", name, "-", server=self.server
+        )
+        try:
+            process: subprocess.Popen[bytes] = subprocess.Popen(
+                argv, stdin=subprocess.PIPE
+            )
+        except OSError as error:
+            raise TmuxError("tmux could not be started") from error
+
+        assert process.stdin is not None
+        try:
+            process.stdin.write(head)
+            shutil.copyfileobj(stream, process.stdin, 1 << 16)
+        except BrokenPipeError:
+            pass
+        finally:
+            process.stdin.close()
+
+        status: int = process.wait()
+        if status != 0:
+            raise TmuxError(
+                f"tmux load-buffer -b {name} failed"
+            ) from subprocess.CalledProcessError(status, argv)
+
+
+class Batch:
+    """Queue tmux commands and execute them using a single tmux client."""
+
+    def __init__(self):
+        """Initialize the Batch."""
+        self._commands: list[tuple[str, ...]] = []
+
+    def add(self, *args: str) -> int:
+        """Queue a tmux command.
+
+        Args:
+            *args: the arguments to pass to tmux.
+
+        Returns:
+            the position of the output of the command in the list that is
+            returned by `flush`.
+        """
+        self._commands.append(args)
+        return len(self._commands) - 1
+
+    def flush(self) -> list[str]:
+        """Execute all queued commands and empty the queue.
+
+        Raises:
+            TmuxError: when one of the tmux commands fails.
+
+        Returns:
+            the output of each tmux command, in the order they were queued.
+        """
+        commands: list[tuple[str, ...]] = self._commands
+        self._commands = []
+        return execute_many(commands)
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+
+@contextmanager
+def connected(client: Backend | None) -> Iterator[None]:
+    """Execute all tmux commands using `client` within the context.
+
+    Args:
+        client: a backend, e.g. a control mode client, or None to start a
+            new tmux client for each command.
+    """
+    global _client
+    previous: Backend | None = _client
+    _client = client
     try:
-        return subprocess.check_output(["tmux", *args]).decode("utf-8").strip()
-    except subprocess.CalledProcessError as error:
-        logging.critical(error.output.decode("utf-8"))
-        raise TmuxError(f"tmux {' '.join(args)} failed") from error
+        yield
+    finally:
+        _client = previous
+
+
+def _connected_to(backend: Backend | None) -> ContextManager[None]:
+    """Return a context in which tmux commands are executed using `backend`,
+    or using the current backend if it is None."""
+    return nullcontext() if backend is None else connected(backend)
+
+
+@contextmanager
+def control_mode(*args: str) -> Iterator[ControlMode | None]:
+    """Start a control mode client and execute all tmux commands using it
+    within the context. If no client can be started, e.g. because no session
+    exists, a new tmux client is started for each command instead.
+
+    Args:
+        *args: extra arguments for `tmux attach-session`.
+
+    Yields:
+        the control mode client, or None if it could not be started.
+    """
+    from key2pane.control import ControlMode
+
+    try:
+        with span("control_mode.start"):
+            client: ControlMode = ControlMode(*args)
+    except TmuxError as error:
+        logging.info("Control mode is unavailable: %s", error)
+        yield None
+        return
+
+    with client, connected(client):
+        yield client
+
+
+@contextmanager
+def using(name: str | None) -> Iterator[Backend | None]:
+    """Execute all tmux commands of the context using the backend `name`.
+
+    Args:
+        name: one of `BACKENDS`, or None to keep the current backend. When
+            the control mode client cannot be started, or when the current
+            backend is a running control mode client, it is used instead.
+
+    Raises:
+        ValueError: when the backend is unknown.
+
+    Yields:
+        the backend, or None when a new tmux client is started for each
+        command.
+    """
+    if name is None:
+        yield _client
+    elif name == "subprocess":
+        with connected(None):
+            yield None
+    elif name == "control":
+        from key2pane.control import ControlMode
+
+        if isinstance(_client, ControlMode) and _client.alive:
+            yield _client
+        else:
+            with control_mode() as client:
+                yield client
+    elif name == "memory":
+        from key2pane.backend import Memory
+
+        memory: Memory = Memory()
+        with connected(memory):
+            yield memory
+    else:
+        raise ValueError(f"Unknown backend: {name}")
 
 
 class Pane:
     """A class to represent a tmux pane."""
 
-    def __init__(self, session: str, window: int, index: int):
+    def __init__(
+        self,
+        session: str,
+        window: int,
+        index: int,
+        command: str | None = None,
+        id: str | None = None,
+        pid: int | None = None,
+        tty: str | None = None,
+        server: str | None = None,
+        backend: Backend | None = None,
+    ):
         """Initialize the Pane.
 
         Args:
             session: the session of the pane.
             window: the window of the pane.
             index: the index of the pane.
+            command: the command running in the pane. If None, it is
+                looked up in the index that is set using `indexed`, or
+                retrieved from tmux if the pane is not in the index.
+            id: the unique id of the pane, e.g. `%3`, if it is known.
+            pid: the process id of the pane, if it is known.
+            tty: the terminal of the pane, if it is known.
+            server: the tmux server of the pane, see `server_args`. If None,
+                it is the server that is set using `on_server`.
+            backend: the backend that executes the tmux commands of the
+                pane. If None, the backend that is set using `connected` is
+                used.
         """
+        if command is None and _index is not None:
+            found: Pane | None = _index.get(session, window, index)
+            if found is not None:
+                command, id = found.command, id or found.id
+                pid, tty = pid or found.pid, tty or found.tty
+                server = server or found.server
+                backend = backend or found.backend
+
         self._session: str = session
         self._window: int = window
         self._index: int = index
-        self._command: str = self._find_command()
+        self._id: str | None = id
+        self._pid: int | None = pid
+        self._tty: str | None = tty
+        self._server: str | None = server or _server
+        self._backend: Backend | None = backend
+        self._command: str = (
+            self._find_command() if command is None else command
+        )
 
     def _find_command(self) -> str:
-        """Based on the session, window, and index, find the command running in
-        the pane.
+        """Find the command running in the pane, by querying only this pane.
 
         Raises:
-            TmuxError: when the pane is not using the `tmux list-panes` command.
+            TmuxError: when the pane does not exist.
 
         Returns:
             the command running in the pane.
         """
-        stdout: str = execute(
-            "list-panes",
-            "-t",
-            f"{self.session}:{self.window}",
-            "-F",
-            "#{pane_index}:#{pane_current_command}",
-        )
-        splitted: Generator[list[str], None, None] = (
-            line.split(":") for line in stdout.splitlines()
-        )
-        index_vs_commands: Generator[tuple[int, str], None, None] = (
-            (
-                int(index),
-                command,
-            )
-            for index, command in splitted
-        )
-
-        for index, command in index_vs_commands:
-            if int(index) == self.index:
-                return command
-
-        raise TmuxError(f"Current pane not found in {index_vs_commands}")
+        try:
+            with self._connected():
+                return execute(
+                    "display-message",
+                    "-p",
+                    "-t",
+                    self.target,
+                    "#{pane_current_command}",
+                )
+        except TmuxError as error:
+            raise TmuxError(f"Pane {self.target} not found") from error
 
     @property
     def session(self) -> str:
@@ -92,6 +589,80 @@ class Pane:
     def command(self) -> str:
         return self._command
 
+    @property
+    def id(self) -> str | None:
+        return self._id
+
+    @property
+    def pid(self) -> int | None:
+        return self._pid
+
+    @property
+    def tty(self) -> str | None:
+        return self._tty
+
+    @property
+    def server(self) -> str | None:
+        return self._server
+
+    @property
+    def backend(self) -> Backend | None:
+        return self._backend
+
+    def _connected(self) -> ContextManager[None]:
+        """Return a context in which tmux commands are executed using the
+        backend of the pane. Without one, a new tmux client is started for
+        each command when the pane lives on another server than the current
+        backend, and the current backend is used otherwise.
+
+        Returns:
+            a context manager.
+        """
+        if self._backend is not None:
+            return connected(self._backend)
+        elif self._server != _server:
+            return connected(Subprocess(self._server))
+        return nullcontext()
+
+    def foreground(self) -> str:
+        """Return the command line of the foreground process of the pane,
+        which is read from /proc. Unlike `command`, it includes the
+        arguments, and it is the shell instead of key2pane when key2pane runs
+        in the pane.
+
+        Returns:
+            the command line, or `command` if /proc cannot be read, e.g.
+            because the process id of the pane is unknown.
+        """
+        if self.pid is not None:
+            command: str | None = proc.command(self.pid, self.tty)
+            if command is not None:
+                return command
+        return self.command
+
+    @property
+    def target(self) -> str:
+        """The tmux target of the pane. The pane id is preferred, as it does
+        not change when panes are renumbered.
+
+        Returns:
+            the pane id if it is known, otherwise `session:window.index`.
+        """
+        return self._id or str(self)
+
+    @property
+    def key(self) -> str:
+        """The key of the runtime files of the pane, e.g. of its lock. As
+        pane ids are only unique within a tmux server, the target is
+        prefixed by the server of the pane, unless it is the default server.
+
+        Returns:
+            the key, e.g. `%3`, or `work/%3` for the server `work`.
+        """
+        if self._server is None:
+            return self.target
+        return f"{self._server}/{self.target}"
+
     def as_dict(self) -> dict[str, str | int]:
         """Represent the Pane as a dictionary.
 
@@ -105,38 +676,93 @@ class Pane:
             "command": self.command,
         }
 
-    def send(self, keys: list[str], reset: bool = True) -> str:
+    def send(
+        self,
+        keys: list[str],
+        reset: bool = True,
+        payload: Payload | None = None,
+    ) -> str:
         """Send keys to the pane.
 
         If reset is True, the keys are sent after sending a C-c to the pane.
-        This is done separately as sending it together with other keys does not
-        work smoothly when vim bindings are used on the command line of
-        bash/zsh.
+        This is done using a separate `send-keys` command as sending it
+        together with other keys does not work smoothly when vim bindings are
+        used on the command line of bash/zsh. Both commands are executed by a
+        single tmux client.
 
         Args:
             keys: the keys to send.
+            reset: whether to send a C-c first.
+            payload: contents to paste before the keys are sent.
 
         Returns:
             stdout of the tmux command which is typically empty.
         """
-        cmd: tuple[str, ...] = ("send-keys", "-t", str(self))
-        if reset:
-            logging.debug("Resetting pane by sending C-c")
-            _ = execute(*cmd, "C-c")
+        with self._connected():
+            return send_many([(self, keys)], reset, payload)[0]
+
+    @classmethod
+    def from_active(
+        cls, target: str | None = None, backend: Backend | None = None
+    ) -> "Pane":
+        """Create a Pane object from the active pane, or from the pane that
+        `target` refers to.
 
-        logging.info("Sent keys: %s", keys)
-        return execute(*cmd, *keys)
+        All attributes of the pane are expanded by tmux in a single query of
+        that pane, so its cost does not depend on the number of panes.
+
+        Args:
+            target: a tmux target, e.g. a pane id like `%3`, or
+                `session:window.index`, that overrides the pane tmux
+                considers to be active.
+            backend: the backend of the pane, see `Pane`.
+
+        Raises:
+            TmuxError: when the pane does not exist.
+
+        Returns:
+            a Pane object representing the pane.
+        """
+        option: tuple[str, ...] = ("-t", target) if target else ()
+        with _connected_to(backend):
+            stdout: str = execute(
+                "display-message", "-p", *option, PANE_FORMAT
+            )
+        return cls.parse(stdout, backend=backend)
 
     @classmethod
-    def from_active(cls) -> "Pane":
-        """Create a Pane object from the active pane.
+    def parse(
+        cls,
+        line: str,
+        server: str | None = None,
+        backend: Backend | None = None,
+    ) -> "Pane":
+        """Create a Pane object from a line that is formatted by tmux using
+        `PANE_FORMAT`. Its fields are separated by a unit separator, which
+        does not occur in session names or commands, unlike a colon.
+
+        Args:
+            line: the attributes of the pane.
+            server: the tmux server that formatted the line.
+            backend: the backend of the pane, see `Pane`.
 
         Returns:
-            a Pane object representing the active pane.
+            a Pane object.
         """
-        stdout: str = execute("display-message", "-p", "#S:#I:#P")
-        session, window, pane = stdout.split(":")
-        return cls(session, int(window), int(pane))
+        session, window, index, id, pid, tty, command = line.split(
+            _DELIMITER, 6
+        )
+        return cls(
+            session,
+            int(window),
+            int(index),
+            command,
+            id,
+            int(pid),
+            tty,
+            server,
+            backend,
+        )
 
     def __str__(self) -> str:
         """The string representation of the Pane corresponds to the notation
@@ -158,3 +784,219 @@ class Pane:
             True if the string representations are equal, False otherwise.
         """
         return isinstance(other, Pane) and str(self) == str(other)
+
+
+class PaneIndex:
+    """An in-memory index of panes, which is built from a single snapshot of
+    tmux.
+
+    The panes are indexed by id, by session, window, and index, and by
+    command, so looking up a pane does not query tmux again.
+    """
+
+    def __init__(self, panes: Iterable[Pane], active: str | None = None):
+        """Initialize the PaneIndex.
+
+        Args:
+            panes: the panes to index.
+            active: the id of the pane that is considered active.
+        """
+        self._panes: list[Pane] = list(panes)
+        self._by_id: dict[str, Pane] = {}
+        self._by_address: dict[tuple[str, int, int], Pane] = {}
+        self._by_command: dict[str, list[Pane]] = {}
+        for pane in self._panes:
+            if pane.id is not None:
+                self._by_id[pane.id] = pane
+            self._by_address[(pane.session, pane.window, pane.index)] = pane
+            self._by_command.setdefault(pane.command, []).append(pane)
+
+        self.active: Pane | None = self._by_id.get(active or "")
+
+    @classmethod
+    def snapshot(
+        cls, target: str | None = None, backend: Backend | None = None
+    ) -> "PaneIndex":
+        """Create a PaneIndex of all panes of the tmux server.
+
+        The active pane and the list of all panes are retrieved using a
+        single tmux client.
+
+        Args:
+            target: a tmux target, e.g. a pane id like `%3`, that overrides
+                the pane tmux considers to be active.
+            backend: the backend of the panes, see `Pane`.
+
+        Raises:
+            TmuxError: when the tmux commands fail, or when the active pane
+                is not found.
+
+        Returns:
+            the PaneIndex.
+        """
+        with _connected_to(backend):
+            outputs: list[str] = execute_many(cls.queries(target))
+        return cls.parse(outputs, backend=backend)
+
+    @staticmethod
+    def queries(target: str | None = None) -> list[tuple[str, ...]]:
+        """Return the tmux commands of which the outputs are parsed into a
+        snapshot by `parse`.
+
+        Args:
+            target: a tmux target that overrides the pane tmux considers to
+                be active.
+
+        Returns:
+            the arguments of each tmux command.
+        """
+        option: tuple[str, ...] = ("-t", target) if target else ()
+        return [
+            ("display-message", "-p", *option, "#{pane_id}"),
+            ("list-panes", "-a", "-F", PANE_FORMAT),
+        ]
+
+    @classmethod
+    def parse(
+        cls,
+        outputs: list[str],
+        server: str | None = None,
+        backend: Backend | None = None,
+    ) -> "PaneIndex":
+        """Create a PaneIndex from the outputs of the commands of `queries`.
+
+        Args:
+            outputs: the output of each command.
+            server: the tmux server that executed the commands.
+            backend: the backend of the panes, see `Pane`.
+
+        Raises:
+            TmuxError: when the active pane is not found.
+
+        Returns:
+            the PaneIndex.
+        """
+        active, stdout = outputs
+        index: PaneIndex = cls(
+            (
+                Pane.parse(line, server, backend)
+                for line in stdout.splitlines()
+            ),
+            active,
+        )
+        if index.active is None:
+            raise TmuxError(f"Active pane {active} not found")
+        return index
+
+    def activate(self, id: str) -> "PaneIndex":
+        """Return a view of the index in which the pane with id `id` is the
+        active pane. The view shares the panes with the index.
+
+        Args:
+            id: the id of a pane, e.g. `%3`.
+
+        Returns:
+            the view, of which `active` is None if the pane is unknown.
+        """
+        view: PaneIndex = copy(self)
+        view.active = self._by_id.get(id)
+        return view
+
+    def get(self, session: str, window: int, index: int) -> Pane | None:
+        """Return the pane at `session:window.index`, or None."""
+        return self._by_address.get((session, window, index))
+
+    def by_id(self, id: str) -> Pane | None:
+        """Return the pane with id `id`, e.g. `%3`, or None."""
+        return self._by_id.get(id)
+
+    def by_command(self, command: str) -> list[Pane]:
+        """Return the panes that run `command`."""
+        return self._by_command.get(command, [])
+
+    def __iter__(self) -> Iterator[Pane]:
+        return iter(self._panes)
+
+    def __len__(self) -> int:
+        return len(self._panes)
+
+
+@contextmanager
+def indexed(index: PaneIndex) -> Iterator[None]:
+    """Look up the command of each Pane that is created within the context
+    in `index`, instead of querying tmux.
+
+    Args:
+        index: the index of panes.
+    """
+    global _index
+    previous: PaneIndex | None = _index
+    _index = index
+    try:
+        yield
+    finally:
+        _index = previous
+
+
+def send_many(
+    sends: list[tuple[Pane, list[str]]],
+    reset: bool = True,
+    payload: Payload | None = None,
+) -> list[str]:
+    """Send keys to several panes using a single tmux client.
+
+    If reset is True, a C-c is sent to each pane before its keys, using a
+    separate `send-keys` command as is explained in `Pane.send`. A payload
+    is pasted into each pane after the C-c and before the keys. A large
+    payload is loaded into a tmux buffer only once.
+
+    Args:
+        sends: each pane and the keys to send to it.
+        reset: whether to send a C-c first.
+        payload: contents to paste before the keys are sent.
+
+    Raises:
+        TmuxError: when one of the tmux commands fails.
+
+    Returns:
+        stdout of the tmux command that sent the keys to each pane.
+    """
+    commands, positions = send_commands(sends, reset, payload)
+    outputs: list[str] = execute_many(commands)
+    return [outputs[position] for position in positions]
+
+
+def send_commands(
+    sends: list[tuple[Pane, list[str]]],
+    reset: bool = True,
+    payload: Payload | None = None,
+) -> tuple[list[tuple[str, ...]], list[int]]:
+    """Return the tmux commands that send keys to several panes, see
+    `send_many`, which are shared with `key2pane.aio.Client.send_many`.
+
+    Args:
+        sends: each pane and the keys to send to it.
+        reset: whether to send a C-c first.
+        payload: contents to paste before the keys are sent.
+
+    Returns:
+        the arguments of each tmux command, and the position of the command
+        that sends the keys to each pane.
+    """
+    commands: list[tuple[str, ...]] = []
+    positions: list[int] = []
+    for pane, keys in sends:
+        cmd: tuple[str, ...] = ("send-keys", "-t", pane.target)
+        if reset:
+            logging.debug("Resetting pane %s by sending C-c", pane)
+            commands.append((*cmd, "C-c"))
+        if payload is not None:
+            commands.append(payload.paste(pane.target))
+        positions.append(len(commands))
+        commands.append((*cmd, *keys))
+        logging.info("Sent keys to %s: %s", pane, keys)
+
+    cleanup: tuple[str, ...] | None = payload.cleanup() if payload else None
+    if cleanup is not None:
+        commands.append(cleanup)
+    return commands, positions
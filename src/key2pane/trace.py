@@ -0,0 +1,214 @@
+"""Record how long each phase of an invocation takes.
+
+Tracing is enabled within `tracing`. There, `span` measures a block of code
+using a monotonic clock. Outside of it, `span` returns a shared span that does
+nothing, so instrumented code only pays for a function call.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from types import TracebackType
+
+FORMATS: tuple[str, ...] = ("jsonl", "chrome")
+
+_tracer: Tracer | None = None
+
+
+class Span:
+    """A named block of code, and the time it took."""
+
+    __slots__ = ("tracer", "name", "args", "start", "end")
+
+    def __init__(self, tracer: Tracer, name: str, args: dict[str, object]):
+        """Initialize the Span.
+
+        Args:
+            tracer: the tracer the span is added to when it ends.
+            name: the name of the span.
+            args: details of the span, e.g. the arguments of a tmux command.
+        """
+        self.tracer: Tracer = tracer
+        self.name: str = name
+        self.args: dict[str, object] = args
+        self.start: int = 0
+        self.end: int = 0
+
+    def set(self, key: str, value: object) -> None:
+        """Add a detail to the span.
+
+        Args:
+            key: the name of the detail.
+            value: the value of the detail, which must be json serializable.
+        """
+        self.args[key] = value
+
+    def __enter__(self) -> Span:
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc_value}"
+        self.tracer.add(self)
+
+
+class NullSpan:
+    """A span that records nothing, which is used when tracing is off."""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: object) -> None:
+        """Ignore the detail."""
+
+    def __enter__(self) -> NullSpan:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
+
+
+_NULL_SPAN: NullSpan = NullSpan()
+
+
+class Tracer:
+    """Collect spans and write them to a file."""
+
+    def __init__(self):
+        """Initialize the Tracer."""
+        self.spans: list[Span] = []
+        self.pid: int = os.getpid()
+
+    def add(self, span: Span) -> None:
+        """Add a span that ended.
+
+        Args:
+            span: the span.
+        """
+        self.spans.append(span)
+
+    def events(self) -> list[dict[str, object]]:
+        """Return the spans as events in the Chrome trace event format.
+
+        Timestamps are in microseconds since the start of the first span.
+
+        Returns:
+            a complete event for each span, ordered by start time.
+        """
+        spans: list[Span] = sorted(self.spans, key=lambda span: span.start)
+        origin: int = spans[0].start if spans else 0
+        tid: int = threading.get_ident()
+        return [
+            {
+                "name": span.name,
+                "cat": "key2pane",
+                "ph": "X",
+                "ts": (span.start - origin) / 1000,
+                "dur": (span.end - span.start) / 1000,
+                "pid": self.pid,
+                "tid": tid,
+                "args": span.args,
+            }
+            for span in spans
+        ]
+
+    def write(self, path: str, format: str = "jsonl") -> None:
+        """Write the spans to `path`.
+
+        Using the `jsonl` format, a json object is appended to `path` for
+        each span, so the spans of several invocations can be collected in
+        one file. Using the `chrome` format, `path` is overwritten with a
+        trace that can be opened in chrome://tracing or Perfetto.
+
+        Args:
+            path: the path of the trace file.
+            format: one of `FORMATS`.
+
+        Raises:
+            ValueError: when the format is unknown.
+        """
+        import json
+
+        if format == "chrome":
+            with open(path, "w") as file:
+                json.dump({"traceEvents": self.events()}, file, default=str)
+        elif format == "jsonl":
+            with open(path, "a") as file:
+                for event in self.events():
+                    line: dict[str, object] = {
+                        "name": event["name"],
+                        "pid": event["pid"],
+                        "start_ms": event["ts"] / 1000,  # type: ignore
+                        "duration_ms": event["dur"] / 1000,  # type: ignore
+                        **event["args"],  # type: ignore
+                    }
+                    file.write(json.dumps(line, default=str) + "\n")
+        else:
+            raise ValueError(f"Unknown trace format: {format}")
+
+
+def span(name: str, **args: object) -> Span | NullSpan:
+    """Return a context manager that measures the time its block takes.
+
+    Args:
+        name: the name of the span.
+        **args: details of the span, which must be json serializable.
+
+    Returns:
+        a span, or a span that records nothing when tracing is off.
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, args)
+
+
+def record(name: str, start: int, **args: object) -> None:
+    """Add a span that started at `start` and ends now. Use it for phases
+    that run before tracing is enabled, like parsing the arguments.
+
+    Args:
+        name: the name of the span.
+        start: the start of the span, as returned by `time.perf_counter_ns`.
+        **args: details of the span, which must be json serializable.
+    """
+    if _tracer is not None:
+        finished: Span = Span(_tracer, name, args)
+        finished.start, finished.end = start, time.perf_counter_ns()
+        _tracer.add(finished)
+
+
+@contextmanager
+def tracing(path: str | None, format: str = "jsonl") -> Iterator[None]:
+    """Record spans within the context and write them to `path` when it
+    exits. If `path` is None, nothing is recorded.
+
+    Args:
+        path: the path of the trace file, or None.
+        format: one of `FORMATS`.
+    """
+    global _tracer
+    if path is None:
+        yield
+        return
+
+    previous: Tracer | None = _tracer
+    tracer: Tracer = Tracer()
+    _tracer = tracer
+    try:
+        yield
+    finally:
+        _tracer = previous
+        tracer.write(path, format)
@@ -0,0 +1,197 @@
+"""Keep the panes of a tmux session in memory, using the notifications of a
+control mode client.
+
+The watcher subscribes to the attributes of all panes of the session it is
+attached to, which tmux sends when they change, and it is notified when
+windows and panes are added or removed. Looking up a pane is then answered
+from memory, except for the pane that is looked up, of which the attributes
+are queried again in a single round-trip to tmux, as a notification may be
+up to a second late.
+"""
+
+import logging
+import threading
+
+from key2pane.control import ControlMode
+from key2pane.tmux import PANE_FORMAT, Pane, PaneIndex
+
+_SUBSCRIPTION: str = "key2pane"
+
+_STRUCTURE: frozenset[str] = frozenset(
+    (
+        "%layout-change",
+        "%window-add",
+        "%window-close",
+        "%unlinked-window-close",
+        "%sessions-changed",
+    )
+)
+
+
+class PaneWatcher:
+    """Maintain an index of the panes of a tmux session.
+
+    The attributes of each pane are updated by `%subscription-changed`
+    notifications, which tmux sends at most once per second. Notifications
+    that add or remove windows or panes, e.g. `%layout-change`, mark the
+    index as stale, as tmux does not notify subscriptions of removed panes.
+    A stale index is rebuilt from a direct query on the next lookup. As the
+    command of a pane may have changed since its last notification, the
+    active pane of a lookup is always queried again, see `_refresh`.
+    """
+
+    def __init__(self, *args: str):
+        """Start a control mode client, and a thread that reads its
+        notifications.
+
+        Args:
+            *args: extra arguments for `tmux attach-session`.
+
+        Raises:
+            TmuxError: when the client cannot attach to a session.
+        """
+        self._lock: threading.Lock = threading.Lock()
+        self._panes: dict[str, Pane] = {}
+        self._index: PaneIndex | None = None
+        self._stale: bool = True
+        self._generation: int = 0
+
+        self._client: ControlMode = ControlMode(*args)
+        session, _ = self._client.execute_many(
+            [
+                ("display-message", "-p", "#{session_id} #{session_name}"),
+                (
+                    "refresh-client",
+                    "-B",
+                    f"{_SUBSCRIPTION}:%*:{PANE_FORMAT}",
+                ),
+            ]
+        )
+        id, _, name = session.partition(" ")
+        self._session: tuple[str, str] = (id, name)
+        self._thread: threading.Thread = threading.Thread(
+            target=self._watch, name="key2pane-watch", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def alive(self) -> bool:
+        """Whether the notifications are still being read."""
+        return self._thread.is_alive()
+
+    def _watch(self) -> None:
+        """Apply each notification of the client, until it exits."""
+        try:
+            for line in self._client.notifications():
+                self.notify(line)
+        except (OSError, ValueError) as error:
+            logging.debug("Cannot read notifications: %s", error)
+
+        logging.info("Pane watcher stopped")
+        with self._lock:
+            self._stale = True
+
+    def notify(self, line: str) -> None:
+        """Update the index using a notification of the control mode client.
+
+        Args:
+            line: the notification.
+        """
+        name, _, rest = line.partition(" ")
+        with self._lock:
+            if name == "%subscription-changed":
+                fields, _, value = rest.partition(" : ")
+                if fields.split(" ", 1)[0] != _SUBSCRIPTION:
+                    return
+                pane: Pane = Pane.parse(value)
+                self._panes[pane.target] = pane
+            elif name in ("%session-changed", "%session-renamed"):
+                id, _, session = rest.partition(" ")
+                if name == "%session-changed" or id == self._session[0]:
+                    self._session = (id, session)
+                self._stale = True
+            elif name in _STRUCTURE:
+                self._stale = True
+            else:
+                return
+
+            self._index = None
+            self._generation += 1
+
+    def snapshot(self, target: str | None = None) -> PaneIndex:
+        """Return an index of the panes, in which `target` is active.
+
+        The index is answered from memory when it is up to date and holds
+        `target`, in which case only `target` is queried again. Otherwise,
+        e.g. when `target` belongs to another session, all panes are queried
+        using `PaneIndex.snapshot`, and the panes of the watched session are
+        remembered.
+
+        Args:
+            target: the id of the active pane, e.g. `%3`.
+
+        Raises:
+            TmuxError: when tmux needs to be queried, and the query fails.
+
+        Returns:
+            the index of the panes.
+        """
+        with self._lock:
+            if not self._stale and self._index is None:
+                self._index = PaneIndex(self._panes.values())
+            index: PaneIndex | None = self._index
+            generation: int = self._generation
+            session: str = self._session[1]
+
+        if index is not None and target:
+            view: PaneIndex = index.activate(target)
+            if view.active is not None:
+                return self._refresh(view)
+
+        logging.debug("Querying tmux, as %s is not watched", target)
+        index = PaneIndex.snapshot(target)
+        with self._lock:
+            if generation == self._generation:
+                self._panes = {
+                    pane.target: pane
+                    for pane in index
+                    if pane.session == session
+                }
+                self._index = None
+                self._stale = False
+        return index
+
+    def _refresh(self, view: PaneIndex) -> PaneIndex:
+        """Query the attributes of the active pane of `view` again, using a
+        single `display-message`, and remember them. tmux notifies the
+        subscription at most once per second, so e.g. a command that was
+        just started in the pane may not be known yet.
+
+        Args:
+            view: a view of the index, of which the active pane is set.
+
+        Raises:
+            TmuxError: when the pane cannot be queried.
+
+        Returns:
+            the view, or a copy in which the active pane is replaced when
+            its attributes changed.
+        """
+        assert view.active is not None
+        pane: Pane = Pane.from_active(view.active.target)
+        if pane.command == view.active.command:
+            return view
+
+        logging.debug("Pane %s now runs %s", pane.target, pane.command)
+        with self._lock:
+            if pane.target in self._panes:
+                self._panes[pane.target] = pane
+                self._index = None
+        return PaneIndex(
+            (other if other != pane else pane for other in view), pane.id
+        )
+
+    def close(self) -> None:
+        """Detach the control mode client and stop reading notifications."""
+        self._client.close()
+        self._thread.join()
@@ -1,9 +1,29 @@
 import logging
 import sys
-from subprocess import STDOUT, CalledProcessError, check_output
+from collections.abc import Callable, Iterator
+from subprocess import STDOUT, CalledProcessError, check_output, run
 
 import pytest
 
+from key2pane.backend import Memory
+from key2pane.tmux import connected
+
+
+@pytest.fixture(scope="function", autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    """Keep the compiled config cache out of the home directory."""
+    path = tmp_path / "cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(path))
+    return path
+
+
+@pytest.fixture(scope="function", autouse=True)
+def runtime_dir(tmp_path, monkeypatch):
+    """Keep the locks, the coalescing state and the captures of the tests
+    out of the runtime directory of the user."""
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    return tmp_path
+
 
 @pytest.fixture(scope="function")
 def restore_argv():
@@ -13,23 +33,32 @@ def restore_argv():
     sys.argv = old_argv
 
 
-def patch_tmux_execute(*args) -> str:
-    if "display-message" in args:
-        return "foo:0:0"
-
-    elif "list-panes" in args:
-        return "0:bash"
-
-    elif "send-keys" in args:
-        return " ".join(args)
-
-    else:
-        raise ValueError(f"Unknown command: {args}")
+PANES: tuple[dict[str, str], ...] = tuple(
+    {
+        "session_name": session,
+        "window_index": window,
+        "pane_index": index,
+        "pane_id": id,
+        "pane_current_command": command,
+        "pane_pid": f"9999999{id[1:]}",
+        "pane_tty": f"/dev/pts/999{id[1:]}",
+    }
+    for session, window, index, id, command in (
+        ("foo", "0", "0", "%0", "bash"),
+        ("foo", "0", "1", "%1", "python3"),
+        ("foo", "0", "2", "%4", "vi:m"),
+        ("bar", "1", "0", "%2", "zsh"),
+    )
+)
 
 
 @pytest.fixture(scope="function")
-def monkeypatch_tmux(monkeypatch):
-    monkeypatch.setattr("key2pane.tmux.execute", patch_tmux_execute)
+def memory_tmux() -> Iterator[Memory]:
+    """Execute the tmux commands of the test using a Memory backend that
+    serves `PANES`, in which %0 is active, and yield the backend."""
+    memory: Memory = Memory(PANES)
+    with connected(memory):
+        yield memory
 
 
 @pytest.fixture(scope="function")
@@ -45,3 +74,38 @@ def tmux_check():
         pytest.skip(f"tmux not running: {error.output.decode('utf-8')}")
     except FileNotFoundError as error:
         pytest.skip(f"tmux not installed: {error}")
+
+
+@pytest.fixture(scope="function")
+def tmux_session(tmux_check) -> Iterator[Callable[..., str]]:
+    """Return a function that creates a detached tmux session and returns
+    the id of its pane. It takes the name of the session, the command of
+    the pane, which defaults to the shell, and further options of
+    `tmux new-session`, e.g. `-x 80`. The sessions are killed after the
+    test."""
+    names: list[str] = []
+
+    def create(name: str, command: str | None = None, *options: str) -> str:
+        names.append(name)
+        return (
+            check_output(
+                [
+                    "tmux",
+                    "new-session",
+                    "-d",
+                    "-P",
+                    "-F",
+                    "#{pane_id}",
+                    *options,
+                    "-s",
+                    name,
+                    *([command] if command else []),
+                ]
+            )
+            .decode("utf-8")
+            .strip()
+        )
+
+    yield create
+    for name in names:
+        run(["tmux", "kill-session", "-t", name])
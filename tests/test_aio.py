@@ -0,0 +1,152 @@
+import asyncio
+import gc
+import subprocess
+import time
+
+import pytest
+
+from key2pane import aio
+from key2pane.backend import Memory, make_panes
+from key2pane.settings import Settings, SettingsError
+from key2pane.tmux import Pane, PaneIndex, TmuxError
+
+SESSION: str = "key2pane-test-aio"
+
+
+@pytest.fixture(scope="function")
+def session(tmux_session) -> str:
+    """Create a detached tmux session that runs cat, and return the id of
+    its pane."""
+    return tmux_session(SESSION, "exec cat")
+
+
+def test_execute(tmux_check):
+    assert asyncio.run(aio.execute("display-message", "-p", "foo")) == "foo"
+    with pytest.raises(TmuxError):
+        asyncio.run(aio.execute("list-panes", "-t", "key2pane-no-session"))
+
+
+@pytest.mark.parametrize("control", [True, False])
+def test_execute_many(tmux_check, control):
+    texts: list[str] = [f"a \"b\" $c ; {i}" for i in range(50)]
+
+    async def main() -> list[str]:
+        async with aio.control_mode() as client:
+            assert client.control is not None
+            if not control:
+                client = aio.Client()
+            return await asyncio.gather(
+                *(client.execute("display-message", "-p", t) for t in texts)
+            )
+
+    assert asyncio.run(main()) == texts
+
+
+def test_control_mode_failure(tmux_check):
+    async def main() -> str:
+        async with aio.control_mode() as client:
+            with pytest.raises(TmuxError):
+                await client.execute("list-panes", "-t", "key2pane-no-session")
+            return await client.execute("display-message", "-p", "c")
+
+    assert asyncio.run(main()) == "c"
+
+
+def test_send_keys(session):
+    settings: Settings = Settings.from_dicts(
+        dict(
+            session=SESSION,
+            window=0,
+            index=0,
+            reset=False,
+            positional=["hello"],
+            actions=[{"regex": "cat", "keys": ["{0}", "Enter"]}],
+        )
+    )
+
+    async def main() -> tuple[Pane, PaneIndex, list, list[str]]:
+        async with aio.control_mode() as client:
+            pane: Pane = await client.resolve(settings)
+            panes: PaneIndex = await client.snapshot(session)
+            results: list = await client.broadcast(
+                settings, [pane, Pane("x", 0, 0, "vi")]
+            )
+            return pane, panes, results, await client.send_keys(settings)
+
+    pane, panes, results, keys = asyncio.run(main())
+    assert pane.target == session and pane.command == "cat"
+    assert panes.active == pane
+    assert results[0] == ["hello", "Enter"]
+    assert isinstance(results[1], SettingsError)
+    assert keys == ["hello", "Enter"]
+
+    deadline: float = time.monotonic() + 5
+    while subprocess.check_output(
+        ["tmux", "capture-pane", "-p", "-t", session]
+    ).decode("utf-8").split() != ["hello"] * 4:
+        assert time.monotonic() < deadline, "keys were not sent"
+        time.sleep(0.1)
+
+
+def test_control_mode_exited():
+    """The commands that are pending when the client stops reading commands
+    fail, and no exception is left unretrieved."""
+    contexts: list[dict] = []
+
+    async def main() -> list[type]:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        loop.set_exception_handler(lambda _, context: contexts.append(context))
+        process: asyncio.subprocess.Process = (
+            await asyncio.create_subprocess_exec(
+                "sh",
+                "-c",
+                "exec 0<&-; echo; sleep 0.2",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+            )
+        )
+        assert process.stdout is not None
+        await process.stdout.readline()
+        client: aio.AsyncControlMode = aio.AsyncControlMode(process)
+        results: list = await asyncio.gather(
+            *(client.execute("display-message", "-p", str(i)) for i in (1, 2)),
+            return_exceptions=True,
+        )
+        await client.close()
+        types: list[type] = [type(result) for result in results]
+        del results
+        gc.collect()
+        return types
+
+    assert asyncio.run(main()) == [TmuxError, TmuxError]
+    assert contexts == []
+
+
+def test_backend():
+    memory: Memory = Memory(make_panes(3, ["bash", "python3", "vi"]))
+    settings: Settings = Settings.from_dicts(
+        dict(
+            session="memory",
+            window=0,
+            index=1,
+            reset=True,
+            positional=["x"],
+            actions=[{"regex": "bash|python3", "keys": ["{0}", "Enter"]}],
+        )
+    )
+
+    async def main() -> tuple[PaneIndex, list]:
+        client: aio.Client = aio.Client(backend=memory)
+        panes: PaneIndex = await client.snapshot()
+        assert await client.send_keys(settings) == ["x", "Enter"]
+        return panes, await client.broadcast(settings, panes)
+
+    panes, results = asyncio.run(main())
+    assert panes.active is not None and panes.active.backend is memory
+    assert results[:2] == [["x", "Enter"]] * 2
+    assert isinstance(results[2], SettingsError)
+    assert sorted(sent for sent in memory.sent if sent[1] != ["C-c"]) == [
+        ("%0", ["x", "Enter"]),
+        ("%1", ["x", "Enter"]),
+        ("%1", ["x", "Enter"]),
+    ]
@@ -0,0 +1,59 @@
+import io
+
+import pytest
+
+from key2pane import payload, tmux
+from key2pane.backend import Memory, make_panes
+
+
+def test_memory_snapshot():
+    memory: Memory = Memory(make_panes(3, ["bash", "python3"]), "%1")
+    panes: tmux.PaneIndex = tmux.PaneIndex.snapshot(backend=memory)
+    assert [str(pane) for pane in panes] == [
+        "memory:0.0",
+        "memory:0.1",
+        "memory:0.2",
+    ]
+    assert panes.active is not None and panes.active.command == "python3"
+    assert [pane.id for pane in panes.by_command("bash")] == ["%0", "%2"]
+    assert tmux.Pane.from_active("memory:0.2", memory).id == "%2"
+    with pytest.raises(tmux.TmuxError):
+        tmux.Pane.from_active("%9", memory)
+
+
+def test_memory_send():
+    memory: Memory = Memory()
+    pane: tmux.Pane = tmux.Pane.from_active(backend=memory)
+    assert pane.backend is memory
+    pane.send(["ls", "Enter"], reset=True)
+    assert memory.sent == [("%0", ["C-c"]), ("%0", ["ls", "Enter"])]
+
+
+def test_memory_payload():
+    with tmux.using("memory") as memory:
+        pane: tmux.Pane = tmux.Pane.from_active()
+        pane.send(["Enter"], False, payload.Payload(io.BytesIO(b"ls"), 1))
+    assert isinstance(memory, Memory)
+    assert [command[0] for command in memory.commands] == [
+        "display-message",
+        "load-buffer",
+        "paste-buffer",
+        "send-keys",
+        "delete-buffer",
+    ]
+    assert memory.buffers == {}
+
+
+def test_using():
+    with tmux.using("memory") as memory:
+        assert tmux._client is memory
+        with tmux.using(None) as current:
+            assert current is memory
+        with tmux.using("subprocess") as current:
+            assert current is None and tmux._client is None
+        assert tmux._client is memory
+    assert tmux._client is None
+
+    with pytest.raises(ValueError, match="Unknown backend"):
+        with tmux.using("foo"):
+            pass
@@ -0,0 +1,56 @@
+import json
+import subprocess
+
+from benchmarks import fake_tmux
+from benchmarks.run import main
+
+
+def test_fake_tmux(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_TMUX_PANES", "3")
+    monkeypatch.setenv("FAKE_TMUX_COMMANDS", "bash,python3")
+    monkeypatch.setenv("TMUX_PANE", "%1")
+    env: dict[str, str] = fake_tmux.install(str(tmp_path))
+
+    stdout: str = subprocess.check_output(
+        [
+            "tmux",
+            "display-message",
+            "-p",
+            "#S:#I:#P:#{pane_current_command}",
+            ";",
+            "list-panes",
+            "-F",
+            "#{pane_id}",
+            ";",
+            "send-keys",
+            "-t",
+            "bench:0.2",
+            "ls\\;",
+        ],
+        env=env,
+        text=True,
+    )
+    assert stdout.splitlines() == ["bench:0:1:python3", "%0", "%1", "%2"]
+
+    error = subprocess.run(
+        ["tmux", "send-keys", "-t", "%9", "ls"], env=env, capture_output=True
+    )
+    assert error.returncode == 1
+
+
+def test_benchmarks(tmp_path):
+    output = tmp_path / "report.json"
+    report: dict = main(
+        ["--repeat", "1", "--actions", "10", "--output", str(output)]
+    )
+    assert json.loads(output.read_text()) == report
+    assert set(report["results"]) == {
+        "cli",
+        "cli_control_mode",
+        "cli_memory",
+        "client",
+        "get_keys",
+        "send",
+        "send_control_mode",
+        "send_memory",
+    }
@@ -0,0 +1,46 @@
+import os
+
+from key2pane import cache
+
+compiled: list[bytes] = []
+
+
+def compile_upper(data: bytes) -> str:
+    compiled.append(data)
+    return data.decode("utf-8").upper()
+
+
+def test_cache_path(cache_home):
+    path: str = cache.cache_path("config.json")
+    assert path.startswith(str(cache_home / "key2pane"))
+    assert path.endswith(".pickle")
+    assert path != cache.cache_path("other.json")
+
+
+def test_load(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text("foo")
+    calls: int = len(compiled)
+
+    assert cache.load(str(path), compile_upper) == "FOO"
+    assert cache.load(str(path), compile_upper) == "FOO"
+    assert len(compiled) == calls + 1
+
+    os.utime(path, ns=(0, 0))
+    assert cache.load(str(path), compile_upper) == "FOO"
+    assert len(compiled) == calls + 1
+
+    path.write_text("bar")
+    os.utime(path, ns=(1, 1))
+    assert cache.load(str(path), compile_upper) == "BAR"
+    assert len(compiled) == calls + 2
+
+
+def test_load_corrupt_entry(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text("foo")
+    os.makedirs(os.path.dirname(cache.cache_path(str(path))))
+    with open(cache.cache_path(str(path)), "wb") as file:
+        file.write(b"not a pickle")
+
+    assert cache.load(str(path), compile_upper) == "FOO"
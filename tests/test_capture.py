@@ -0,0 +1,64 @@
+import re
+import time
+
+import pytest
+
+from key2pane import tmux
+from key2pane.capture import Capture
+from key2pane.ready import probe
+from key2pane.tmux import execute
+
+SESSION: str = "key2pane-test-capture"
+
+
+@pytest.fixture(scope="function")
+def session(tmux_session) -> str:
+    """Create a small detached tmux session that runs bash, and return the
+    id of its pane."""
+    pane: str = tmux_session(
+        SESSION, "bash --norc --noprofile", "-x", "80", "-y", "5"
+    )
+    deadline: float = time.monotonic() + 5
+    while probe(pane)[0] != "bash":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    time.sleep(0.1)
+    return pane
+
+
+def run(pane: str, command: str, **kwargs) -> list[str]:
+    lines: list[str] = []
+    capture: Capture = Capture(pane, write=lines.append, **kwargs)
+    capture.mark()
+    execute("send-keys", "-t", pane, command, "Enter")
+    assert capture.follow() == len(lines)
+    return lines
+
+
+def test_prompt(session, tmp_path):
+    start: float = time.monotonic()
+    lines: list[str] = run(session, "printf 'a\\n\\n  b\\n'; seq 10")
+    assert lines == ["a", "", "  b", *map(str, range(1, 11))]
+    assert time.monotonic() - start < 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_control_mode(session):
+    with tmux.control_mode() as client:
+        assert client is not None
+        lines: list[str] = run(session, "printf '  a\\n\\n'; echo b")
+    assert lines == ["  a", "", "b"]
+
+
+def test_until(session):
+    lines: list[str] = run(
+        session, "seq 3; sleep 5", until=re.compile("^3$"), idle=5000
+    )
+    assert lines == ["1", "2", "3"]
+
+
+def test_idle(session):
+    start: float = time.monotonic()
+    lines: list[str] = run(session, "echo x; sleep 5", idle=200)
+    assert lines == ["x"]
+    assert time.monotonic() - start < 1
@@ -1,6 +1,8 @@
 import sys
 from argparse import ArgumentParser, Namespace
 
+import pytest
+
 from key2pane.cli import make_parser
 
 
@@ -49,3 +51,10 @@ def test_make_parser_options(restore_argv):
     assert args.logfile == "log.log"
     assert args.loglevel == "DEBUG"
     assert args.positional == ["Hello", "Enter"]
+
+
+def test_variable():
+    args: Namespace = make_parser().parse_args(["--var", "a=b=c", "--var=d="])
+    assert args.var == [("a", "b=c"), ("d", "")]
+    with pytest.raises(SystemExit):
+        make_parser().parse_args(["--var", "=b"])
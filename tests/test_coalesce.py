@@ -0,0 +1,63 @@
+import json
+import threading
+import time
+
+from key2pane.coalesce import coalesce, state_path
+
+
+def test_state_path(runtime_dir):
+    path: str = state_path("%3")
+    assert path == str(runtime_dir / "key2pane-coalesce" / "_3")
+    assert state_path("a/b:0.1").endswith("a_b:0.1")
+
+
+def test_duplicate():
+    assert coalesce("%1", ["a"], False, 200) == (["a"], False)
+    assert coalesce("%1", ["a"], False, 200) is None
+    assert coalesce("%2", ["a"], False, 200) == (["a"], False)
+
+    time.sleep(0.25)
+    assert coalesce("%1", ["a"], False, 200) == (["a"], False)
+
+
+def test_superseded():
+    assert coalesce("%1", ["a"], True, 200) == (["a"], True)
+
+    results: list = []
+    trailer = threading.Thread(
+        target=lambda: results.append(coalesce("%1", ["b"], True, 200))
+    )
+    start: float = time.monotonic()
+    trailer.start()
+    time.sleep(0.05)
+    for keys in (["c"], ["d"]):
+        assert coalesce("%1", keys, False, 200) is None
+    trailer.join()
+
+    assert results == [(["d"], False)]
+    assert time.monotonic() - start >= 0.15
+    assert coalesce("%1", ["d"], False, 200) is None
+
+
+def test_superseded_by_duplicate():
+    assert coalesce("%1", ["a"], False, 200) == (["a"], False)
+
+    results: list = []
+    trailer = threading.Thread(
+        target=lambda: results.append(coalesce("%1", ["b"], False, 200))
+    )
+    trailer.start()
+    time.sleep(0.05)
+    assert coalesce("%1", ["a"], False, 200) is None
+    trailer.join()
+    assert results == [None]
+
+
+def test_future_state():
+    future: int = time.time_ns() + 3600 * 1_000_000_000
+    with open(state_path("%1"), "w") as file:
+        json.dump({"sent_at": future, "sent": {"keys": ["a"]}}, file)
+
+    start: float = time.monotonic()
+    assert coalesce("%1", ["a"], False, 200) == (["a"], False)
+    assert time.monotonic() - start < 0.15
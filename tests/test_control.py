@@ -0,0 +1,71 @@
+import pytest
+
+from key2pane import tmux
+from key2pane.control import ControlMode, Replies, quote
+
+
+def test_quote():
+    assert quote("echo 'Hello'") == '"echo \'Hello\'"'
+    assert quote('a"b$c\\d\ne') == '"a\\"b\\$c\\\\d\\ne"'
+
+
+def test_replies():
+    replies: Replies = Replies()
+    lines: list[str] = [
+        "%begin 1 2 1",
+        "a",
+        "%end 1 1 1",
+        "%end 1 2 1",
+        "%window-add @1",
+        "%begin 1 3 1",
+        "no such session",
+        "%error 1 3 1",
+        "%exit",
+    ]
+    framed: list[tuple[bool, tuple[bool, str] | None]] = [
+        (replies.notification(line), replies.feed(line)) for line in lines
+    ]
+    assert framed == [
+        (False, None),
+        (False, None),
+        (False, None),
+        (False, (True, "a\n%end 1 1 1")),
+        (True, None),
+        (False, None),
+        (False, None),
+        (False, (False, "no such session")),
+        (False, None),
+    ]
+    assert replies.exited
+
+
+def test_execute(tmux_check):
+    with ControlMode() as client:
+        assert client.alive
+        assert client.execute("display-message", "-p", "#{pane_id}")
+        text: str = "a \"b\" 'c' $d \\e ; f"
+        assert client.execute("display-message", "-p", text) == text
+
+    assert not client.alive
+
+
+def test_execute_many(tmux_check):
+    with ControlMode() as client:
+        outputs: list[str] = client.execute_many(
+            [("display-message", "-p", "a"), ("display-message", "-p", "b")]
+        )
+        assert outputs == ["a", "b"]
+
+        with pytest.raises(tmux.TmuxError):
+            client.execute("list-panes", "-t", "key2pane-no-such-session")
+
+        assert client.execute("display-message", "-p", "c") == "c"
+
+
+def test_control_mode(tmux_check):
+    with tmux.control_mode() as client:
+        assert client is not None
+        assert tmux._client is client
+        assert tmux.execute("display-message", "-p", "foo") == "foo"
+
+    assert tmux._client is None
@@ -0,0 +1,66 @@
+import re
+
+import pytest
+
+from key2pane.dispatch import Dispatch, literals, prefix
+
+
+def test_literals():
+    assert literals("bash|zsh|fish") == ["bash", "zsh", "fish"]
+    assert literals("python") == ["python"]
+    assert literals("python[0-9]*") is None
+
+
+def test_prefix():
+    assert prefix("python[0-9]*") == "python"
+    assert prefix("^nvim$") == "nvim"
+    assert prefix("pythons?") == "python"
+    assert prefix("n?vim") == ""
+    assert prefix("(?i)ipython") == ""
+    assert prefix("ipython|python") == ""
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "bash",
+        "zsh",
+        "python",
+        "python3",
+        "python3.12",
+        "nvim",
+        "",
+        "ipython",
+        "pyy",
+        "xx",
+    ],
+)
+def test_match_is_re_match(command):
+    regexes: list[str] = [
+        "bash|zsh|fish",
+        "python[0-9]*",
+        "python3",
+        "n?vim",
+        "(?P<name>ipy)thon",
+        "(?P<name>py)",
+        "(i)py\\1?thon",
+        "(?i)IPYTHON",
+        "^nvim$",
+        "py+",
+        "x{2}",
+        "python3\\.1[0-9]",
+    ]
+    expected: list[int] = [
+        position
+        for position, regex in enumerate(regexes)
+        if re.match(regex, command)
+    ]
+    assert Dispatch(regexes).match(command) == expected
+
+
+def test_match_thousands():
+    regexes: list[str] = [f"cmd{i}$" for i in range(2000)] + ["bash"]
+    dispatch: Dispatch = Dispatch(regexes)
+    assert dispatch.match("cmd1999") == [1999]
+    assert dispatch.match("bashful") == [2000]
+    assert dispatch.match("cmd") == []
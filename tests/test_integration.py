@@ -1,3 +1,4 @@
+import json
 import subprocess
 import sys
 
@@ -34,6 +35,42 @@ def test_invalid_config(tmux_check):
     assert "Invalid config file" in stdout, stdout
 
 
+def test_invalid_action(tmux_check, tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text('{"actions": [{"regex": "a", "keys": [1]}]}')
+    stdout: str = execute("--config", str(config))
+    assert "processing the settings." in stdout, stdout
+    assert "Expected a string at actions[0].keys[0]" in stdout, stdout
+
+    config.write_text('{"actions": [{"regex": "(", "keys": []}]}')
+    stdout = execute("--config", str(config))
+    assert "Invalid regex at actions[0].regex" in stdout, stdout
+
+
 def test_invalid_args_or_tmux_not_running(tmux_check):
     stdout: str = execute("--config", paths.config)
     assert "Hello, World!" in stdout
+
+
+def test_trace(tmux_check, tmp_path):
+    trace = tmp_path / "trace.jsonl"
+    execute("--config", paths.config, "--trace", str(trace))
+    names: list[str] = [
+        json.loads(line)["name"] for line in trace.read_text().splitlines()
+    ]
+    for phase in ("parse_args", "snapshot", "load_config", "get_keys"):
+        assert phase in names, names
+    assert "tmux.execute" in names, names
+
+
+def test_invalid_template(tmux_check, tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text('{"actions": [{"regex": "", "keys": ["{"]}]}')
+    stdout: str = execute("--config", str(config))
+    assert "Invalid placeholder at actions[0].keys[0]" in stdout, stdout
+
+    config.write_text(
+        '{"reset": false, "actions": [{"regex": "", "keys": ["{0} {file}"]}]}'
+    )
+    stdout = execute("--config", str(config), "a")
+    assert "missing arguments: file" in stdout, stdout
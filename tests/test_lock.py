@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+
+import pytest
+
+from key2pane.lock import lock_dir, pane_lock, pane_locks
+from key2pane.tmux import TmuxError
+
+
+def hold(target: str, event: threading.Event, log: list, name: str):
+    with pane_lock(target, 5000):
+        log.append(f"{name} start")
+        event.wait(5)
+        log.append(f"{name} end")
+
+
+def test_sequential(runtime_dir):
+    for _ in range(3):
+        with pane_lock("%1", 1000):
+            pass
+    assert sorted(os.listdir(lock_dir("%1"))) == ["3", "tail"]
+
+
+def test_disabled(runtime_dir):
+    with pane_lock("%1", 0):
+        pass
+    assert not (runtime_dir / "key2pane-locks").exists()
+
+
+def test_fifo():
+    log: list = []
+    release: threading.Event = threading.Event()
+    threads: list[threading.Thread] = []
+    for name in "abcd":
+        thread = threading.Thread(target=hold, args=("%1", release, log, name))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.05)
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert log == [
+        f"{name} {event}" for name in "abcd" for event in ("start", "end")
+    ]
+
+
+def test_timeout():
+    log: list = []
+    release: threading.Event = threading.Event()
+    holder = threading.Thread(target=hold, args=("%1", release, log, "a"))
+    holder.start()
+    time.sleep(0.05)
+
+    with pytest.raises(TmuxError, match="Timed out after 50 ms"):
+        with pane_lock("%1", 50):
+            pass
+
+    waiter = threading.Thread(target=hold, args=("%1", release, log, "b"))
+    waiter.start()
+    time.sleep(0.05)
+    assert log == ["a start"]
+
+    release.set()
+    holder.join()
+    waiter.join()
+    assert log == ["a start", "a end", "b start", "b end"]
+
+
+def test_pane_locks(runtime_dir):
+    log: list[str] = []
+    event = threading.Event()
+    thread = threading.Thread(target=hold, args=("%2", event, log, "a"))
+    thread.start()
+    while not log:
+        time.sleep(0.001)
+
+    with pytest.raises(TmuxError, match="pane %2"):
+        with pane_locks(["%3", "%2", "%3"], 50):
+            pass
+    with pane_locks(["%1", "%3"], 50):
+        assert sorted(os.listdir(lock_dir("%3"))) == ["1", "tail"]
+    event.set()
+    thread.join()
+    with pane_locks(["%3", "%2"], 1000):
+        log.append("b")
+    assert log == ["a start", "a end", "b"]
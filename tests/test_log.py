@@ -0,0 +1,36 @@
+import logging
+
+from key2pane.log import BackgroundFileHandler, Pretty
+
+
+class Counter:
+    calls: int = 0
+
+    def __repr__(self) -> str:
+        Counter.calls += 1
+        return "Counter()"
+
+
+def test_pretty_is_lazy():
+    logger: logging.Logger = logging.getLogger("key2pane.test")
+    logger.setLevel(logging.WARNING)
+    logger.debug("%s", Pretty([Counter()]))
+    assert Counter.calls == 0
+    assert str(Pretty([Counter()])) == "[Counter()]"
+    assert Counter.calls == 1
+
+
+def test_background_file_handler(tmp_path):
+    logfile = tmp_path / "state" / "key2pane.log"
+    handler: BackgroundFileHandler = BackgroundFileHandler(str(logfile))
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    assert not logfile.parent.exists()
+
+    record = logging.makeLogRecord(
+        {"msg": "Hello %s", "args": ("World",), "levelno": logging.ERROR}
+    )
+    record.levelname = "ERROR"
+    handler.handle(record)
+    handler.close()
+
+    assert logfile.read_text() == "ERROR Hello World\n"
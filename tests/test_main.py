@@ -1,13 +1,19 @@
+import subprocess
 import sys
 from argparse import ArgumentParser, Namespace
+from io import BytesIO
 
-from key2pane.__main__ import make_settings
+import pytest
+
+from key2pane.__main__ import make_settings, run, stream
 from key2pane.cli import make_parser
-from key2pane.settings import Settings
+from key2pane.lock import pane_lock
+from key2pane.settings import Settings, SettingsError
+from key2pane.tmux import TmuxError
 from tests import paths
 
 
-def test_reset_cli_none(restore_argv, monkeypatch_tmux):
+def test_reset_cli_none(restore_argv, memory_tmux):
     """Encountered a bug where the reset was True in the config but the cli arg
     was False. Thus the reset was set to False, which is unexpected."""
     sys.argv = ["key2pane", "--config", paths.config_reset]
@@ -17,7 +23,7 @@ def test_reset_cli_none(restore_argv, monkeypatch_tmux):
     assert args.reset is None
     assert settings.reset is True
 
-def test_reset_cli_true(restore_argv, monkeypatch_tmux):
+def test_reset_cli_true(restore_argv, memory_tmux):
     sys.argv = ["key2pane", "--config", paths.config_reset, "--reset"]
     parser: ArgumentParser = make_parser()
     args: Namespace = parser.parse_args()
@@ -25,10 +31,175 @@ def test_reset_cli_true(restore_argv, monkeypatch_tmux):
     assert args.reset is True
     assert settings.reset is True
 
-def test_reset_cli_false(restore_argv, monkeypatch_tmux):
+def test_reset_cli_false(restore_argv, memory_tmux):
     sys.argv = ["key2pane", "--config", paths.config_reset, "--noreset"]
     parser: ArgumentParser = make_parser()
     args: Namespace = parser.parse_args()
     settings: Settings = make_settings(args)
     assert args.reset is False
     assert settings.reset is False
+
+
+def test_broadcast(memory_tmux, capsys):
+    echo: str = "echo 'Hello, World!' Enter"
+    python: str = "print('Hello, World!') Enter"
+    expected: dict[str, list[str]] = {
+        "window": [f"foo:0.0: {echo}", f"foo:0.1: {python}"],
+        "session": [f"foo:0.0: {echo}", f"foo:0.1: {python}"],
+        "all": [f"foo:0.0: {echo}", f"foo:0.1: {python}", f"bar:1.0: {echo}"],
+    }
+    for scope, lines in expected.items():
+        args: Namespace = make_parser().parse_args(
+            ["--config", paths.config, "--dry-run", "--broadcast", scope]
+        )
+        run(args)
+        assert capsys.readouterr().out.splitlines() == lines, scope
+
+
+def test_broadcast_filter(memory_tmux, capsys):
+    args: Namespace = make_parser().parse_args(
+        ["--config", paths.config, "--dry-run", "-b", "all", "--filter", "z"]
+    )
+    run(args)
+    assert capsys.readouterr().out == "bar:1.0: echo 'Hello, World!' Enter\n"
+
+    args.filter = "vi"
+    with pytest.raises(SettingsError, match="No keys to send"):
+        run(args)
+
+
+def test_broadcast_lock(memory_tmux):
+    args: Namespace = make_parser().parse_args(
+        ["--config", paths.config, "-b", "window", "--lock-timeout", "50"]
+    )
+    with pane_lock("%1", 1000):
+        with pytest.raises(TmuxError, match="pane %1"):
+            run(args)
+    assert memory_tmux.sent == []
+
+    run(args)
+    assert [target for target, _ in memory_tmux.sent] == ["%0", "%1"]
+
+
+def test_broadcast_reset(memory_tmux):
+    args: Namespace = make_parser().parse_args(
+        ["--config", paths.config, "-b", "window", "--reset"]
+        + ["--ready-timeout", "1000"]
+    )
+    run(args)
+    echo: list[str] = ["echo 'Hello, World!'", "Enter"]
+    python: list[str] = ["print('Hello, World!')", "Enter"]
+    assert sorted(memory_tmux.sent[:2]) == [("%0", ["C-c"]), ("%1", ["C-c"])]
+    assert memory_tmux.sent[2:] == [("%0", echo), ("%1", python)]
+
+
+def test_broadcast_coalesce(memory_tmux):
+    args: Namespace = make_parser().parse_args(
+        ["--config", paths.config, "-b", "all", "--coalesce", "60000"]
+    )
+    run(args)
+    run(args)
+    assert [target for target, _ in memory_tmux.sent] == ["%0", "%1", "%2"]
+
+
+def test_target(memory_tmux, capsys):
+    args: Namespace = make_parser().parse_args(
+        ["--config", paths.config, "--dry-run", "-w", "0", "-t", "%1", "foo"]
+    )
+    settings: Settings = make_settings(args)
+    assert (settings.session, settings.window, settings.index) == ("foo", 0, 1)
+
+    run(args)
+    assert capsys.readouterr().out == "print('Hello, World!') Enter\n"
+
+
+def test_stream(memory_tmux, capsys):
+    args: Namespace = make_parser().parse_args(
+        ["--config", paths.config, "--dry-run", "--stdin"]
+    )
+    records: BytesIO = BytesIO(b"foo\n-t %1 bar\n-t %4\n-t %2 'a b'\n")
+    with pytest.raises(SettingsError, match="1 of 4 records failed"):
+        stream(args, source=records)
+
+    lines: list[str] = capsys.readouterr().out.splitlines()
+    assert lines[0] == "1\tok\tfoo:0.0\techo 'Hello, World!'\tEnter"
+    assert lines[1] == "2\tok\tfoo:0.1\tprint('Hello, World!')\tEnter"
+    assert lines[2] == "3\terror\tNo action found for command vi:m"
+    assert lines[3] == "4\tok\tbar:1.0\techo 'Hello, World!'\tEnter"
+
+
+def test_stream_send(memory_tmux, monkeypatch):
+    sent: list[tuple[str, list[str]]] = []
+    monkeypatch.setattr(
+        "key2pane.tmux.Pane.send",
+        lambda pane, keys, reset, payload=None: sent.append(
+            (pane.target, keys)
+        ),
+    )
+    args: Namespace = make_parser().parse_args(
+        ["--config", paths.config, "--stdin", "-0", "-t", "%1"]
+    )
+    stream(args, source=BytesIO(b"x\0-t %0 y\0"))
+    assert [target for target, _ in sent] == ["%1", "%0"]
+
+
+def test_stream_coalesce(memory_tmux, capsys):
+    args: Namespace = make_parser().parse_args(
+        ["--config", paths.config, "--stdin", "--coalesce", "60000"]
+    )
+    stream(args, source=BytesIO(b"foo\nfoo\n-t %1 foo\n"))
+    assert capsys.readouterr().out.count("\tok\t") == 3
+    assert [target for target, _ in memory_tmux.sent] == ["%0", "%1"]
+
+
+def test_variables(memory_tmux, tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text(
+        '{"reset": false, "variables": {"a": "1", "b": "2"}, "actions": []}'
+    )
+    args: Namespace = make_parser().parse_args(
+        ["--config", str(config), "--var", "b=3"]
+    )
+    assert make_settings(args).variables == {"a": "1", "b": "3"}
+
+
+def test_backend(capsys):
+    args: Namespace = make_parser().parse_args(
+        ["--config", paths.config, "--backend", "memory", "--dry-run", "foo"]
+    )
+    run(args)
+    assert capsys.readouterr().out == "echo 'Hello, World!' Enter\n"
+
+    args.backend = "foo"
+    with pytest.raises(SettingsError, match="Unknown backend"):
+        run(args)
+
+
+@pytest.fixture(scope="function")
+def servers(tmux_check):
+    """Start two tmux servers with a session `foo` that runs bash."""
+    names: list[str] = ["key2pane-test-a", "key2pane-test-b"]
+    for name in names:
+        subprocess.run(
+            ["tmux", "-L", name, "new-session", "-d", "-s", "foo", "bash"],
+            check=True,
+        )
+    yield names
+    for name in names:
+        subprocess.run(["tmux", "-L", name, "kill-server"])
+
+
+def test_fan_out(servers, capsys):
+    args: Namespace = make_parser().parse_args(
+        ["--config", paths.config, "--dry-run", "-s", "foo", "-i", "0"]
+        + [option for name in servers for option in ("-L", name)]
+        + ["-L", "key2pane-test-missing"]
+    )
+    with pytest.raises(SettingsError, match="1 of 3 servers failed"):
+        run(args)
+
+    lines: list[str] = capsys.readouterr().out.splitlines()
+    sent: str = "ok\tfoo:0.0\techo 'Hello, World!' Enter"
+    assert lines[0] == f"key2pane-test-a\t{sent}"
+    assert lines[1] == f"key2pane-test-b\t{sent}"
+    assert lines[2].startswith("key2pane-test-missing\terror\t")
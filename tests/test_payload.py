@@ -0,0 +1,74 @@
+import io
+import subprocess
+
+import pytest
+
+from key2pane import payload, tmux
+from key2pane.settings import SettingsError
+
+
+def test_paste_small():
+    small: payload.Payload = payload.Payload(io.BytesIO(b"print(1)\n"), 9)
+    assert small.paste("%0") == ("send-keys", "-t", "%0", "-l", "print(1)\n")
+    assert small.paste("%1") == ("send-keys", "-t", "%1", "-l", "print(1)\n")
+    assert small.cleanup() is None
+
+
+def test_paste_large(monkeypatch):
+    loaded: list[bytes] = []
+    monkeypatch.setattr(
+        payload,
+        "load_buffer",
+        lambda name, head, stream: loaded.append(head + stream.read()),
+    )
+    large: payload.Payload = payload.Payload(io.BytesIO(b"0123456789"), 9)
+    command: tuple[str, ...] = large.paste("%0")
+    assert command[:2] == ("paste-buffer", "-b")
+    assert command[3:] == ("-t", "%0")
+    assert large.paste("%1")[2] == command[2]
+    assert loaded == [b"0123456789"]
+    assert large.cleanup() == ("delete-buffer", "-b", command[2])
+
+    bracketed = payload.Payload(io.BytesIO(b"1"), bracketed=True)
+    assert bracketed.paste("%0")[-1] == "-p"
+
+
+def test_send_payload(memory_tmux, monkeypatch):
+    monkeypatch.setattr(payload, "load_buffer", lambda *args: None)
+    pane: tmux.Pane = tmux.Pane.from_active()
+    commands: list[tuple[str, ...]] = []
+    monkeypatch.setattr(
+        tmux, "execute_many", lambda batch: commands.extend(batch) or batch
+    )
+    pane.send(["Enter"], True, payload.Payload(io.BytesIO(b"ls"), 1))
+    assert [command[0] for command in commands] == [
+        "send-keys",
+        "paste-buffer",
+        "send-keys",
+        "delete-buffer",
+    ]
+
+
+def test_load_buffer(tmux_check):
+    data: bytes = b"x" * (3 << 20)
+    payload.load_buffer("key2pane-test", data[:10], io.BytesIO(data[10:]))
+    try:
+        shown: bytes = subprocess.check_output(
+            ["tmux", "show-buffer", "-b", "key2pane-test"]
+        )
+        assert shown == data
+    finally:
+        subprocess.run(["tmux", "delete-buffer", "-b", "key2pane-test"])
+
+
+def test_open_payload(tmp_path):
+    path = tmp_path / "payload.py"
+    path.write_bytes(b"print(1)")
+    with payload.open_payload(None) as nothing:
+        assert nothing is None
+    with payload.open_payload(str(path)) as contents:
+        assert contents is not None
+        assert contents.paste("%0")[-1] == "print(1)"
+    with pytest.raises(SettingsError, match="Cannot open payload"):
+        with payload.open_payload(str(tmp_path / "missing.py")):
+            pass
@@ -0,0 +1,89 @@
+import os
+import pty
+import signal
+import sys
+import time
+
+import pytest
+
+from key2pane import proc
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists("/proc/self/stat"), reason="/proc is not available"
+)
+
+
+def cmdline(pid: int) -> tuple[str, ...]:
+    with open(f"/proc/{pid}/cmdline", "rb") as file:
+        return tuple(file.read().decode().rstrip("\0").split("\0"))
+
+
+@pytest.fixture
+def spawn():
+    """Start a process with `argv` in a new terminal, and return its pid."""
+    pids: list[int] = []
+
+    def start(*argv: str) -> int:
+        pid, _ = pty.fork()
+        if pid == 0:
+            os.execv(sys.executable, list(argv))
+        pids.append(pid)
+
+        deadline: float = time.monotonic() + 5
+        while cmdline(pid) != argv and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return pid
+
+    yield start
+    for pid in pids:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+
+def test_foreground(spawn):
+    argv = ("python3", "-c", "import time; time.sleep(30)", "script.py")
+    pid: int = spawn(*argv)
+    assert proc.foreground(pid) == argv
+    assert proc.command(pid) == " ".join(argv)
+    assert proc.foreground(pid, "/dev/null") is None
+    assert proc.foreground(2**22 + 1) is None
+
+    hits: int = proc._cmdline.cache_info().hits
+    proc.foreground(pid)
+    assert proc._cmdline.cache_info().hits == hits + 1
+
+
+def test_foreground_skips_key2pane(spawn):
+    pid: int = spawn("/bin/key2pane", "-c", "import time; time.sleep(30)")
+    assert proc.foreground(pid) == cmdline(os.getpid())
+
+
+def test_command(monkeypatch):
+    monkeypatch.setattr(proc, "foreground", lambda pid, tty: ("-bash",))
+    assert proc.command(1) == "bash"
+    monkeypatch.setattr(
+        proc, "foreground", lambda pid, tty: ("/usr/bin/python3", "a.py")
+    )
+    assert proc.command(1) == "python3 a.py"
+    monkeypatch.setattr(proc, "foreground", lambda pid, tty: None)
+    assert proc.command(1) is None
+
+
+@pytest.mark.parametrize(
+    "argv, expected",
+    [
+        (("/usr/bin/key2pane", "-t", "%3"), True),
+        (("key2pane-client", "foo"), True),
+        (("/usr/bin/python3", "/home/me/.local/bin/key2pane", "foo"), True),
+        (("python3", "-m", "key2pane", "foo"), True),
+        (("python3", "-mkey2pane.client"), True),
+        (("vim", "key2pane.py"), False),
+        (("python3", "key2pane.py"), False),
+        (("python3", "-m", "key2pane_tests"), False),
+        (("python3", "-m"), False),
+        (("bash",), False),
+        ((), False),
+    ],
+)
+def test_is_key2pane(argv, expected):
+    assert proc._is_key2pane(argv) is expected
@@ -0,0 +1,74 @@
+import re
+import time
+
+import pytest
+
+from key2pane.backend import Memory
+from key2pane.ready import probe, reset
+from key2pane.tmux import execute
+
+SESSION: str = "key2pane-test-ready"
+
+
+@pytest.fixture(scope="function")
+def session(tmux_session) -> str:
+    """Create a detached tmux session that runs bash, and return the id of
+    its pane."""
+    return tmux_session(SESSION, "bash --norc --noprofile")
+
+
+def wait_for(pane: str, command: str):
+    deadline: float = time.monotonic() + 5
+    while probe(pane)[0] != command:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_probe(session):
+    wait_for(session, "bash")
+    command, screen = probe(session)
+    assert command == "bash"
+    assert probe(session) == (command, screen)
+
+    execute("send-keys", "-t", session, "echo foo")
+    time.sleep(0.1)
+    assert probe(session) != (command, screen)
+
+
+def test_reset(session):
+    wait_for(session, "bash")
+    execute("send-keys", "-t", session, "sleep 100", "Enter")
+    wait_for(session, "sleep")
+
+    start: float = time.monotonic()
+    assert reset(session, re.compile("bash"), 2000)
+    assert time.monotonic() - start < 1
+    assert probe(session)[0] == "bash"
+
+
+def test_reset_ignored(session):
+    wait_for(session, "bash")
+    execute(
+        "send-keys", "-t", session, "stty -echo -isig; sleep 100", "Enter"
+    )
+    wait_for(session, "sleep")
+    time.sleep(0.1)
+
+    start: float = time.monotonic()
+    assert reset(session, re.compile("sleep"), 2000, quiet=100)
+    assert 0.1 <= time.monotonic() - start < 1
+
+
+def test_reset_budget(session):
+    wait_for(session, "bash")
+
+    start: float = time.monotonic()
+    assert not reset(session, re.compile("python"), 200)
+    assert 0.2 <= time.monotonic() - start < 1
+
+
+def test_reset_backend():
+    memory: Memory = Memory()
+    assert reset("%1", re.compile("bash"), 1000, quiet=10, backend=memory)
+    assert memory.sent == [("%1", ["C-c"])]
+    assert not reset("%2", re.compile("vi"), 20, backend=memory)
@@ -0,0 +1,34 @@
+from io import BytesIO
+
+import pytest
+
+from key2pane.records import parse_record, read_records
+from key2pane.settings import SettingsError
+
+
+def test_read_records():
+    stream: BytesIO = BytesIO(b"foo bar\n\n-t %1 baz\nqux")
+    assert list(read_records(stream, b"\n")) == ["foo bar", "-t %1 baz", "qux"]
+
+    stream = BytesIO(b"'a\nb' c\0\0d\0")
+    assert list(read_records(stream, b"\0")) == ["'a\nb' c", "d"]
+
+
+@pytest.mark.parametrize(
+    "record, expected",
+    [
+        ("foo 'bar baz'", (None, ["foo", "bar baz"])),
+        ("-t %3 foo", ("%3", ["foo"])),
+        ("--target foo:0.1 -- -t", ("foo:0.1", ["-t"])),
+        ("--target=%2", ("%2", [])),
+        ("'a\nb'", (None, ["a\nb"])),
+    ],
+)
+def test_parse_record(record, expected):
+    assert parse_record(record) == expected
+
+
+@pytest.mark.parametrize("record", ["'foo", "-t"])
+def test_parse_record_invalid(record):
+    with pytest.raises(SettingsError):
+        parse_record(record)
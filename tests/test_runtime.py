@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from key2pane import runtime
+
+
+def test_runtime_dir_private(monkeypatch):
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    monkeypatch.setattr(os, "getuid", lambda: 4294967294)
+    path: str = "/tmp/key2pane-4294967294"
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    try:
+        with pytest.raises(PermissionError):
+            runtime.runtime_dir()
+    finally:
+        os.rmdir(path)
+
+
+def test_open_private(runtime_dir):
+    target = runtime_dir / "target"
+    target.write_text("keep")
+    (runtime_dir / "link").symlink_to(target)
+    with pytest.raises(OSError):
+        runtime.open_private(str(runtime_dir / "link"), "a+")
+    assert target.read_text() == "keep"
+
+    with runtime.open_private(str(runtime_dir / "state"), "a+") as file:
+        file.write("x")
+    assert (runtime_dir / "state").stat().st_mode & 0o777 == 0o600
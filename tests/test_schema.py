@@ -0,0 +1,60 @@
+import pytest
+
+from key2pane.schema import Action, check_config
+
+
+def test_action():
+    action: Action = Action.parse(
+        {"regex": "py", "keys": ["{0}", "Enter"], "defaults": {"0": "x"}},
+        "actions[0]",
+    )
+    assert action.pattern.match("python")
+    assert action.keys == ("{0}", "Enter")
+    assert action.plan.render([], {}) == ["x", "Enter"]
+    assert action == Action("py", ["{0}", "Enter"], {"0": "x"})
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        ([], "Expected an object at actions[1], got an array"),
+        ({"keys": []}, "Missing actions[1].regex"),
+        ({"regex": "a"}, "Missing actions[1].keys"),
+        ({"regex": "a", "keys": [], "kyes": []}, "Unknown property"),
+        ({"regex": 1, "keys": []}, "Expected a string at actions[1].regex"),
+        ({"regex": "(", "keys": []}, "Invalid regex at actions[1].regex"),
+        ({"regex": "a", "keys": "b"}, "Expected an array at actions[1].keys"),
+        (
+            {"regex": "a", "keys": ["b", None]},
+            "Expected a string at actions[1].keys[1], got null",
+        ),
+        (
+            {"regex": "a", "keys": ["{"]},
+            "Invalid placeholder at actions[1].keys[0]",
+        ),
+        (
+            {"regex": "a", "keys": [], "defaults": {"0": 0}},
+            "Expected a string at actions[1].defaults.0, got an integer",
+        ),
+    ],
+)
+def test_action_invalid(data, message):
+    with pytest.raises(ValueError) as error:
+        Action.parse(data, "actions[1]")
+    assert str(error.value).startswith(message)
+
+
+@pytest.mark.parametrize(
+    "config, message",
+    [
+        ([], "Expected an object at the top level"),
+        ({"window": "0"}, "Expected an integer at window, got a string"),
+        ({"index": True}, "Expected an integer at index, got a boolean"),
+        ({"actions": {}}, "Expected an array at actions"),
+        ({"variables": {"a": 1}}, "Expected a string at variables.a"),
+    ],
+)
+def test_check_config(config, message):
+    with pytest.raises(ValueError, match=message):
+        check_config(config)
+    check_config({"session": None, "window": 0, "variables": {}})
@@ -0,0 +1,105 @@
+import os
+import subprocess
+import threading
+from collections.abc import Generator
+
+import pytest
+
+from key2pane.client import in_process, request
+from key2pane.server import ConfigMemo, Server, is_listening
+from tests import paths
+
+
+@pytest.fixture(scope="function")
+def server(
+    tmp_path, monkeypatch, memory_tmux
+) -> Generator[str, None, None]:
+    """Start a daemon of which the requests run against the memory backend,
+    also when the tests run inside tmux, which `request` would forward, or
+    when a default tmux server is running, to which the daemon would
+    connect."""
+    monkeypatch.setenv("TMUX_TMPDIR", str(tmp_path))
+    monkeypatch.delenv("TMUX", raising=False)
+    monkeypatch.delenv("TMUX_PANE", raising=False)
+    path: str = str(tmp_path / "key2pane.sock")
+    with Server(path) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield path
+        server.shutdown()
+        thread.join()
+
+
+def test_request_dry_run(server):
+    status, stdout, stderr = request(
+        ["--config", paths.config, "--dry-run"], server
+    )
+    assert status == 0, stderr
+    assert stdout == "echo 'Hello, World!' Enter\n"
+    assert "Dry run" in stderr
+
+
+def test_request_error(server):
+    status, _, stderr = request(["--config", "/foo/bar/baz.json"], server)
+    assert status == 1
+    assert "An error occurred while processing the settings." in stderr
+
+
+def test_request_invalid_args(server):
+    status, _, stderr = request(["--window", "foo"], server)
+    assert status == 2
+    assert "invalid int value" in stderr
+
+
+def test_is_listening(server, tmp_path):
+    assert is_listening(server)
+    assert not is_listening(str(tmp_path / "missing.sock"))
+
+
+def test_config_memo(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text('{"reset": false}')
+    memo: ConfigMemo = ConfigMemo()
+    config: dict = memo(str(path))
+    assert memo(str(path)) is config
+
+    path.write_text('{"reset": true}')
+    os.utime(path, ns=(0, 0))
+    assert memo(str(path))["reset"] is True
+
+
+def test_in_process():
+    assert in_process(["--payload", "-", "foo"])
+    assert in_process(["--payload=-"])
+    assert not in_process(["--payload", "file.py", "-"])
+    assert not in_process(["--payload"])
+    assert in_process(["--stdin", "-0"])
+    assert in_process(["-t", "%3", "--capture", "foo"])
+    assert not in_process(["--capture-until", "foo"])
+
+
+def test_process_elsewhere(tmux_check, tmp_path):
+    name: str = "key2pane-test-elsewhere"
+    subprocess.run(
+        ["tmux", "-L", name, "new-session", "-d", "-s", name, "bash"],
+        check=True,
+    )
+    try:
+        socket, active = subprocess.check_output(
+            ["tmux", "-L", name, "display-message", "-p"]
+            + ["#{socket_path} #{pane_id}"],
+            text=True,
+        ).split()
+        with Server(str(tmp_path / "key2pane.sock")) as server:
+            status, stdout, stderr = server.process(
+                ["--config", paths.config, "--dry-run", "--loglevel", "INFO"],
+                os.getcwd(),
+                active,
+                socket,
+            )
+    finally:
+        subprocess.run(["tmux", "-L", name, "kill-server"])
+
+    assert status == 0, stderr
+    assert f"Target pane: {name}:0.0" in stderr
+    assert stdout == "echo 'Hello, World!' Enter\n"
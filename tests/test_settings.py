@@ -1,4 +1,16 @@
-from key2pane.settings import Settings, load_config
+import re
+
+import pytest
+
+from key2pane.dispatch import Dispatch
+from key2pane.schema import Action
+from key2pane.settings import (
+    Settings,
+    SettingsError,
+    compile_config,
+    load_compiled_config,
+    load_config,
+)
 from tests import paths
 
 
@@ -28,7 +40,9 @@ def test_settings_from_dicts():
     assert settings.index == 0
     assert settings.window == 0
     assert settings.session == "foo"
-    assert settings.actions == config["actions"]
+    assert settings.actions == tuple(
+        Action(action["regex"], action["keys"]) for action in config["actions"]
+    )
     assert settings.positional == ["foo", "bar"]
 
 
@@ -42,3 +56,98 @@ def test_settings_get_keys():
     assert settings.regexes == ("foo", "bar")
     assert settings.all_keys == (["a", "b"], ["c", "d"])
     assert settings.get_keys("foo") == ["a", "b"]
+
+
+def test_settings_get_keys_ambiguous():
+    actions: list = [
+        {"regex": "bash|zsh", "keys": ["a"]},
+        {"regex": "ba.*", "keys": ["b"]},
+        {"regex": "(z)sh\\1", "keys": ["c"]},
+    ]
+    settings: Settings = Settings(0, 0, "foo", False, actions, [""])
+
+    assert settings.get_keys("zsh") == ["a"]
+    assert settings.get_keys("bat") == ["b"]
+    with pytest.raises(SettingsError, match="Multiple actions"):
+        settings.get_keys("bash")
+    with pytest.raises(SettingsError, match="No action"):
+        settings.get_keys("fish")
+
+
+def test_settings_invalid_regex():
+    with pytest.raises(SettingsError, match="Invalid regex"):
+        Settings(0, 0, "foo", False, [{"regex": "(", "keys": []}], [])
+
+
+def test_settings_placeholders():
+    actions: list = [
+        {"regex": "foo", "keys": ["{0} {file}", "Enter"]},
+        {"regex": "bar", "keys": ["{1}"], "defaults": {"1": "b"}},
+    ]
+    settings: Settings = Settings(
+        0, 0, "foo", False, actions, ["a"], variables={"file": "x.py"}
+    )
+    assert settings.get_keys("foo") == ["a x.py", "Enter"]
+    assert settings.get_keys("bar") == ["b"]
+
+    settings.variables = {}
+    with pytest.raises(SettingsError, match="missing arguments: file"):
+        settings.get_keys("foo")
+
+
+def test_settings_invalid_keys():
+    with pytest.raises(SettingsError, match="Invalid placeholder"):
+        Settings(0, 0, "foo", False, [{"regex": "a", "keys": ["{"]}], [])
+
+
+def test_settings_invalid_resolver():
+    with pytest.raises(SettingsError, match="Invalid resolver"):
+        Settings(0, 0, "foo", False, [], [], resolver="ps")
+
+
+def test_load_compiled_config():
+    config: dict = load_compiled_config(paths.config)
+    assert isinstance(config["dispatch"], Dispatch)
+    assert config["actions"][0].plan.arity == 0
+    assert load_compiled_config(paths.config)["actions"] == config["actions"]
+
+    settings: Settings = Settings.from_dicts(
+        {"index": 0, "window": 0, "session": "foo", "positional": []}, config
+    )
+    assert settings.get_keys("zsh") == ["echo 'Hello, World!'", "Enter"]
+
+
+def test_load_compiled_config_invalid():
+    with pytest.raises(SettingsError, match="Invalid config file"):
+        load_compiled_config("/dev/null")
+
+
+def test_compile_config_location():
+    data: bytes = b'{"actions": [{"regex": "a", "keys": ["b"]}, {"regex": 1}]}'
+    with pytest.raises(SettingsError, match=r"Missing actions\[1\]\.keys"):
+        compile_config(data)
+    with pytest.raises(SettingsError, match="at reset, got a string"):
+        compile_config(b'{"reset": "yes"}')
+
+
+def test_load_compiled_config_lazy(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    actions: list[str] = [
+        f'{{"regex": "cmd{i}$", "keys": ["{i}"]}}' for i in range(1200)
+    ]
+    path.write_text(f'{{"actions": [{", ".join(actions)}]}}')
+    load_compiled_config(str(path))
+
+    compiled: list[str] = []
+    compile = getattr(re, "_compile")
+
+    def count(pattern, flags):
+        compiled.append(pattern)
+        return compile(pattern, flags)
+
+    monkeypatch.setattr("re._compile", count)
+    config: dict = load_compiled_config(str(path))
+    assert compiled == []
+    assert config["dispatch"].match("cmd7") == [7]
+    assert len(compiled) == 1
+    assert config["actions"][7].pattern.match("cmd7")
@@ -0,0 +1,61 @@
+"""Startup time budget of key2pane.
+
+Every key binding that runs key2pane pays for the imports of
+`key2pane.__main__`, so their cumulative time, as reported by
+`python -X importtime`, must stay within a budget. The budget can be changed
+using the `KEY2PANE_IMPORT_BUDGET_MS` environment variable, e.g. on slow
+machines.
+"""
+
+import os
+import subprocess
+import sys
+
+BUDGET_MS: float = float(os.environ.get("KEY2PANE_IMPORT_BUDGET_MS", 100))
+
+DEFERRED: tuple[str, ...] = (
+    "dataclasses",
+    "hashlib",
+    "json",
+    "logging.handlers",
+    "pickle",
+    "pprint",
+    "socket",
+    "typing",
+    "key2pane.capture",
+    "key2pane.control",
+    "key2pane.payload",
+    "key2pane.server",
+    "key2pane.settings",
+)
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Return the cumulative import time in microseconds of `module` and of
+    each module that it imports."""
+    stderr: str = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stderr
+
+    times: dict[str, int] = {}
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "[us]" not in line:
+            _, cumulative, name = line.split("|")
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_time_budget():
+    best: int = min(
+        import_times("key2pane.__main__")["key2pane.__main__"]
+        for _ in range(5)
+    )
+    assert best / 1000 < BUDGET_MS, f"{best / 1000:.1f} ms"
+
+
+def test_deferred_imports():
+    imported: set[str] = set(import_times("key2pane.__main__"))
+    assert imported.isdisjoint(DEFERRED), imported.intersection(DEFERRED)
@@ -0,0 +1,40 @@
+import pytest
+
+from key2pane.template import Plan, Template
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "plain",
+        "echo {0} {1}",
+        "{} and {}",
+        "{{literal}} {0}",
+        "{name}: {0!r:>8}",
+        "{0[1]} {0.upper}",
+        "{0:{1}}",
+    ],
+)
+def test_render_matches_format(text):
+    positional: list[str] = ["ab", "4"]
+    named: dict[str, str] = {"name": "x"}
+    rendered: str = Template(text).render(positional, named)
+    assert rendered == text.format(*positional, **named)
+
+
+@pytest.mark.parametrize("text", ["{0", "}", "{0}{}", "{}{0}"])
+def test_invalid(text):
+    with pytest.raises(ValueError):
+        Template(text)
+
+
+def test_plan():
+    plan: Plan = Plan(["echo {0} {2}", "{name}", "Enter"], {"2": "c"})
+    assert plan.arity == 3
+    assert plan.names == {"name"}
+    assert plan.missing(["a"], {}) == ["1", "name"]
+    assert plan.missing(["a", "b"], {"name": "n"}) == []
+    assert plan.render(["a", "b"], {"name": "n"}) == ["echo a c", "n", "Enter"]
+
+    with pytest.raises(ValueError, match="missing arguments: 1, name"):
+        plan.render(["a"], {})
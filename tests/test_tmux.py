@@ -1,3 +1,5 @@
+import pytest
+
 from key2pane import tmux
 
 
@@ -6,13 +8,30 @@ def test_execute():
     assert stdout == "Hello", "Make sure tmux is installed"
 
 
-def test_from_active(monkeypatch_tmux):
+def test_from_active(memory_tmux):
     pane: tmux.Pane = tmux.Pane.from_active()
     assert str(pane) == "foo:0.0"
     assert pane.command == "bash"
 
 
-def test_as_dict(monkeypatch_tmux):
+def test_from_active_target(memory_tmux):
+    for target in ("%4", "foo:0.2"):
+        pane: tmux.Pane = tmux.Pane.from_active(target)
+        assert str(pane) == "foo:0.2"
+        assert pane.id == pane.target == "%4"
+        assert pane.command == "vi:m"
+
+
+def test_find_command(memory_tmux):
+    pane: tmux.Pane = tmux.Pane("foo", 0, 2)
+    assert pane.id is None
+    assert pane.target == "foo:0.2"
+    assert pane.command == "vi:m"
+    with pytest.raises(tmux.TmuxError, match="Pane foo:0.3 not found"):
+        tmux.Pane("foo", 0, 3)
+
+
+def test_as_dict(memory_tmux):
     pane: tmux.Pane = tmux.Pane.from_active()
     expected: dict = {
         "session": "foo",
@@ -24,8 +43,118 @@ def test_as_dict(monkeypatch_tmux):
     assert actual == expected, actual
 
 
-def test_send(monkeypatch_tmux):
+def test_send(memory_tmux):
+    pane: tmux.Pane = tmux.Pane.from_active()
+    pane.send(["echo 'Hello'", "Enter"], reset=False)
+    assert memory_tmux.sent == [("%0", ["echo 'Hello'", "Enter"])]
+
+
+def test_send_reset(memory_tmux):
     pane: tmux.Pane = tmux.Pane.from_active()
-    expected: str = "send-keys -t foo:0.0 echo 'Hello' Enter"
-    actual: str = pane.send(["echo 'Hello'", "Enter"])
-    assert actual == expected, f"{actual=}, {expected=}"
+    pane.send(["ls;"], reset=True)
+    assert memory_tmux.sent == [("%0", ["C-c"]), ("%0", ["ls;"])]
+
+
+def test_batch(memory_tmux):
+    batch: tmux.Batch = tmux.Batch()
+    assert batch.add("display-message", "-p", "#{pane_id}") == 0
+    assert batch.add("send-keys", "-t", "foo:0.0", "C-c") == 1
+    assert len(batch) == 2
+    assert batch.flush() == ["%0", ""]
+    assert len(batch) == 0
+    assert memory_tmux.sent == [("%0", ["C-c"])]
+
+
+def test_execute_many(tmux_check):
+    outputs: list[str] = tmux.execute_many(
+        [
+            ("display-message", "-p", "a;"),
+            ("display-message", "-p", ""),
+            ("display-message", "-p", "c"),
+        ]
+    )
+    assert outputs == ["a;", "", "c"]
+
+
+def test_pane_index(memory_tmux):
+    panes: tmux.PaneIndex = tmux.PaneIndex.snapshot()
+    assert len(panes) == 4
+    assert panes.active is not None and panes.active.id == "%0"
+    assert [str(pane) for pane in panes.by_command("vi:m")] == ["foo:0.2"]
+    assert panes.by_command("fish") == []
+    assert panes.by_id("%2") == panes.get("bar", 1, 0)
+    assert panes.by_id("%2") == tmux.Pane.from_active("%2")
+    assert panes.get("bar", 1, 1) is None
+
+    assert tmux.PaneIndex.snapshot("foo:0.1").active == panes.by_id("%1")
+    with pytest.raises(tmux.TmuxError):
+        tmux.PaneIndex.snapshot("%9")
+
+
+def test_indexed(memory_tmux, monkeypatch):
+    panes: tmux.PaneIndex = tmux.PaneIndex.snapshot()
+    monkeypatch.setattr("key2pane.tmux.execute", None)
+    with tmux.indexed(panes):
+        pane: tmux.Pane = tmux.Pane("foo", 0, 2)
+    assert pane.command == "vi:m"
+    assert pane.target == "%4"
+
+
+def test_send_many(memory_tmux):
+    panes: list[tmux.Pane] = list(tmux.PaneIndex.snapshot())
+    tmux.send_many([(panes[0], ["ls", "Enter"]), (panes[1], ["1"])], True)
+    assert memory_tmux.sent == [
+        ("%0", ["C-c"]),
+        ("%0", ["ls", "Enter"]),
+        ("%1", ["C-c"]),
+        ("%1", ["1"]),
+    ]
+
+
+def test_server_args():
+    assert tmux.server_args(None) == ()
+    assert tmux.server_args("work") == ("-L", "work")
+    assert tmux.server_args("/tmp/ci.sock") == ("-S", "/tmp/ci.sock")
+
+
+def test_on_server():
+    assert tmux.tmux_argv("ls") == ["tmux", "ls"]
+    with tmux.on_server("work"):
+        assert tmux.tmux_argv("ls") == ["tmux", "-L", "work", "ls"]
+        assert tmux.tmux_argv("ls", server="/s") == ["tmux", "-S", "/s", "ls"]
+    assert tmux.tmux_argv("ls") == ["tmux", "ls"]
+
+
+def test_list_servers(tmp_path, monkeypatch):
+    import os
+    import socket
+
+    monkeypatch.setenv("TMUX_TMPDIR", str(tmp_path))
+    assert tmux.list_servers() == []
+
+    directory = tmp_path / f"tmux-{os.getuid()}"
+    directory.mkdir()
+    (directory / "file").touch()
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(str(directory / "stale"))
+    sock = socket.socket(socket.AF_UNIX)
+    sock.bind(str(directory / "work"))
+    sock.listen()
+    assert tmux.list_servers() == [str(directory / "work")]
+    sock.close()
+    stale.close()
+
+
+def test_pane_server(monkeypatch):
+    argvs: list[list[str]] = []
+    monkeypatch.setattr(
+        tmux.subprocess,
+        "check_output",
+        lambda argv: argvs.append(argv) or b"",
+    )
+    pane = tmux.Pane("s", 0, 1, command="bash", id="%5", server="work")
+    pane.send(["ls"], reset=False)
+    assert argvs[0][:5] == ["tmux", "-L", "work", "send-keys", "-t"]
+
+    with tmux.on_server("work"):
+        assert tmux.Pane("s", 0, 1, command="bash").server == "work"
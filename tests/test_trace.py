@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from key2pane import tmux
+from key2pane.trace import NullSpan, record, span, tracing
+
+
+def test_span_is_null_when_off(tmp_path):
+    assert isinstance(span("foo"), NullSpan)
+    assert span("foo") is span("bar", argv=("baz",))
+    with tracing(None):
+        assert isinstance(span("foo"), NullSpan)
+
+
+def test_tracing_jsonl(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    for _ in range(2):
+        with tracing(str(path)):
+            record("parse_args", 0)
+            with span("get_keys", command="bash") as current:
+                current.set("keys", 2)
+            with pytest.raises(ValueError), span("send"):
+                raise ValueError("foo")
+
+    lines: list[dict] = [json.loads(line) for line in path.open()]
+    assert [line["name"] for line in lines] == 2 * [
+        "parse_args",
+        "get_keys",
+        "send",
+    ]
+    assert lines[0]["start_ms"] == 0
+    assert lines[1]["command"] == "bash" and lines[1]["keys"] == 2
+    assert lines[2]["error"] == "ValueError: foo"
+    assert all(line["duration_ms"] >= 0 for line in lines)
+    assert isinstance(span("foo"), NullSpan)
+
+
+def test_tracing_chrome(tmp_path):
+    path = tmp_path / "trace.json"
+    with tracing(str(path), "chrome"):
+        with span("run"):
+            with span("get_keys"):
+                pass
+
+    events: list[dict] = json.loads(path.read_text())["traceEvents"]
+    assert [event["name"] for event in events] == ["run", "get_keys"]
+    assert all(event["ph"] == "X" for event in events)
+    assert events[0]["ts"] == 0
+    assert events[0]["dur"] >= events[1]["dur"]
+
+
+def test_execute_is_traced(tmux_check, tmp_path):
+    path = tmp_path / "trace.jsonl"
+    with tracing(str(path)):
+        tmux.execute("display-message", "-p", "foo")
+        with pytest.raises(tmux.TmuxError):
+            tmux.execute("foo-bar")
+
+    lines: list[dict] = [json.loads(line) for line in path.open()]
+    assert [line["argv"] for line in lines] == [
+        ["display-message", "-p", "foo"],
+        ["foo-bar"],
+    ]
+    assert [line["status"] for line in lines] == [0, 1]
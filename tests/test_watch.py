@@ -0,0 +1,90 @@
+import subprocess
+import time
+
+import pytest
+
+from key2pane import tmux
+from key2pane.watch import PaneWatcher
+
+SESSION: str = "key2pane-test-watch"
+
+
+@pytest.fixture(scope="function")
+def session(tmux_session) -> str:
+    """Create a detached tmux session and return the id of its pane."""
+    return tmux_session(SESSION)
+
+
+def forbid_queries(*args: str) -> str:
+    raise AssertionError(f"tmux was queried: {args}")
+
+
+def active_command(watcher: PaneWatcher, target: str) -> str | None:
+    active: tmux.Pane | None = watcher.snapshot(target).active
+    return active.command if active else None
+
+
+def test_snapshot_from_memory(session, monkeypatch):
+    watcher: PaneWatcher = PaneWatcher("-t", SESSION)
+    try:
+        index: tmux.PaneIndex = watcher.snapshot(session)
+        assert index.active is not None and index.active.session == SESSION
+
+        monkeypatch.setattr(tmux, "execute_many", forbid_queries)
+        subprocess.run(["tmux", "send-keys", "-t", session, "sleep 9", "C-m"])
+        deadline: float = time.monotonic() + 5
+        while active_command(watcher, session) != "sleep":
+            assert time.monotonic() < deadline, "command was not updated"
+            time.sleep(0.01)
+    finally:
+        watcher.close()
+    assert not watcher.alive
+
+
+def test_refresh(session):
+    """The command of the pane that is looked up is queried again, as its
+    notification may be up to a second late."""
+    watcher: PaneWatcher = PaneWatcher("-t", SESSION)
+    try:
+        watcher.snapshot(session)
+        subprocess.run(["tmux", "send-keys", "-t", session, "sleep 9", "C-m"])
+        deadline: float = time.monotonic() + 5
+        while tmux.Pane.from_active(session).command != "sleep":
+            assert time.monotonic() < deadline, "sleep did not start"
+            time.sleep(0.01)
+        assert active_command(watcher, session) == "sleep"
+    finally:
+        watcher.close()
+
+
+def test_notify_structure_marks_stale(session, monkeypatch):
+    watcher: PaneWatcher = PaneWatcher("-t", SESSION)
+    try:
+        watcher.snapshot(session)
+        watcher.notify("%layout-change @0 c195,80x24,0,0,0 c195,80x24,0,0,0 *")
+        monkeypatch.setattr(tmux, "execute_many", forbid_queries)
+        with pytest.raises(AssertionError, match="tmux was queried"):
+            watcher.snapshot(session)
+    finally:
+        watcher.close()
+
+
+def test_notify_subscription(session):
+    watcher: PaneWatcher = PaneWatcher("-t", SESSION)
+    try:
+        pane: tmux.Pane | None = watcher.snapshot(session).active
+        assert pane is not None
+        fields: tuple[str, ...] = (SESSION, str(pane.window), str(pane.index))
+        value: str = "\x1f".join((*fields, session, "1", "", "vim"))
+        prefix: str = f"%subscription-changed key2pane $1 @1 0 {session}"
+        watcher.notify(f"%subscription-changed other $1 @1 0 {session} : x")
+        watcher.notify(f"{prefix} : {value}")
+        assert watcher._panes[session].command == "vim"
+
+        active: tmux.Pane | None = watcher.snapshot(session).active
+        assert active is not None and active.command == pane.command
+        assert watcher._panes[session].command == pane.command
+        with pytest.raises(tmux.TmuxError):
+            watcher.snapshot("%999999")
+    finally:
+        watcher.close()